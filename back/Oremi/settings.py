@@ -173,4 +173,66 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(weeks=1),
     'ROTATE_REFRESH_TOKENS': True,
     # 'BLACKLIST_AFTER_ROTATION': True
-}
\ No newline at end of file
+}
+
+# Chatbot
+# Moteur de correspondance de la base de connaissances : 'heuristic', 'bm25', 'tfidf' ou 'semantic'
+CHATBOT_MATCHER_BACKEND = 'heuristic'
+# Modèle de phrases (SentenceTransformer) copié localement, chargé sans accès réseau
+CHATBOT_EMBEDDING_MODEL_PATH = BASE_DIR / 'chatbot_models' / 'paraphrase-multilingual-MiniLM-L12-v2'
+# Quantification int8 de la matrice des plongements (mémoire divisée par 4)
+CHATBOT_EMBEDDING_QUANTIZE = False
+# Index approximatif (IVF) des plongements de chaque langue, construit par `manage.py build_ann_index`
+# dans la version courante de CHATBOT_INDEX_DIR et utilisé à partir de CHATBOT_ANN_MIN_ENTRIES
+# entrées ; NPROBE règle rappel / latence
+CHATBOT_ANN_MIN_ENTRIES = 50000
+CHATBOT_ANN_NPROBE = 8
+# Index de la langue par défaut, consulté pour les messages d'une autre langue
+# (ou sans correspondance dans l'index de leur langue)
+CHATBOT_DEFAULT_LANGUAGE = 'fr'
+# Index pré-construits par `manage.py build_chatbot_index` (un sous-répertoire par langue),
+# projetés en mémoire au démarrage des processus
+CHATBOT_INDEX_DIR = BASE_DIR / 'chatbot_models' / 'index'
+# Reconstruction faite par un seul processus et publiée dans CHATBOT_INDEX_DIR, projetée en mémoire par les autres
+CHATBOT_SHARED_INDEX = True
+# Chargement de l'index par Oremi/wsgi.py avant la création des processus (gunicorn --preload)
+CHATBOT_PRELOAD_INDEX = False
+# Intervalle minimal (ms) entre deux contrôles de la version partagée de la base par un processus
+CHATBOT_KB_VERSION_CHECK_MS = 500
+# Recherche par paliers (empreinte exacte, mots-clés et phrases, catégories prédites, score complet), arrêtée dès
+# qu'une entrée dépasse son seuil de confiance ; compteurs par palier dans /chatbot/stats/
+CHATBOT_MATCH_CASCADE = True
+# Classifieur de catégories (`manage.py train_category_classifier`) : palier de la recherche
+# restreint aux CHATBOT_CLASSIFIER_TOP_K catégories les plus probables du message
+CHATBOT_CLASSIFIER_PATH = BASE_DIR / 'chatbot_models' / 'category_classifier.npz'
+CHATBOT_CLASSIFIER_TOP_K = 3
+# Score heuristique réparti sur un pool de processus (fork) au-delà de
+# CHATBOT_PARALLEL_MIN_CANDIDATES entrées candidates. Désactivé par défaut (0 ou 1) :
+# chaque processus serveur créerait son propre pool ; à activer (ex. 4) sur une machine
+# dédiée servant de très grandes bases
+CHATBOT_PARALLEL_WORKERS = 0
+CHATBOT_PARALLEL_MIN_CANDIDATES = 20000
+# Cache LRU des correspondances par message normalisé (taille, durée de vie en secondes)
+CHATBOT_MATCH_CACHE_SIZE = 2048
+CHATBOT_MATCH_CACHE_TTL = 600
+# Cache des réponses par similarité : un message très proche (cosinus >= CUTOFF) d'un message
+# récent reçoit sa réponse sans nouvelle recherche ; vidé à chaque modification de la base.
+# Vecteurs 'hashed' (n-grammes, sans modèle) ou 'semantic' (modèle de phrases, CUTOFF ~0.9) ;
+# seules les réponses des méthodes listées sont conservées. Taille 0 : désactivé
+CHATBOT_RESPONSE_CACHE_SIZE = 1024
+CHATBOT_RESPONSE_CACHE_CUTOFF = 0.95
+CHATBOT_RESPONSE_CACHE_TTL = 3600
+CHATBOT_RESPONSE_CACHE_VECTORS = 'hashed'
+CHATBOT_RESPONSE_CACHE_METHODS = ['ai_generation']
+# Traces détaillées (top-k et scores par composante) pour une fraction des messages
+CHATBOT_TRACE_SAMPLE_RATE = 0.01
+CHATBOT_TRACE_BUFFER_SIZE = 200
+CHATBOT_TRACE_TOP_K = 5
+# Mode fantôme : moteur candidat ('bm25', 'tfidf'...) rejoué en arrière-plan sur une fraction
+# des messages après l'envoi de la réponse ; comparaisons agrégées par heure (ShadowComparison)
+CHATBOT_SHADOW_BACKEND = None
+CHATBOT_SHADOW_SAMPLE_RATE = 1.0
+CHATBOT_SHADOW_QUEUE_SIZE = 1000
+CHATBOT_SHADOW_FLUSH_SECONDS = 30
+# Correction des fautes de frappe des messages sur le vocabulaire de la base (SymSpell)
+CHATBOT_SPELL_CORRECTION = True
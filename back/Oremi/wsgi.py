@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Oremi.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if getattr(settings, 'CHATBOT_PRELOAD_INDEX', False):
+    # Index chargé une fois dans le processus maître, partagé par les processus enfants
+    from chatbot.index import preload_knowledge_index
+    preload_knowledge_index()
@@ -1,11 +1,11 @@
 from django.contrib import admin
-from .models import KnowledgeBase, Conversation, Message, ChatbotSettings
+from .models import KnowledgeBase, Conversation, Message, ChatbotSettings, ShadowComparison
 
 
 @admin.register(KnowledgeBase)
 class KnowledgeBaseAdmin(admin.ModelAdmin):
-    list_display = ['category', 'question_preview', 'is_active', 'confidence_threshold', 'created_at']
-    list_filter = ['category', 'is_active', 'created_at']
+    list_display = ['category', 'question_preview', 'language', 'is_active', 'confidence_threshold', 'created_at']
+    list_filter = ['category', 'language', 'is_active', 'created_at']
     search_fields = ['question', 'answer', 'keywords', 'category']
     list_editable = ['is_active', 'confidence_threshold']
     
@@ -14,7 +14,7 @@ class KnowledgeBaseAdmin(admin.ModelAdmin):
             'fields': ('category', 'question', 'answer')
         }),
         ('Configuration', {
-            'fields': ('keywords', 'confidence_threshold', 'is_active')
+            'fields': ('keywords', 'language', 'confidence_threshold', 'is_active')
         }),
         ('Métadonnées', {
             'fields': ('created_at', 'updated_at'),
@@ -117,3 +117,35 @@ class ChatbotSettingsAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         # Empêcher la suppression de la configuration
         return False
+
+
+@admin.register(ShadowComparison)
+class ShadowComparisonAdmin(admin.ModelAdmin):
+    list_display = [
+        'period', 'primary_backend', 'shadow_backend', 'language', 'messages', 'agreement_percent',
+        'mean_delta', 'primary_latency', 'shadow_latency',
+    ]
+    list_filter = ['primary_backend', 'shadow_backend', 'language', 'period']
+    
+    def has_add_permission(self, request):
+        # Lignes écrites uniquement par le mode fantôme
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def agreement_percent(self, obj):
+        return f"{obj.agreement_rate:.1%}"
+    agreement_percent.short_description = "Accord"
+    
+    def mean_delta(self, obj):
+        return f"{obj.mean_score_delta:+.3f}"
+    mean_delta.short_description = "Écart de score moyen"
+    
+    def primary_latency(self, obj):
+        return f"{obj.mean_primary_latency_ms:.2f} ms"
+    primary_latency.short_description = "Latence en service"
+    
+    def shadow_latency(self, obj):
+        return f"{obj.mean_shadow_latency_ms:.2f} ms"
+    shadow_latency.short_description = "Latence candidat"
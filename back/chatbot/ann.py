@@ -0,0 +1,203 @@
+"""
+Recherche approximative des plus proches voisins (IVF) en NumPy pur
+"""
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    Index IVF (« inverted file ») pour vecteurs normalisés (similarité cosinus).
+
+    Les vecteurs sont répartis en `nlist` listes par un k-means sphérique ;
+    chaque liste est stockée de façon contiguë. Une recherche ne compare le
+    message qu'aux centroïdes puis aux vecteurs des `nprobe` listes les plus
+    proches : `nprobe` est le réglage rappel / latence (plus grand = meilleur
+    rappel, plus lent ; `nprobe = nlist` équivaut à la recherche exacte).
+    """
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: int = 8, n_iter: int = 8,
+                 train_size_per_list: int = 32, seed: int = 0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.train_size_per_list = train_size_per_list
+        self.seed = seed
+
+        self.centroids = None  # (nlist, d)
+        self.vectors = None    # (N, d) triés par liste
+        self.rows = None       # ligne d'origine de chaque vecteur trié
+        self.offsets = None    # (nlist + 1,) bornes des listes dans `vectors`
+
+    def __len__(self):
+        return 0 if self.rows is None else len(self.rows)
+
+    @staticmethod
+    def default_nlist(size: int) -> int:
+        return max(1, min(size, int(4 * np.sqrt(size))))
+
+    @staticmethod
+    def _assign(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 16384) -> np.ndarray:
+        """Liste (centroïde le plus proche) de chaque vecteur, par blocs"""
+        assignment = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), chunk_size):
+            block = vectors[start:start + chunk_size]
+            assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+        return assignment
+
+    def build(self, vectors: np.ndarray) -> 'IVFIndex':
+        """
+        Entraîne les centroïdes (k-means sphérique sur un échantillon) puis
+        range tous les vecteurs dans leur liste
+
+        Args:
+            vectors: Matrice (N, d) de vecteurs normalisés
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        size = len(vectors)
+        if self.nlist is None:
+            self.nlist = self.default_nlist(size)
+        self.nlist = max(1, min(self.nlist, size))
+
+        rng = np.random.default_rng(self.seed)
+        train_size = min(size, self.nlist * self.train_size_per_list)
+        sample = vectors[rng.choice(size, train_size, replace=False)] if train_size < size else vectors
+
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignment = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=self.nlist)
+
+            # Les listes vides sont ré-initialisées sur des points de l'échantillon
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        assignment = self._assign(vectors, centroids)
+        order = np.argsort(assignment, kind='stable')
+
+        self.centroids = centroids
+        self.vectors = vectors[order]
+        self.rows = order.astype(np.int64)
+        self.offsets = np.concatenate(([0], np.cumsum(np.bincount(assignment, minlength=self.nlist)))).astype(np.int64)
+        return self
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recherche approximative des k vecteurs les plus similaires
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (lignes d'origine, scores) par score décroissant
+        """
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ query
+        if nprobe < self.nlist:
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        else:
+            probes = np.arange(self.nlist)
+
+        # Produits sur des vues contiguës : aucune copie des listes sondées
+        positions, scores = [], []
+        for probe in probes:
+            start, end = self.offsets[probe], self.offsets[probe + 1]
+            if start == end:
+                continue
+            positions.append(np.arange(start, end))
+            scores.append(self.vectors[start:end] @ query)
+
+        if not scores:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        positions = np.concatenate(positions)
+        scores = np.concatenate(scores)
+        if k < len(scores):
+            best = np.argpartition(-scores, k - 1)[:k]
+            positions, scores = positions[best], scores[best]
+        rows = self.rows[positions]
+        order = np.lexsort((rows, -scores))  # à score égal, ordre de la base
+        return rows[order], scores[order]
+
+    ARRAYS = ('centroids', 'vectors', 'rows', 'offsets', 'params')
+
+    def save(self, directory, **metadata):
+        """
+        Écrit l'index dans `directory`, un fichier .npy par tableau (avec
+        les métadonnées) pour que `load` puisse les projeter en mémoire
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            'centroids': self.centroids, 'vectors': self.vectors, 'rows': self.rows, 'offsets': self.offsets,
+            'params': np.array([self.nlist, self.nprobe, self.n_iter, self.seed]),
+        }
+        for name, array in {**arrays, **metadata}.items():
+            np.save(directory / f'{name}.npy', np.asarray(array))
+
+    @classmethod
+    def load(cls, directory, mmap_mode: Optional[str] = 'r') -> Tuple['IVFIndex', dict]:
+        """
+        Charge un index sauvegardé, tableaux projetés en mémoire (les
+        vecteurs ne sont pas copiés dans chaque processus) ; retourne aussi
+        les métadonnées associées
+        """
+        directory = Path(directory)
+        if not directory.is_dir():
+            raise FileNotFoundError(directory)
+        data = {path.stem: np.asarray(np.load(path, mmap_mode=mmap_mode)) for path in directory.glob('*.npy')}
+        nlist, nprobe, n_iter, seed = (int(value) for value in data['params'])
+        index = cls(nlist=nlist, nprobe=nprobe, n_iter=n_iter, seed=seed)
+        index.centroids = data['centroids']
+        index.vectors = data['vectors']
+        index.rows = data['rows']
+        index.offsets = data['offsets']
+        metadata = {key: value for key, value in data.items() if key not in cls.ARRAYS}
+        return index, metadata
+
+
+def exact_search(vectors: np.ndarray, query: np.ndarray, k: int = 10) -> np.ndarray:
+    """Recherche exacte (force brute) des k plus proches voisins, pour référence"""
+    scores = vectors @ query
+    k = min(k, len(scores))
+    best = np.argpartition(-scores, k - 1)[:k]
+    return best[np.argsort(-scores[best], kind='stable')]
+
+
+def recall_benchmark(index: IVFIndex, vectors: np.ndarray, queries: np.ndarray, k: int = 10,
+                     nprobes=(1, 2, 4, 8, 16, 32)) -> list:
+    """
+    Mesure le rappel@k et la latence de l'index IVF par rapport à la
+    recherche exacte, pour plusieurs valeurs de `nprobe`
+
+    Returns:
+        list: [{'nprobe', 'recall', 'latency_ms', 'exact_latency_ms'}]
+    """
+    started = time.perf_counter()
+    truth = [set(exact_search(vectors, query, k).tolist()) for query in queries]
+    exact_latency = (time.perf_counter() - started) / max(len(queries), 1) * 1000
+
+    results = []
+    for nprobe in nprobes:
+        if nprobe > index.nlist:
+            break
+        hits = 0
+        started = time.perf_counter()
+        found = [index.search(query, k, nprobe)[0] for query in queries]
+        latency = (time.perf_counter() - started) / max(len(queries), 1) * 1000
+        for expected, rows in zip(truth, found):
+            hits += len(expected.intersection(rows.tolist()))
+        results.append({
+            'nprobe': nprobe,
+            'recall': hits / max(sum(len(expected) for expected in truth), 1),
+            'latency_ms': latency,
+            'exact_latency_ms': exact_latency,
+        })
+    return results
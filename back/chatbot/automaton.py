@@ -0,0 +1,79 @@
+"""
+Automate d'Aho–Corasick pour la recherche simultanée de nombreux motifs
+"""
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List
+
+
+class AhoCorasick:
+    """
+    Automate multi-motifs : un seul passage linéaire sur le texte suffit à
+    retrouver toutes les occurrences de tous les motifs (sous-chaînes)
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]  # motifs se terminant exactement sur cet état
+        self._dict_link: List[int] = [-1]     # prochain état (via les liens d'échec) ayant une sortie
+
+        seen = set()
+        for pattern in patterns:
+            if not pattern or pattern in seen:
+                continue
+            seen.add(pattern)
+            self._insert(pattern, len(self.patterns))
+            self.patterns.append(pattern)
+
+        self._build_links()
+
+    def _insert(self, pattern: str, pattern_id: int):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._dict_link.append(-1)
+            state = next_state
+        self._output[state].append(pattern_id)
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0) if self._goto[fail].get(char) != child else 0
+                target = self._fail[child]
+                self._dict_link[child] = target if self._output[target] else self._dict_link[target]
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def find_all(self, text: str) -> FrozenSet[str]:
+        """
+        Retourne l'ensemble des motifs présents dans `text`
+        """
+        goto, fail, output, dict_link = self._goto, self._fail, self._output, self._dict_link
+        reported = set()  # états dont les sorties (et celles de leur chaîne) sont déjà relevées
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            match_state = state if output[state] else dict_link[state]
+            while match_state > 0 and match_state not in reported:
+                reported.add(match_state)
+                match_state = dict_link[match_state]
+
+        patterns = self.patterns
+        return frozenset(patterns[pattern_id] for match_state in reported for pattern_id in output[match_state])
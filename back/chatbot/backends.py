@@ -0,0 +1,531 @@
+"""
+Moteurs de correspondance alternatifs pour la base de connaissances
+"""
+import copy
+import logging
+import pickle
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+from sentence_transformers import SentenceTransformer
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+
+from .ann import IVFIndex
+
+logger = logging.getLogger(__name__)
+
+
+def top_positions(scores: np.ndarray, thresholds: np.ndarray, k: int = 1) -> List[Tuple[int, float]]:
+    """
+    Retourne les k meilleures positions (position, score) dont le score
+    atteint le seuil dynamique de l'entrée, par score décroissant
+    """
+    scores = np.where(scores >= thresholds, scores, 0.0)
+    if k == 1:
+        best = int(np.argmax(scores))
+        return [(best, float(scores[best]))] if scores[best] > 0 else []
+
+    k = min(k, len(scores))
+    positions = np.argpartition(-scores, k - 1)[:k]
+    positions = positions[np.lexsort((positions, -scores[positions]))]
+    return [(int(p), float(scores[p])) for p in positions if scores[p] > 0]
+
+
+class SparseKnowledgeMatrix:
+    """
+    Base de connaissances sous forme de matrice creuse CSR.
+
+    La matrice est stockée par terme (termes x entrées) : le produit du
+    vecteur creux du message par cette matrice ne parcourt que les listes
+    des termes présents dans le message et score toute la base en une seule
+    opération. Ensuite `argmax` / `argpartition` donnent les meilleures
+    entrées. Les scores sont ramenés dans [0, 1] :
+    - 'tfidf' : similarité cosinus entre vecteurs TF-IDF normalisés
+    - 'bm25'  : score BM25 divisé par le score maximal atteignable par la requête
+    """
+
+    WEIGHTINGS = ('bm25', 'tfidf')
+    TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+    def __init__(self, entries: Iterable, weighting: str = 'bm25', k1: float = 1.5, b: float = 0.75):
+        if weighting not in self.WEIGHTINGS:
+            raise ValueError(f"Pondération inconnue: {weighting}")
+
+        entries = list(entries)
+        self.weighting = weighting
+        self.k1 = k1
+        self.b = b
+        # Les seuils dynamiques des entrées sont appliqués en un seul masque vectoriel
+        self.thresholds = np.array([entry.dynamic_threshold for entry in entries], dtype=np.float32)
+
+        documents = [' '.join((entry.question_text,) + entry.keywords) for entry in entries]
+        try:
+            if weighting == 'tfidf':
+                self.vectorizer = TfidfVectorizer(token_pattern=self.TOKEN_PATTERN, sublinear_tf=True)
+                weights = self.vectorizer.fit_transform(documents).tocsr().astype(np.float32)
+            else:
+                self.vectorizer = CountVectorizer(token_pattern=self.TOKEN_PATTERN)
+                weights = self._bm25_matrix(self.vectorizer.fit_transform(documents).tocsr())
+            self.matrix = weights.T.tocsr()
+        except ValueError:
+            # Vocabulaire vide (aucune entrée ou aucun terme exploitable)
+            logger.warning("Matrice creuse vide: aucun terme indexable dans la base de connaissances")
+            self.vectorizer = None
+            self.matrix = None
+
+    # Colonnes ajoutées depuis la construction (mises à jour incrémentales) :
+    # matrice privée au processus, la matrice principale restant partagée
+    extra: Optional[sparse.csr_matrix] = None
+
+    def _columns(self) -> Optional[sparse.csr_matrix]:
+        """Matrice complète, colonnes ajoutées comprises"""
+        if self.matrix is None or self.extra is None:
+            return self.matrix
+        return sparse.hstack([self.matrix, self.extra], format='csr')
+
+    def save(self, directory: Path):
+        """
+        Sauvegarde la matrice : tableaux CSR en .npy (projetables en mémoire),
+        vectoriseur et paramètres en pickle
+        """
+        prefix = f'sparse_{self.weighting}'
+        columns = self._columns()
+        state = {
+            'weighting': self.weighting, 'k1': self.k1, 'b': self.b, 'vectorizer': self.vectorizer,
+            'average_length': getattr(self, 'average_length', 0.0),
+            'shape': columns.shape if columns is not None else None,
+        }
+        with open(directory / f'{prefix}.pkl', 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        arrays = {'thresholds': self.thresholds, 'idf': getattr(self, 'idf', None)}
+        if columns is not None:
+            arrays.update(data=columns.data, indices=columns.indices, indptr=columns.indptr)
+        for name, array in arrays.items():
+            if array is not None:
+                np.save(directory / f'{prefix}_{name}.npy', array)
+
+    @classmethod
+    def load(cls, directory: Path, weighting: str, mmap_mode: Optional[str] = 'r') -> Optional['SparseKnowledgeMatrix']:
+        """
+        Recharge une matrice sauvegardée par `save` (None si absente)
+        """
+        prefix = f'sparse_{weighting}'
+        if not (directory / f'{prefix}.pkl').exists():
+            return None
+
+        with open(directory / f'{prefix}.pkl', 'rb') as f:
+            state = pickle.load(f)
+
+        def array(name):
+            path = directory / f'{prefix}_{name}.npy'
+            return np.load(path, mmap_mode=mmap_mode) if path.exists() else None
+
+        matrix = cls.__new__(cls)
+        matrix.weighting, matrix.k1, matrix.b = state['weighting'], state['k1'], state['b']
+        matrix.vectorizer = state['vectorizer']
+        matrix.average_length = state['average_length']
+        matrix.thresholds = array('thresholds')
+        idf = array('idf')
+        if idf is not None:
+            matrix.idf = idf
+        matrix.matrix = None
+        if state['shape'] is not None:
+            # Aucune copie : la matrice CSR repose directement sur les fichiers projetés
+            matrix.matrix = sparse.csr_matrix(
+                (array('data'), array('indices'), array('indptr')), shape=state['shape'], copy=False
+            )
+        return matrix
+
+    def _bm25_matrix(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        """
+        Pré-calcule les poids BM25 de chaque couple (entrée, terme)
+        """
+        n_docs = counts.shape[0]
+        doc_lengths = np.asarray(counts.sum(axis=1)).ravel().astype(np.float32)
+        self.average_length = float(doc_lengths.mean()) if n_docs else 0.0
+
+        document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+        self.idf = np.log1p((n_docs - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+
+        tf = counts.data.astype(np.float32)
+        rows = np.repeat(np.arange(n_docs), np.diff(counts.indptr))
+        norm = self.k1 * (1 - self.b + self.b * doc_lengths[rows] / max(self.average_length, 1e-9))
+        weights = counts.copy().astype(np.float32)
+        weights.data = self.idf[counts.indices] * tf * (self.k1 + 1) / (tf + norm)
+        return weights
+
+    def with_entry(self, entry) -> 'SparseKnowledgeMatrix':
+        """
+        Copie de la matrice avec une colonne de plus pour une nouvelle
+        entrée, ajoutée aux colonnes privées (la matrice principale n'est
+        pas copiée). Le vocabulaire et les IDF restent ceux de la
+        construction : les termes inconnus sont ignorés jusqu'à la prochaine
+        reconstruction.
+        """
+        matrix = copy.copy(self)
+        matrix.thresholds = np.append(self.thresholds, np.float32(entry.dynamic_threshold))
+        if self.matrix is None:
+            return matrix
+
+        document = ' '.join((entry.question_text,) + entry.keywords)
+        if self.weighting == 'tfidf':
+            column = self.vectorizer.transform([document]).astype(np.float32)
+        else:
+            counts = self.vectorizer.transform([document])
+            tf = counts.data.astype(np.float32)
+            norm = self.k1 * (1 - self.b + self.b * tf.sum() / max(self.average_length, 1e-9))
+            column = counts.astype(np.float32)
+            column.data = self.idf[counts.indices] * tf * (self.k1 + 1) / (tf + norm)
+        column = column.T.tocsr()
+        matrix.extra = column if self.extra is None else sparse.hstack([self.extra, column], format='csr')
+        return matrix
+
+    def with_threshold(self, position: int, threshold: float) -> 'SparseKnowledgeMatrix':
+        """Copie de la matrice avec le seuil d'une entrée modifié (inf pour l'exclure)"""
+        matrix = copy.copy(self)
+        matrix.thresholds = np.array(self.thresholds)
+        matrix.thresholds[position] = threshold
+        return matrix
+
+    def score(self, user_message_lower: str) -> Optional[np.ndarray]:
+        """
+        Scores de toutes les entrées pour un message (une seule multiplication creuse)
+        """
+        if self.matrix is None:
+            return None
+
+        query = self.vectorizer.transform([user_message_lower])
+        if not query.nnz:
+            return None
+
+        if self.weighting == 'tfidf':
+            return self._product(query)
+
+        # BM25 : chaque terme présent dans la requête compte une fois
+        query.data[:] = 1.0
+        upper_bound = float(self.idf[query.indices].sum() * (self.k1 + 1))
+        if upper_bound <= 0:
+            return None
+        return self._product(query) / upper_bound
+
+    def score_batch(self, user_messages_lower: List[str]) -> np.ndarray:
+        """
+        Scores de toutes les entrées pour plusieurs messages (messages x
+        entrées) en un seul produit de matrices creuses
+        """
+        columns = self._columns()
+        if columns is None:
+            return np.zeros((len(user_messages_lower), 0), dtype=np.float32)
+
+        queries = self.vectorizer.transform(user_messages_lower).tocsr()
+        if self.weighting == 'bm25':
+            queries.data[:] = 1.0
+            upper_bounds = queries @ (self.idf * (self.k1 + 1))
+            queries = sparse.diags(np.divide(
+                1.0, upper_bounds, out=np.zeros_like(upper_bounds), where=upper_bounds > 0
+            )) @ queries
+        return (queries @ columns).toarray().astype(np.float32)
+
+    def _product(self, query: sparse.csr_matrix) -> np.ndarray:
+        scores = (query @ self.matrix).toarray().ravel()
+        if self.extra is None:
+            return scores
+        return np.concatenate([scores, (query @ self.extra).toarray().ravel()])
+
+    def top(self, user_message_lower: str, k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Retourne les k meilleures entrées (position, score) au-dessus de leur seuil dynamique
+        """
+        scores = self.score(user_message_lower)
+        if scores is None:
+            return []
+        return top_positions(scores, self.thresholds, k)
+
+    def explain(self, user_message_lower: str, positions: List[int]) -> List[Dict[str, float]]:
+        """
+        Contribution de chaque terme du message au score des entrées données
+        """
+        if self.matrix is None:
+            return [{} for _ in positions]
+
+        query = self.vectorizer.transform([user_message_lower]).astype(np.float32)
+        if self.weighting == 'bm25' and query.nnz:
+            query.data[:] = 1.0 / float(self.idf[query.indices].sum() * (self.k1 + 1))
+
+        terms = self.vectorizer.get_feature_names_out()
+        rows = self._columns()[query.indices][:, positions].toarray()
+        return [
+            {terms[term]: float(weight * rows[i, column]) for i, (term, weight) in enumerate(zip(query.indices, query.data)) if rows[i, column]}
+            for column in range(len(positions))
+        ]
+
+
+_model_lock = threading.Lock()
+_models: Dict[str, Optional[SentenceTransformer]] = {}
+
+
+def get_embedding_model() -> Optional[SentenceTransformer]:
+    """
+    Charge une seule fois par processus le modèle de phrases depuis le
+    chemin local CHATBOT_EMBEDDING_MODEL_PATH (aucun accès réseau)
+
+    Returns:
+        SentenceTransformer ou None si le modèle n'est pas disponible
+    """
+    path = getattr(settings, 'CHATBOT_EMBEDDING_MODEL_PATH', None)
+    if not path:
+        return None
+
+    path = str(path)
+    with _model_lock:
+        if path not in _models:
+            try:
+                _models[path] = SentenceTransformer(path, device='cpu', local_files_only=True)
+                logger.info(f"Modèle de similarité sémantique chargé depuis {path}")
+            except Exception as e:
+                logger.warning(f"Modèle de similarité sémantique indisponible ({path}): {e}")
+                _models[path] = None
+        return _models[path]
+
+
+class EmbeddingKnowledgeMatrix:
+    """
+    Plongements des questions de la base, calculés une seule fois à la
+    construction de l'index et stockés en une matrice float32 normalisée
+    (ou quantifiée en int8 avec une échelle par ligne).
+
+    Par requête, seul le message est encodé ; la similarité cosinus avec
+    toute la base est un unique produit matrice-vecteur.
+    """
+
+    # Taille des blocs déquantifiés à la volée (évite une copie float32 de toute la matrice)
+    QUANTIZED_BLOCK_ROWS = 8192
+    # Nombre de voisins demandés à l'index approximatif avant application des seuils
+    ANN_CANDIDATES = 32
+
+    # Lignes ajoutées depuis la construction (mises à jour incrémentales), en
+    # float32 : matrice privée au processus, la matrice principale restant partagée
+    extra: Optional[np.ndarray] = None
+
+    def __init__(self, entries: Iterable, model: SentenceTransformer, quantize: bool = False,
+                 previous: Optional['EmbeddingKnowledgeMatrix'] = None, batch_size: int = 64):
+        entries = list(entries)
+        self.model = model
+        self.quantize = quantize
+        self.ids = [entry.id for entry in entries]
+        self.texts = [entry.question for entry in entries]
+        self.thresholds = np.array([entry.dynamic_threshold for entry in entries], dtype=np.float32)
+
+        dimension = model.get_sentence_embedding_dimension()
+        vectors = np.zeros((len(entries), dimension), dtype=np.float32)
+
+        # Seules les questions nouvelles ou modifiées sont ré-encodées
+        previous_rows = previous.rows_by_id() if previous is not None else {}
+        to_encode = []
+        for row, entry in enumerate(entries):
+            previous_row = previous_rows.get(entry.id)
+            if previous_row is not None and previous.texts[previous_row] == entry.question:
+                vectors[row] = previous.vector(previous_row)
+            else:
+                to_encode.append(row)
+
+        if to_encode:
+            vectors[to_encode] = self.encode([self.texts[row] for row in to_encode], batch_size)
+        self.encoded_count = len(to_encode)
+
+        # Index approximatif (IVF) optionnel, pour les très grandes bases
+        self.ann: Optional[IVFIndex] = None
+
+        if quantize:
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            self.matrix = np.round(vectors / scales[:, None]).astype(np.int8)
+            self.scales = scales.astype(np.float32)
+        else:
+            self.matrix = vectors
+            self.scales = None
+
+    def save(self, directory: Path):
+        """
+        Sauvegarde les plongements (.npy projetable en mémoire) ; le modèle
+        n'est pas sauvegardé, seul son chemin est noté
+        """
+        state = {
+            'ids': self.ids, 'texts': self.texts, 'quantize': self.quantize,
+            'model_path': str(getattr(settings, 'CHATBOT_EMBEDDING_MODEL_PATH', '')),
+        }
+        with open(directory / 'embeddings.pkl', 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        matrix, scales = self.matrix, self.scales
+        if self.extra is not None:
+            # Les lignes ajoutées sont fusionnées (et quantifiées si besoin)
+            if scales is None:
+                matrix = np.vstack([matrix, self.extra])
+            else:
+                extra_scales = np.abs(self.extra).max(axis=1) / 127.0
+                extra_scales[extra_scales == 0] = 1.0
+                matrix = np.vstack([matrix, np.round(self.extra / extra_scales[:, None]).astype(np.int8)])
+                scales = np.concatenate([scales, extra_scales.astype(np.float32)])
+        np.save(directory / 'embeddings_matrix.npy', matrix)
+        np.save(directory / 'embeddings_thresholds.npy', self.thresholds)
+        if scales is not None:
+            np.save(directory / 'embeddings_scales.npy', scales)
+
+    @classmethod
+    def load(cls, directory: Path, mmap_mode: Optional[str] = 'r') -> Optional['EmbeddingKnowledgeMatrix']:
+        """
+        Recharge des plongements sauvegardés par `save`, s'ils ont été
+        calculés avec le modèle actuellement configuré (sinon None). Le
+        modèle est rattaché par l'index à la première utilisation.
+        """
+        if not (directory / 'embeddings.pkl').exists():
+            return None
+
+        with open(directory / 'embeddings.pkl', 'rb') as f:
+            state = pickle.load(f)
+        if state['model_path'] != str(getattr(settings, 'CHATBOT_EMBEDDING_MODEL_PATH', '')):
+            logger.info("Plongements sauvegardés ignorés : calculés avec un autre modèle")
+            return None
+
+        embeddings = cls.__new__(cls)
+        embeddings.model = None
+        embeddings.quantize = state['quantize']
+        embeddings.ids = state['ids']
+        embeddings.texts = state['texts']
+        embeddings.encoded_count = 0
+        embeddings.ann = None
+        embeddings.matrix = np.load(directory / 'embeddings_matrix.npy', mmap_mode=mmap_mode)
+        embeddings.thresholds = np.load(directory / 'embeddings_thresholds.npy', mmap_mode=mmap_mode)
+        scales_path = directory / 'embeddings_scales.npy'
+        embeddings.scales = np.load(scales_path, mmap_mode=mmap_mode) if scales_path.exists() else None
+        return embeddings
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        return self.model.encode(
+            texts, batch_size=batch_size, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=False,
+        ).astype(np.float32)
+
+    def with_entry(self, entry) -> 'EmbeddingKnowledgeMatrix':
+        """
+        Copie des plongements avec une ligne de plus (seule la nouvelle
+        question est encodée), ajoutée aux lignes privées : la matrice
+        principale n'est pas copiée et l'index approximatif reste valable.
+        """
+        embeddings = copy.copy(self)
+        vector = self.encode([entry.question])
+        embeddings.extra = vector if self.extra is None else np.vstack([self.extra, vector])
+        embeddings.ids = self.ids + [entry.id]
+        embeddings.texts = self.texts + [entry.question]
+        embeddings.thresholds = np.append(self.thresholds, np.float32(entry.dynamic_threshold))
+        embeddings.encoded_count = 1
+        return embeddings
+
+    def with_threshold(self, position: int, threshold: float) -> 'EmbeddingKnowledgeMatrix':
+        """Copie des plongements avec le seuil d'une entrée modifié (inf pour l'exclure)"""
+        embeddings = copy.copy(self)
+        embeddings.thresholds = np.array(self.thresholds)
+        embeddings.thresholds[position] = threshold
+        return embeddings
+
+    def rows_by_id(self) -> Dict[int, int]:
+        return {entry_id: row for row, entry_id in enumerate(self.ids)}
+
+    def vector(self, row: int) -> np.ndarray:
+        """
+        Plongement (float32) d'une ligne, déquantifié si nécessaire
+        """
+        if row >= len(self.matrix):
+            return self.extra[row - len(self.matrix)]
+        if self.scales is None:
+            return self.matrix[row]
+        return self.matrix[row].astype(np.float32) * self.scales[row]
+
+    def dense_vectors(self) -> np.ndarray:
+        """
+        Matrice float32 de tous les plongements (déquantifiée si nécessaire)
+        """
+        vectors = self.matrix if self.scales is None else self.matrix.astype(np.float32) * self.scales[:, None]
+        return vectors if self.extra is None else np.vstack([vectors, self.extra])
+
+    def load_ann(self, path) -> bool:
+        """
+        Attache un index IVF sauvegardé s'il a été construit pour exactement
+        les mêmes entrées ; sinon la recherche exacte est conservée
+        """
+        try:
+            ann, metadata = IVFIndex.load(path)
+        except (OSError, KeyError, ValueError) as e:
+            logger.info(f"Index approximatif non chargé ({path}): {e}")
+            return False
+
+        if not np.array_equal(metadata.get('ids'), np.asarray(self.ids[:len(self.matrix)], dtype=np.int64)):
+            logger.warning("Index approximatif périmé (base modifiée), recherche exacte utilisée")
+            return False
+
+        ann.nprobe = getattr(settings, 'CHATBOT_ANN_NPROBE', ann.nprobe)
+        self.ann = ann
+        return True
+
+    def score(self, user_message: str) -> Optional[np.ndarray]:
+        """
+        Similarité cosinus du message avec toutes les questions
+        """
+        if not len(self.ids):
+            return None
+
+        return self._score_vector(self.encode([user_message])[0])
+
+    def score_batch(self, user_messages: List[str]) -> np.ndarray:
+        """
+        Similarité cosinus de plusieurs messages avec toutes les questions
+        (messages x entrées), en un seul produit de matrices
+        """
+        if not len(self.ids):
+            return np.zeros((len(user_messages), 0), dtype=np.float32)
+        return self.encode(user_messages) @ self.dense_vectors().T
+
+    def _score_vector(self, query: np.ndarray) -> np.ndarray:
+        if self.scales is None:
+            scores = self.matrix @ query
+        else:
+            scores = np.empty(len(self.matrix), dtype=np.float32)
+            for start in range(0, len(self.matrix), self.QUANTIZED_BLOCK_ROWS):
+                block = self.matrix[start:start + self.QUANTIZED_BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ query
+            scores *= self.scales
+
+        if self.extra is None:
+            return scores
+        return np.concatenate([scores, self.extra @ query])
+
+    def explain(self, user_message: str, positions: List[int]) -> List[Dict[str, float]]:
+        scores = self.score(user_message)
+        if scores is None:
+            return [{} for _ in positions]
+        return [{'cosine': float(scores[position])} for position in positions]
+
+    def top(self, user_message: str, k: int = 1) -> List[Tuple[int, float]]:
+        if not len(self.ids):
+            return []
+
+        query = self.encode([user_message])[0]
+        if self.ann is None:
+            return top_positions(self._score_vector(query), self.thresholds, k)
+
+        # Recherche approximative : seuils appliqués aux seuls voisins retournés
+        rows, scores = self.ann.search(query, max(k, self.ANN_CANDIDATES))
+        if self.extra is not None:
+            # Lignes ajoutées depuis la construction de l'index : comparées une à une
+            rows = np.concatenate([rows, np.arange(len(self.matrix), len(self.ids))])
+            scores = np.concatenate([scores, self.extra @ query])
+            order = np.lexsort((rows, -scores))
+            rows, scores = rows[order], scores[order]
+        passing = scores >= self.thresholds[rows]
+        return [(int(row), float(score)) for row, score in zip(rows[passing][:k], scores[passing][:k]) if score > 0]
@@ -0,0 +1,213 @@
+"""
+Caches du chatbot : correspondances indexées par message normalisé et
+réponses retrouvées par similarité des messages
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import numpy as np
+from django.conf import settings
+
+
+class LRUCache:
+    """
+    Cache borné, thread-safe, avec éviction LRU et expiration (TTL)
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, self._MISSING)
+            if item is self._MISSING:
+                self.misses += 1
+                return default
+
+            value, expires_at = item
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+class SemanticResponseCache:
+    """
+    Cache borné des réponses récentes, retrouvées par plus proche voisin :
+    un message dont le vecteur a une similarité cosinus d'au moins `cutoff`
+    avec celui d'un message déjà traité (même langue) reçoit la même réponse.
+
+    Les vecteurs (normalisés) sont rangés dans une matrice préallouée : une
+    recherche est un seul produit matrice-vecteur. Éviction de l'entrée la
+    moins récemment utilisée quand le cache est plein, expiration (TTL) et
+    vidage complet quand la version de la base de connaissances change.
+    """
+
+    def __init__(self, maxsize: int = 1024, cutoff: float = 0.9, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.cutoff = cutoff
+        self.ttl = ttl
+        self._vectors: Optional[np.ndarray] = None
+        self._values = [None] * maxsize
+        self._languages = np.full(maxsize, '', dtype=object)
+        # Dernière utilisation (-inf : emplacement libre) et expiration de chaque emplacement
+        self._used = np.full(maxsize, -np.inf)
+        self._expires = np.full(maxsize, np.inf)
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._hit_similarity = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._version is not None:
+                self._reset()
+            self._version = version
+
+    def _reset(self):
+        self._values = [None] * self.maxsize
+        self._used[:] = -np.inf
+        self._expires[:] = np.inf
+        self.invalidations += 1
+
+    def _similarities(self, vector: np.ndarray, language: str, now: float) -> Optional[np.ndarray]:
+        if self._vectors is None or self._vectors.shape[1] != len(vector):
+            return None
+        similarities = self._vectors @ vector
+        valid = (self._used > -np.inf) & (self._expires >= now) & (self._languages == language)
+        return np.where(valid, similarities, -np.inf)
+
+    def get(self, vector: np.ndarray, language: str, version) -> Any:
+        """
+        Réponse mise en cache pour le message le plus proche de `vector`,
+        ou None s'il n'y en a pas au-dessus du seuil de similarité
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            similarities = self._similarities(vector, language, now)
+            if similarities is not None:
+                slot = int(np.argmax(similarities))
+                if similarities[slot] >= self.cutoff:
+                    self._used[slot] = now
+                    self.hits += 1
+                    self._hit_similarity += float(similarities[slot])
+                    return self._values[slot]
+            self.misses += 1
+            return None
+
+    def set(self, vector: np.ndarray, language: str, version, value: Any):
+        now = time.monotonic()
+        with self._lock:
+            self._check_version(version)
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                # Première réponse (ou vecteurs d'une autre dimension) : matrice allouée
+                self._vectors = np.zeros((self.maxsize, len(vector)), dtype=np.float32)
+                self._used[:] = -np.inf
+
+            similarities = self._similarities(vector, language, now)
+            free = np.flatnonzero((self._used == -np.inf) | (self._expires < now))
+            if similarities is not None and similarities.max() >= self.cutoff:
+                # Message quasi identique déjà présent : sa réponse est remplacée
+                slot = int(np.argmax(similarities))
+            elif len(free):
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._used))
+                self.evictions += 1
+
+            self._vectors[slot] = vector
+            self._values[slot] = value
+            self._languages[slot] = language
+            self._used[slot] = now
+            self._expires[slot] = now + self.ttl if self.ttl else np.inf
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def __len__(self):
+        return int((self._used > -np.inf).sum())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': int((self._used > -np.inf).sum()),
+                'maxsize': self.maxsize,
+                'cutoff': self.cutoff,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'mean_hit_similarity': self._hit_similarity / self.hits if self.hits else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+# Correspondances (id de l'entrée, score) par (moteur, message normalisé)
+match_cache = LRUCache(
+    maxsize=getattr(settings, 'CHATBOT_MATCH_CACHE_SIZE', 2048),
+    ttl=getattr(settings, 'CHATBOT_MATCH_CACHE_TTL', 600),
+)
+
+# Réponses (texte, méthode, entrée utilisée) des messages récents, par similarité
+response_cache = SemanticResponseCache(
+    maxsize=getattr(settings, 'CHATBOT_RESPONSE_CACHE_SIZE', 1024),
+    cutoff=getattr(settings, 'CHATBOT_RESPONSE_CACHE_CUTOFF', 0.9),
+    ttl=getattr(settings, 'CHATBOT_RESPONSE_CACHE_TTL', 3600),
+)
@@ -0,0 +1,202 @@
+"""
+Classifieur de catégories des messages (Bayes naïf multinomial, NumPy seul)
+"""
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .normalization import normalize
+
+logger = logging.getLogger(__name__)
+
+# « Présentation - Variation 3 » -> « Présentation »
+_VARIATION_SUFFIX = re.compile(r'\s*-\s*Variation\s+\d+\s*$', re.IGNORECASE)
+
+
+def base_category(category: str) -> str:
+    """
+    Catégorie d'origine d'une entrée (sans le suffixe ajouté aux variations
+    générées par `manage.py generate_question_variations`)
+    """
+    return _VARIATION_SUFFIX.sub('', category or '').strip()
+
+
+def hashed_features(text: str) -> np.ndarray:
+    """
+    Empreintes (CRC32, stables d'un processus à l'autre) des n-grammes d'un
+    message normalisé : racines, paires de racines consécutives et
+    trigrammes de caractères de chaque mot (robustes aux fautes de frappe)
+    """
+    normalized = normalize(text)
+    grams = [f'w:{stem}' for stem in normalized.stems]
+    grams += [f'b:{a} {b}' for a, b in zip(normalized.stems, normalized.stems[1:])]
+    for token in normalized.tokens:
+        padded = f'#{token}#'
+        grams += [f'c:{padded[i:i + 3]}' for i in range(len(padded) - 2)]
+    return np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint32, count=len(grams))
+
+
+def hashed_vector(text: str, dimensions: int = 1024) -> np.ndarray:
+    """
+    Vecteur normalisé (float32) des n-grammes d'un message, projetés par
+    leur empreinte sur `dimensions` composantes : deux reformulations
+    proches partagent la plupart de leurs composantes
+    """
+    vector = np.bincount(hashed_features(text) % dimensions, minlength=dimensions).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class CategoryClassifier:
+    """
+    Bayes naïf multinomial sur n-grammes hachés.
+
+    Seules les empreintes vues à l'entraînement sont conservées (tableau
+    trié, recherche dichotomique) : le modèle reste petit quel que soit
+    l'espace de hachage, et les empreintes inconnues reçoivent la
+    probabilité lissée commune de chaque catégorie.
+    """
+
+    def __init__(self, categories: Sequence[str], features: np.ndarray, log_probs: np.ndarray,
+                 unseen_log_probs: np.ndarray, log_priors: np.ndarray):
+        self.categories = list(categories)
+        self.features = features
+        self.log_probs = log_probs
+        self.unseen_log_probs = unseen_log_probs
+        self.log_priors = log_priors
+
+    @classmethod
+    def fit(cls, texts: Iterable[str], labels: Iterable[str], alpha: float = 0.1) -> 'CategoryClassifier':
+        """
+        Entraîne le classifieur sur des exemples (texte, catégorie)
+        """
+        hashes = [hashed_features(text) for text in texts]
+        labels = list(labels)
+        categories = sorted(set(labels))
+        label_ids = np.array([categories.index(label) for label in labels], dtype=np.int64)
+
+        features = np.unique(np.concatenate(hashes)) if hashes else np.empty(0, dtype=np.uint32)
+        rows = np.concatenate([np.searchsorted(features, doc) for doc in hashes])
+        columns = np.repeat(label_ids, [len(doc) for doc in hashes])
+        counts = np.zeros((len(features), len(categories)), dtype=np.float64)
+        np.add.at(counts, (rows, columns), 1.0)
+
+        # Lissage de Laplace ; une case de plus pour les empreintes inconnues
+        denominators = counts.sum(axis=0) + alpha * (len(features) + 1)
+        log_probs = np.log((counts + alpha) / denominators).astype(np.float32)
+        unseen_log_probs = np.log(alpha / denominators).astype(np.float32)
+        log_priors = np.log(np.bincount(label_ids, minlength=len(categories)) / len(label_ids)).astype(np.float32)
+        return cls(categories, features, log_probs, unseen_log_probs, log_priors)
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        """
+        Probabilité de chaque catégorie (dans l'ordre de `categories`)
+        """
+        hashes = hashed_features(text)
+        positions = np.searchsorted(self.features, hashes)
+        found = positions < len(self.features)
+        found[found] = self.features[positions[found]] == hashes[found]
+
+        scores = self.log_priors + self.log_probs[positions[found]].sum(axis=0)
+        scores = scores + (len(hashes) - int(found.sum())) * self.unseen_log_probs
+        scores = np.exp(scores - scores.max())
+        return scores / scores.sum()
+
+    def top_categories(self, text: str, k: int = 3) -> List[Tuple[str, float]]:
+        """
+        Les k catégories les plus probables, la plus probable d'abord
+        """
+        probabilities = self.predict_proba(text)
+        k = min(k, len(probabilities))
+        best = np.argpartition(-probabilities, k - 1)[:k]
+        best = best[np.argsort(-probabilities[best], kind='stable')]
+        return [(self.categories[i], float(probabilities[i])) for i in best]
+
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Écriture dans un fichier temporaire puis remplacement atomique : les
+        # processus qui rechargent le classifieur ne lisent jamais un fichier partiel
+        temporary = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(temporary, 'wb') as f:
+            np.savez(
+                f, categories=np.array(self.categories), features=self.features, log_probs=self.log_probs,
+                unseen_log_probs=self.unseen_log_probs, log_priors=self.log_priors,
+            )
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: Path) -> 'CategoryClassifier':
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data['categories'].tolist(), data['features'], data['log_probs'],
+                data['unseen_log_probs'], data['log_priors'],
+            )
+
+
+_classifier_lock = threading.Lock()
+# Chemin -> (classifieur, signature du fichier chargé, instant du dernier contrôle)
+_classifiers: Dict[str, Tuple[Optional[CategoryClassifier], Optional[Tuple[int, int]], float]] = {}
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_category_classifier() -> Optional[CategoryClassifier]:
+    """
+    Classifieur entraîné par `manage.py train_category_classifier`
+    (CHATBOT_CLASSIFIER_PATH), gardé en mémoire par le processus.
+
+    La date du fichier est contrôlée au plus une fois toutes les
+    CHATBOT_KB_VERSION_CHECK_MS millisecondes : un nouvel entraînement est
+    chargé par tous les processus sans redémarrage.
+
+    Returns:
+        CategoryClassifier ou None s'il n'a pas été entraîné
+    """
+    path = getattr(settings, 'CHATBOT_CLASSIFIER_PATH', None)
+    if not path:
+        return None
+
+    path = str(path)
+    interval = getattr(settings, 'CHATBOT_KB_VERSION_CHECK_MS', 500) / 1000
+    cached = _classifiers.get(path)
+    if cached is not None and time.monotonic() - cached[2] < interval:
+        return cached[0]
+
+    with _classifier_lock:
+        signature = _file_signature(path)
+        cached = _classifiers.get(path)
+        if cached is not None and cached[1] == signature:
+            classifier = cached[0]
+        elif signature is None:
+            classifier = None
+        else:
+            try:
+                classifier = CategoryClassifier.load(path)
+            except FileNotFoundError:
+                classifier, signature = None, None
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Classifieur de catégories illisible ({path}): {e}")
+                classifier = None
+        _classifiers[path] = (classifier, signature, time.monotonic())
+        return classifier
+
+
+def reset_category_classifier():
+    """Oublie le classifieur chargé (après un nouvel entraînement)"""
+    with _classifier_lock:
+        _classifiers.clear()
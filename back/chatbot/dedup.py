@@ -0,0 +1,138 @@
+"""
+Détection des questions quasi dupliquées de la base de connaissances
+(MinHash et LSH par bandes, NumPy seul)
+"""
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+
+from .classifier import base_category, hashed_features
+from .normalization import question_hash
+
+# Nombre premier de Mersenne 2^31 - 1 : a * x + b tient dans un entier 64 bits
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+class KnowledgeRow(NamedTuple):
+    id: int
+    category: str
+    question: str
+    answer: str
+    language: str
+
+
+def lsh_parameters(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Nombre de bandes et de lignes par bande (bandes x lignes <= num_perm)
+    dont le seuil de collision (1 / bandes) ^ (1 / lignes) est le plus
+    proche de la similarité de Jaccard visée
+    """
+    candidates = [(bands, num_perm // bands) for bands in range(1, num_perm + 1)]
+    return min(candidates, key=lambda params: abs((1 / params[0]) ** (1 / params[1]) - threshold))
+
+
+class MinHasher:
+    """
+    Signatures MinHash de `num_perm` permutations (a * x + b mod p) des
+    n-grammes d'une question : la proportion de composantes égales de deux
+    signatures estime la similarité de Jaccard de leurs n-grammes
+    """
+
+    def __init__(self, num_perm: int = 128, seed: int = 0):
+        self.num_perm = num_perm
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        features = np.unique(hashed_features(text)).astype(np.uint64) % _PRIME
+        if not len(features):
+            return np.full(self.num_perm, int(_PRIME), dtype=np.uint32)
+        permuted = (features[:, None] * self._a[None, :] + self._b[None, :]) % _PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def signatures(self, texts: Iterable[str]) -> np.ndarray:
+        return np.array([self.signature(text) for text in texts], dtype=np.uint32).reshape(-1, self.num_perm)
+
+
+class DuplicateCluster(NamedTuple):
+    """Groupe de questions quasi identiques ayant la même réponse"""
+    keep: KnowledgeRow
+    redundant: List[KnowledgeRow]
+    similarity: float  # similarité estimée minimale avec l'entrée conservée
+
+
+def _keeper_order(row: KnowledgeRow):
+    # Entrée d'origine plutôt que variation générée, puis la plus ancienne
+    return base_category(row.category) != row.category, row.id
+
+
+def find_duplicates(rows: Sequence[KnowledgeRow], threshold: float = 0.8, num_perm: int = 128,
+                    seed: int = 0) -> Tuple[List[DuplicateCluster], Dict[str, int]]:
+    """
+    Regroupe les entrées dont les questions sont quasi identiques (Jaccard
+    estimée >= `threshold`) et dont les réponses normalisées sont égales.
+
+    Chaque bande des signatures est rangée dans une table de hachage (avec
+    la langue et l'empreinte de la réponse) : seules les entrées partageant
+    une bande sont comparées, en temps à peu près linéaire.
+
+    Returns:
+        Les groupes (du plus grand au plus petit) et des statistiques
+    """
+    hasher = MinHasher(num_perm, seed)
+    signatures = hasher.signatures(row.question for row in rows)
+    answers = [(row.language, question_hash(row.answer)) for row in rows]
+    bands, band_rows = lsh_parameters(num_perm, threshold)
+
+    candidates = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        block = np.ascontiguousarray(signatures[:, band * band_rows:(band + 1) * band_rows])
+        for position in range(len(rows)):
+            buckets[(answers[position], block[position].tobytes())].append(position)
+        # Chaque membre d'un seau est comparé au premier (les groupes se
+        # forment par transitivité) : pas de comparaisons quadratiques
+        for members in buckets.values():
+            candidates.update((members[0], other) for other in members[1:])
+
+    # Union-find des paires candidates dont la similarité estimée atteint le seuil
+    parent = list(range(len(rows)))
+
+    def find(position):
+        while parent[position] != position:
+            parent[position] = parent[parent[position]]
+            position = parent[position]
+        return position
+
+    confirmed = 0
+    for first, second in candidates:
+        if np.mean(signatures[first] == signatures[second]) >= threshold:
+            confirmed += 1
+            parent[find(first)] = find(second)
+
+    groups = defaultdict(list)
+    for position in range(len(rows)):
+        groups[find(position)].append(position)
+
+    clusters = []
+    for members in groups.values():
+        if len(members) < 2:
+            continue
+        members.sort(key=lambda position: _keeper_order(rows[position]))
+        keep = members[0]
+        similarity = min(float(np.mean(signatures[keep] == signatures[other])) for other in members[1:])
+        clusters.append(DuplicateCluster(rows[keep], [rows[other] for other in members[1:]], similarity))
+    clusters.sort(key=lambda cluster: (-len(cluster.redundant), cluster.keep.id))
+
+    stats = {
+        'entries': len(rows),
+        'bands': bands,
+        'rows_per_band': band_rows,
+        'candidate_pairs': len(candidates),
+        'confirmed_pairs': confirmed,
+        'clusters': len(clusters),
+        'redundant': sum(len(cluster.redundant) for cluster in clusters),
+    }
+    return clusters, stats
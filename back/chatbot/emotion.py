@@ -0,0 +1,162 @@
+"""
+Détection des émotions par lexique compilé (racine -> poids par émotion)
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .lexicon import EMOTION_KEYWORDS, NEGATIONS, POLARITY_WORDS
+from .normalization import NormalizedText, fold, normalize, stem
+
+# Confiance apportée par chaque mot d'une émotion (plafonnée à 1)
+KEYWORD_CONFIDENCE = 0.3
+# Polarité moyenne au-delà de laquelle un message est positif ou négatif
+POLARITY_CUTOFF = 0.3
+# Facteur appliqué à la polarité d'un mot nié (comme TextBlob)
+NEGATION_FACTOR = -0.5
+NEGATION_SCOPE = 2
+
+
+def inflections(word: str) -> List[str]:
+    """
+    Formes féminines et plurielles d'un mot du lexique : la racinisation
+    légère ne ramène pas « énervée », « surprise » ou « stressée » à la
+    racine de « énervé », « surpris » ou « stress »
+    """
+    if ' ' in word or not word.isalpha():
+        return [word]
+    forms = [word, word + 'e', word + 's', word + 'es']
+    if word.endswith('eux'):
+        forms += [word[:-1] + 'se', word[:-1] + 'ses']
+    elif word[-1] not in 'aeiouyé':
+        # Participes formés sur un nom : « stress » -> « stressée »
+        forms += [word + 'é', word + 'ée', word + 'és', word + 'ées']
+    return forms
+
+
+class EmotionLexicon:
+    """
+    Lexique des émotions compilé une fois : chaque racine de mot du lexique
+    a une ligne de poids (un par émotion, puis sa polarité et un indicateur
+    de mot polarisé). Un message est évalué en un seul passage sur ses
+    racines, un lot de messages par des sommes NumPy.
+    """
+
+    def __init__(self, emotion_keywords: Dict[str, List[str]] = EMOTION_KEYWORDS,
+                 polarity_words: Dict[str, float] = POLARITY_WORDS, negations: Iterable[str] = NEGATIONS):
+        self.emotions: Tuple[str, ...] = tuple(emotion_keywords)
+        self._polarity = len(self.emotions)
+        self._polar = self._polarity + 1
+
+        rows: Dict[str, np.ndarray] = {}
+
+        def row(word):
+            key = stem(fold(word))
+            if key not in rows:
+                rows[key] = np.zeros(len(self.emotions) + 2, dtype=np.float64)
+            return rows[key]
+
+        for column, keywords in enumerate(emotion_keywords.values()):
+            for keyword in keywords:
+                for form in inflections(keyword):
+                    row(form)[column] = 1.0
+        for word, polarity in polarity_words.items():
+            weights = row(word)
+            weights[self._polarity] = polarity
+            weights[self._polar] = 1.0
+
+        self.vocabulary: Dict[str, int] = {key: i for i, key in enumerate(rows)}
+        self.weights = np.array(list(rows.values()), dtype=np.float64).reshape(-1, len(self.emotions) + 2)
+        self.negations = frozenset(stem(fold(word)) for word in negations)
+
+    def _hits(self, stems: Sequence[str]) -> Tuple[List[int], List[bool]]:
+        """Lignes du lexique des racines d'un message, et si chacune est niée"""
+        ids, negated = [], []
+        scope = 0
+        for token in stems:
+            if token in self.negations:
+                scope = NEGATION_SCOPE
+                continue
+            i = self.vocabulary.get(token)
+            if i is not None:
+                ids.append(i)
+                negated.append(scope > 0)
+            scope = max(scope - 1, 0)
+        return ids, negated
+
+    def _apply_negation(self, weights: np.ndarray, negated: np.ndarray) -> np.ndarray:
+        # Un mot nié ne compte pour aucune émotion et sa polarité est inversée
+        weights = weights.copy()
+        weights[negated, :self._polarity] = 0.0
+        weights[negated, self._polarity] *= NEGATION_FACTOR
+        return weights
+
+    def scores(self, normalized: NormalizedText) -> np.ndarray:
+        """Nombre de mots de chaque émotion, somme des polarités et nombre de mots polarisés"""
+        ids, negated = self._hits(normalized.stems)
+        if not ids:
+            return np.zeros(self.weights.shape[1], dtype=np.float64)
+        weights = self.weights[ids]
+        if any(negated):
+            weights = self._apply_negation(weights, np.array(negated))
+        return weights.sum(axis=0)
+
+    def score_batch(self, normalized: Sequence[NormalizedText]) -> np.ndarray:
+        """Scores (messages x colonnes) d'un lot : une seule somme par colonne"""
+        ids, negated, owners = [], [], []
+        for position, text in enumerate(normalized):
+            hit_ids, hit_negated = self._hits(text.stems)
+            ids += hit_ids
+            negated += hit_negated
+            owners += [position] * len(hit_ids)
+
+        scores = np.zeros((len(normalized), self.weights.shape[1]), dtype=np.float64)
+        if ids:
+            weights = self._apply_negation(self.weights[ids], np.array(negated, dtype=bool))
+            np.add.at(scores, np.array(owners, dtype=np.int64), weights)
+        return scores
+
+    def decide(self, scores: np.ndarray) -> List[Tuple[str, float]]:
+        """
+        Émotion et confiance de chaque ligne de scores : l'émotion la plus
+        représentée, sinon la polarité moyenne (positive / négative /
+        neutre)
+        """
+        scores = np.atleast_2d(scores)
+        counts = scores[:, :self._polarity]
+        best = np.argmax(counts, axis=1)
+        best_count = counts[np.arange(len(scores)), best]
+        polarity = scores[:, self._polarity] / np.maximum(scores[:, self._polar], 1.0)
+
+        results = []
+        for emotion, count, value in zip(best, best_count.tolist(), polarity.tolist()):
+            if count > 0:
+                results.append((self.emotions[emotion], min(count * KEYWORD_CONFIDENCE, 1.0)))
+            elif value > POLARITY_CUTOFF:
+                results.append(('positive', abs(value)))
+            elif value < -POLARITY_CUTOFF:
+                results.append(('negative', abs(value)))
+            else:
+                results.append(('neutral', 0.5))
+        return results
+
+    def detect(self, text: Union[str, NormalizedText]) -> Tuple[str, float]:
+        normalized = text if isinstance(text, NormalizedText) else normalize(text)
+        return self.decide(self.scores(normalized))[0]
+
+    def detect_batch(self, texts: Sequence[Union[str, NormalizedText]]) -> List[Tuple[str, float]]:
+        normalized = [text if isinstance(text, NormalizedText) else normalize(text) for text in texts]
+        if not normalized:
+            return []
+        return self.decide(self.score_batch(normalized))
+
+
+_lexicon: Optional[EmotionLexicon] = None
+
+
+def get_emotion_lexicon() -> EmotionLexicon:
+    """Lexique compilé partagé par le processus"""
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = EmotionLexicon()
+    return _lexicon
@@ -0,0 +1,294 @@
+"""
+Évaluation hors ligne des moteurs de correspondance : précision top-1/top-k
+et latence sur un jeu de messages étiquetés (message, question attendue)
+"""
+import json
+import random
+import time
+from collections import namedtuple
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .index import MIN_DYNAMIC_THRESHOLD, CompiledEntry, KnowledgeIndex
+from .models import KnowledgeBase
+from .normalization import fold, normalize, question_hash
+
+LabeledExample = namedtuple('LabeledExample', ('message', 'expected'))
+
+
+def knowledge_rows(path: Optional[Path] = None, language: Optional[str] = None) -> List[dict]:
+    """
+    Entrées actives de la base de connaissances, ou celles d'un fichier JSON
+    au format de `manage.py import_knowledge_base` (sans accès à la base)
+
+    Returns:
+        List[dict]: champs de KnowledgeIndex.FIELDS et réponse de chaque entrée
+    """
+    if path is None:
+        queryset = KnowledgeBase.objects.filter(is_active=True)
+        if language:
+            queryset = queryset.filter(language=language)
+        return list(queryset.order_by('id').values(*KnowledgeIndex.FIELDS, 'answer'))
+
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [
+        {
+            'id': i,
+            'question': item['question'],
+            'keywords': item.get('keywords', ''),
+            'confidence_threshold': item.get('confidence_threshold', 0.7),
+            'question_hash': '',
+            'category': item.get('category', ''),
+            'answer': item['answer'],
+        }
+        for i, item in enumerate(data.get('knowledge_base', []), start=1)
+    ]
+
+
+def perturbations(question: str, rnd: random.Random) -> List[str]:
+    """
+    Reformulations bruitées d'une question, telles que tapées par un
+    utilisateur : sans accents ni ponctuation, avec une faute de frappe,
+    tronquée de son dernier mot
+    """
+    variants = [' '.join(fold(question).replace('?', ' ').replace('!', ' ').split())]
+
+    words = question.split()
+    typed = [i for i, word in enumerate(words) if len(word) >= 5 and word.isalpha()]
+    if typed:
+        i = rnd.choice(typed)
+        j = rnd.randrange(1, len(words[i]) - 2)
+        word = words[i]
+        words = words[:i] + [word[:j] + word[j + 1] + word[j] + word[j + 2:]] + words[i + 1:]
+        variants.append(' '.join(words))
+
+    words = question.rstrip(' ?!.').split()
+    if len(words) >= 3:
+        variants.append(' '.join(words[:-1]))
+
+    return [variant for variant in dict.fromkeys(variants) if variant and variant != question]
+
+
+def _base_row(rows: List[dict], base_keywords: Iterable[str]) -> Optional[dict]:
+    # Même choix que generate_question_variations.find_base_entry
+    for keyword in base_keywords:
+        for row in rows:
+            if keyword.lower() in (row['keywords'] or '').lower():
+                return row
+    return None
+
+
+def labeled_examples(rows: List[dict], seed: int = 42) -> List[LabeledExample]:
+    """
+    Jeu étiqueté construit sur les entrées : reformulations bruitées de
+    chaque question et variations de `manage.py generate_question_variations`
+    rattachées à leur entrée de base
+    """
+    from .management.commands.generate_question_variations import OREMI_VARIATIONS
+
+    rnd = random.Random(seed)
+    examples = [
+        LabeledExample(variant, row['question'])
+        for row in rows
+        for variant in perturbations(row['question'], rnd)
+    ]
+    for variation_group in OREMI_VARIATIONS:
+        base = _base_row(rows, variation_group['base_keywords'])
+        if base is not None:
+            examples += [LabeledExample(variation, base['question']) for variation in variation_group['variations']]
+    return examples
+
+
+def save_examples(examples: List[LabeledExample], path: Path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump([example._asdict() for example in examples], f, ensure_ascii=False, indent=2)
+
+
+def load_examples(path: Path) -> List[LabeledExample]:
+    with open(path, 'r', encoding='utf-8') as f:
+        return [LabeledExample(item['message'], item['expected']) for item in json.load(f)]
+
+
+def with_distractors(rows: List[dict], size: int, seed: int = 42) -> List[dict]:
+    """
+    Complète les entrées jusqu'à `size` avec des entrées synthétiques
+    composées de mots des questions de la base (concurrentes plausibles
+    pour mesurer le passage à l'échelle)
+    """
+    rnd = random.Random(seed)
+    words = sorted({word for row in rows for word in row['question'].split() if word.isalpha()})
+    next_id = max((row['id'] for row in rows), default=0) + 1
+
+    rows = list(rows)
+    for i in range(max(0, size - len(rows))):
+        rows.append({
+            'id': next_id + i,
+            'question': ' '.join(rnd.sample(words, min(len(words), rnd.randint(4, 8)))).capitalize() + ' ?',
+            'keywords': ', '.join(word.lower() for word in rnd.sample(words, min(len(words), 2))),
+            'confidence_threshold': 0.7,
+            'question_hash': '',
+            'category': 'Synthétique',
+            'answer': '',
+        })
+    return rows
+
+
+def build_index(rows: List[dict], language: Optional[str] = None) -> KnowledgeIndex:
+    index = KnowledgeIndex(CompiledEntry(*(row[field] for field in KnowledgeIndex.FIELDS)) for row in rows)
+    index.language = language
+    return index
+
+
+class MatcherEvaluation:
+    """
+    Résultat de l'évaluation d'un moteur sur un jeu étiqueté : précision
+    et latence (une mesure par message, recherche par paliers comprise)
+    """
+
+    def __init__(self, backend: str, size: int, k: int):
+        self.backend = backend
+        self.size = size
+        self.k = k
+        self.total = 0
+        self.top1 = 0
+        self.topk = 0
+        self.latencies: List[float] = []
+        self.tiers: Dict[str, int] = {}
+
+    @property
+    def throughput(self) -> float:
+        elapsed = sum(self.latencies)
+        return len(self.latencies) / elapsed if elapsed else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Latence (ms) au centile q"""
+        return float(np.percentile(self.latencies, q)) * 1000 if self.latencies else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'backend': self.backend,
+            'size': self.size,
+            'examples': self.total,
+            'top1_accuracy': self.top1 / self.total if self.total else 0.0,
+            f'top{self.k}_accuracy': self.topk / self.total if self.total else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'throughput': self.throughput,
+            'tiers': self.tiers,
+        }
+
+
+def answer_judge(rows: List[dict]) -> Callable[[LabeledExample, CompiledEntry], bool]:
+    """
+    Juge des correspondances : une entrée est juste si sa question est la
+    question attendue (ou le message lui-même, présent dans la base), ou si
+    elle donne la même réponse (questions reformulées d'une même entrée)
+    """
+    answers = {row['id']: row['answer'] for row in rows}
+    by_hash = {}
+    for row in rows:
+        by_hash.setdefault(question_hash(row['question']), row['answer'])
+
+    def is_correct(example: LabeledExample, entry: CompiledEntry) -> bool:
+        expected_hash = question_hash(example.expected)
+        if entry.question_hash in (expected_hash, question_hash(example.message)):
+            return True
+        expected_answer = by_hash.get(expected_hash)
+        return bool(expected_answer) and answers.get(entry.id) == expected_answer
+
+    return is_correct
+
+
+def evaluate(matcher, index: KnowledgeIndex, rows: List[dict], examples: List[LabeledExample],
+             k: int = 3) -> MatcherEvaluation:
+    """
+    Évalue `matcher` sur `index` (construit à partir de `rows`), voir
+    `answer_judge` pour ce qu'est une correspondance juste
+    """
+    is_correct = answer_judge(rows)
+    result = MatcherEvaluation(matcher.backend, len(index), k)
+    matcher.tiers.clear()
+    for example in examples:
+        started = time.perf_counter()
+        ranked = matcher._top(index, example.message, normalize(example.message), None, k)
+        result.latencies.append(time.perf_counter() - started)
+
+        correct = [is_correct(example, index.entries[position]) for position, _ in ranked]
+        result.total += 1
+        result.top1 += bool(correct and correct[0])
+        result.topk += any(correct)
+    result.tiers = dict(matcher.tiers.stats()['hits'])
+    return result
+
+
+ThresholdChoice = namedtuple('ThresholdChoice', ('threshold', 'precision', 'recall', 'support'))
+
+# Seuil calibré maximal : au-delà de 1.0, même le palier de correspondance
+# exacte (score 1.0) ne répondrait plus pour l'entrée
+MAX_THRESHOLD = 0.95
+
+
+def best_predictions(scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Meilleure position et son score pour chaque message (ligne de `scores`)
+    """
+    if not scores.shape[1]:
+        return np.zeros(len(scores), dtype=np.int64), np.zeros(len(scores), dtype=np.float32)
+    best = scores.argmax(axis=1)
+    return best, scores[np.arange(len(scores)), best]
+
+
+def calibrate_thresholds(best_scores: np.ndarray, correct: np.ndarray, groups: np.ndarray, target_recall: float = 0.9,
+                         min_threshold: float = MIN_DYNAMIC_THRESHOLD) -> Dict[object, ThresholdChoice]:
+    """
+    Seuil de confiance de chaque groupe (entrée ou catégorie) qui maximise
+    la précision des réponses tout en gardant au moins `target_recall` des
+    bonnes correspondances du groupe.
+
+    Les prédictions de chaque groupe sont triées par score décroissant ; les
+    précisions et rappels de toutes les coupes possibles sont obtenus par
+    sommes cumulées. Un groupe sans bonne correspondance n'est pas calibré
+    (seuil None : seuils actuels conservés) ; les seuils calibrés sont
+    plafonnés à MAX_THRESHOLD.
+
+    Le seuil calibré est le seul seuil de réponse de l'entrée : le matcher ne
+    classe en amont que les scores d'au moins MIN_DYNAMIC_THRESHOLD, commun à
+    toutes les entrées, et la meilleure entrée de `best_scores` est donc
+    celle qu'il retient.
+
+    Args:
+        best_scores: Score de la meilleure entrée de chaque message
+        correct: Meilleure entrée juste ou non, pour chaque message
+        groups: Groupe de la meilleure entrée de chaque message
+        min_threshold: Seuil minimal (score minimal classé par le matcher)
+    """
+    found = best_scores > 0
+    best_scores, correct, groups = best_scores[found], correct[found], groups[found]
+    order = np.lexsort((-best_scores, groups))
+    best_scores, correct, groups = best_scores[order], correct[order], groups[order]
+
+    choices = {}
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else []
+    for start, end in zip(starts, list(starts[1:]) + [len(groups)]):
+        scores, hits = best_scores[start:end], correct[start:end]
+        total = int(hits.sum())
+        if not total:
+            choices[groups[start]] = ThresholdChoice(None, 0.0, 0.0, len(scores))
+            continue
+
+        cumulative = np.cumsum(hits)
+        precision = cumulative / np.arange(1, len(scores) + 1)
+        recall = cumulative / total
+        # Coupes possibles : entre deux scores différents, ou après le dernier
+        cuts = np.flatnonzero(np.r_[scores[:-1] > scores[1:], True] & (recall >= target_recall))
+        # Meilleure précision, puis le plus grand rappel
+        cut = cuts[np.lexsort((-cuts, -precision[cuts]))[0]]
+        threshold = float(scores[cut + 1]) if cut + 1 < len(scores) else 0.0
+        choices[groups[start]] = ThresholdChoice(
+            min(max(min_threshold, threshold), MAX_THRESHOLD), float(precision[cut]), float(recall[cut]), len(scores),
+        )
+    return choices
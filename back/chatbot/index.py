@@ -0,0 +1,1275 @@
+"""
+Index en mémoire de la base de connaissances du chatbot
+"""
+import gc
+import json
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Max, Min
+
+try:
+    import fcntl
+except ImportError:  # Windows : chaque processus construit son propre index
+    fcntl = None
+
+from .automaton import AhoCorasick
+from .backends import EmbeddingKnowledgeMatrix, SparseKnowledgeMatrix, get_embedding_model
+from .cache import match_cache
+from .classifier import base_category, get_category_classifier
+from .lexicon import SALUTATIONS
+from .models import KnowledgeBase, KnowledgeBaseChange
+from .normalization import normalize, question_hash
+from .spelling import SymSpellIndex, vocabulary
+
+logger = logging.getLogger(__name__)
+
+
+def load_array(path: Path, mmap_mode: Optional[str] = 'r') -> np.ndarray:
+    """
+    Tableau sauvegardé par np.save, projeté en mémoire : vue ndarray sur la
+    projection (la sous-classe memmap ralentit chaque accès élément par élément)
+    """
+    return np.asarray(np.load(path, mmap_mode=mmap_mode))
+
+
+class StringTable:
+    """
+    Chaînes stockées à plat : un tampon UTF-8 et les bornes de chaque
+    chaîne, deux tableaux NumPy qui peuvent être projetés en mémoire depuis
+    le disque ; les chaînes ajoutées ensuite restent dans une liste Python
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self.offsets = offsets      # (len + 1,) bornes de chaque chaîne dans `blob`
+        self.blob = blob
+        self.added: List[str] = []
+        # Accès élément par élément sans passer par NumPy (bien plus rapide sur un memmap)
+        self._offsets = memoryview(offsets)
+        self._blob = memoryview(blob)
+
+    def __getstate__(self):
+        return {'offsets': self.offsets, 'blob': self.blob, 'added': self.added}
+
+    def __setstate__(self, state):
+        self.__init__(state['offsets'], state['blob'])
+        self.added = state['added']
+
+    @classmethod
+    def from_strings(cls, strings: Iterable[str]) -> 'StringTable':
+        encoded = [string.encode('utf-8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(data) for data in encoded], out=offsets[1:])
+        return cls(offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8))
+
+    def __len__(self):
+        return len(self.offsets) - 1 + len(self.added)
+
+    def __getitem__(self, i: int) -> str:
+        stored = len(self.offsets) - 1
+        if i < 0:
+            i += len(self)
+        if i >= stored:
+            return self.added[i - stored]
+        return str(self._blob[self._offsets[i]:self._offsets[i + 1]], 'utf-8')
+
+    def raw(self, i: int) -> bytes:
+        """Chaîne `i` encodée en UTF-8, sans décodage"""
+        stored = len(self.offsets) - 1
+        if i >= stored:
+            return self.added[i - stored].encode('utf-8')
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].tobytes()
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def shorter_than(self, ids: np.ndarray, size: int) -> List[int]:
+        """Ids parmi `ids` des chaînes d'au plus `size` octets (UTF-8)"""
+        stored = len(self.offsets) - 1
+        old = ids[ids < stored]
+        found = old[self.offsets[old + 1] - self.offsets[old] <= size].tolist()
+        return found + [i for i in ids[ids >= stored].tolist() if len(self.added[i - stored].encode('utf-8')) <= size]
+
+    def append(self, string: str):
+        self.added.append(string)
+
+    def save(self, directory: Path, name: str):
+        table = StringTable.from_strings(self) if self.added else self
+        np.save(directory / f'{name}_offsets.npy', table.offsets)
+        np.save(directory / f'{name}_blob.npy', table.blob)
+
+    @classmethod
+    def load(cls, directory: Path, name: str, mmap_mode: Optional[str] = 'r') -> 'StringTable':
+        return cls(
+            load_array(directory / f'{name}_offsets.npy', mmap_mode),
+            load_array(directory / f'{name}_blob.npy', mmap_mode),
+        )
+
+
+class SubstringIndex:
+    """
+    Index de trigrammes de caractères permettant de retrouver, sans balayer
+    toutes les chaînes, celles qui contiennent un motif ou qui sont contenues
+    dans un texte
+    """
+
+    GRAM_SIZE = 3
+
+    def __init__(self, strings: Iterable[str]):
+        strings = list(strings)
+        grams = defaultdict(list)    # trigramme -> ids des chaînes qui le contiennent
+        anchors = defaultdict(list)  # préfixe (<= 3 caractères) -> ids des chaînes
+        self._empty = []
+
+        for string_id, string in enumerate(strings):
+            if not string:
+                self._empty.append(string_id)
+                continue
+            anchors[string[:self.GRAM_SIZE]].append(string_id)
+            for gram in self._trigrams(string):
+                grams[gram].append(string_id)
+
+        # Stockage à plat (voir StringTable et PostingLists), projetable en mémoire
+        self.strings = StringTable.from_strings(strings)
+        self._grams = PostingLists.from_dict(grams)
+        self._anchors = PostingLists.from_dict(anchors)
+
+    def add(self, string: str) -> int:
+        """
+        Ajoute une chaîne à l'index et retourne son id
+        """
+        string_id = len(self.strings)
+        self.strings.append(string)
+        if not string:
+            self._empty.append(string_id)
+            return string_id
+        self._anchors.add(string[:self.GRAM_SIZE], string_id)
+        for gram in self._trigrams(string):
+            self._grams.add(gram, string_id)
+        return string_id
+
+    def save(self, directory: Path, name: str):
+        self.strings.save(directory, name)
+        self._grams.save(directory, f'{name}_grams')
+        self._anchors.save(directory, f'{name}_anchors')
+        with open(directory / f'{name}_empty.pkl', 'wb') as f:
+            pickle.dump(self._empty, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, directory: Path, name: str, mmap_mode: Optional[str] = 'r') -> 'SubstringIndex':
+        index = cls.__new__(cls)
+        index.strings = StringTable.load(directory, name, mmap_mode)
+        index._grams = PostingLists.load(directory, mmap_mode, f'{name}_grams')
+        index._anchors = PostingLists.load(directory, mmap_mode, f'{name}_anchors')
+        with open(directory / f'{name}_empty.pkl', 'rb') as f:
+            index._empty = pickle.load(f)
+        return index
+
+    @classmethod
+    def _trigrams(cls, text: str) -> Set[str]:
+        size = cls.GRAM_SIZE
+        return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+    def containing(self, pattern: str) -> List[int]:
+        """
+        Retourne les ids des chaînes qui contiennent `pattern`
+        """
+        if len(pattern) < self.GRAM_SIZE:
+            # Motif trop court pour l'index : balayage (cas rare, messages d'un ou deux caractères)
+            return [i for i, string in enumerate(self.strings) if pattern in string]
+
+        postings = []
+        for gram in self._trigrams(pattern):
+            posting = self._grams.array(gram)
+            if not len(posting):
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+            if not len(candidates):
+                return []
+        # Comparaison des octets UTF-8 : même résultat, sans décoder les chaînes
+        encoded = pattern.encode('utf-8')
+        return [i for i in candidates.tolist() if encoded in self.strings.raw(i)]
+
+    def contained_in(self, text: str) -> List[int]:
+        """
+        Retourne les ids des chaînes qui apparaissent dans `text`
+        """
+        found = list(self._empty)
+        encoded = text.encode('utf-8')
+        seen_anchors = set()
+        for start in range(len(text)):
+            for size in range(1, self.GRAM_SIZE + 1):
+                anchor = text[start:start + size]
+                if len(anchor) < size:
+                    break
+                if anchor in seen_anchors:
+                    continue
+                seen_anchors.add(anchor)
+                # Seules les chaînes assez courtes pour être contenues sont comparées
+                for string_id in self.strings.shorter_than(self._anchors.array(anchor), len(encoded)):
+                    if self.strings.raw(string_id) in encoded:
+                        found.append(string_id)
+        return found
+
+
+class PostingLists:
+    """
+    Listes de positions par terme, stockées à plat (format CSR) : deux
+    tableaux NumPy qui peuvent être projetés en mémoire depuis le disque
+    """
+
+    def __init__(self, terms: Dict[str, int], indptr: np.ndarray, positions: np.ndarray):
+        self.terms = terms          # terme -> ligne
+        self.indptr = indptr        # (len(terms) + 1,) bornes de chaque liste dans `positions`
+        self.positions = positions
+        # Positions ajoutées depuis la construction (mises à jour incrémentales)
+        self.added: Dict[str, List[int]] = {}
+
+    @classmethod
+    def from_dict(cls, postings: Dict[str, List[int]]) -> 'PostingLists':
+        terms, indptr, positions = {}, [0], []
+        for term, term_positions in postings.items():
+            terms[term] = len(terms)
+            positions.extend(term_positions)
+            indptr.append(len(positions))
+        return cls(terms, np.array(indptr, dtype=np.int64), np.array(positions, dtype=np.int32))
+
+    def __len__(self):
+        return len(self.terms.keys() | self.added.keys())
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.terms or term in self.added
+
+    def get(self, term: str, default=()):
+        row = self.terms.get(term)
+        added = self.added.get(term)
+        if row is None:
+            return list(added) if added else default
+        positions = self.positions[self.indptr[row]:self.indptr[row + 1]].tolist()
+        return positions + added if added else positions
+
+    def array(self, term: str) -> np.ndarray:
+        """Positions d'un terme sous forme de tableau (vue sur le stockage à plat si rien n'a été ajouté)"""
+        row = self.terms.get(term)
+        positions = self.positions[self.indptr[row]:self.indptr[row + 1]] if row is not None else self.positions[:0]
+        added = self.added.get(term)
+        return np.concatenate([positions, np.array(added, dtype=positions.dtype)]) if added else positions
+
+    def add(self, term: str, position: int):
+        self.added.setdefault(term, []).append(position)
+
+    def save(self, directory: Path, name: str = 'postings'):
+        postings = self
+        if self.added:
+            # Les ajouts sont fusionnés dans les tableaux sauvegardés
+            postings = PostingLists.from_dict({term: self.get(term) for term in self.terms.keys() | self.added.keys()})
+        with open(directory / f'{name}_terms.pkl', 'wb') as f:
+            pickle.dump(postings.terms, f, protocol=pickle.HIGHEST_PROTOCOL)
+        np.save(directory / f'{name}_indptr.npy', postings.indptr)
+        np.save(directory / f'{name}_positions.npy', postings.positions)
+
+    @classmethod
+    def load(cls, directory: Path, mmap_mode: Optional[str] = 'r', name: str = 'postings') -> 'PostingLists':
+        with open(directory / f'{name}_terms.pkl', 'rb') as f:
+            terms = pickle.load(f)
+        return cls(
+            terms,
+            load_array(directory / f'{name}_indptr.npy', mmap_mode),
+            load_array(directory / f'{name}_positions.npy', mmap_mode),
+        )
+
+
+class HashIndex:
+    """
+    Positions par empreinte de question : empreintes triées et positions
+    correspondantes (deux tableaux projetables en mémoire, recherche
+    dichotomique) ; les positions ajoutées ensuite restent en Python
+    """
+
+    def __init__(self, hashes: np.ndarray, positions: np.ndarray):
+        self.hashes = hashes        # empreintes (ASCII) triées
+        self.positions = positions
+        self.added: Dict[str, List[int]] = {}
+
+    @classmethod
+    def from_dict(cls, positions: Dict[str, List[int]]) -> 'HashIndex':
+        pairs = sorted((key.encode('ascii'), position) for key, key_positions in positions.items()
+                       for position in key_positions)
+        return cls(
+            np.array([key for key, _ in pairs], dtype='S40'),
+            np.array([position for _, position in pairs], dtype=np.int32),
+        )
+
+    def get(self, key: str, default=()):
+        encoded = key.encode('ascii')
+        start = int(np.searchsorted(self.hashes, encoded, side='left'))
+        end = int(np.searchsorted(self.hashes, encoded, side='right'))
+        positions = self.positions[start:end].tolist() + self.added.get(key, [])
+        return positions or default
+
+    def add(self, key: str, position: int):
+        self.added.setdefault(key, []).append(position)
+
+    def save(self, directory: Path, name: str):
+        table = self
+        if self.added:
+            merged = defaultdict(list)
+            for key, position in zip(self.hashes.tolist(), self.positions.tolist()):
+                merged[key.decode('ascii')].append(position)
+            for key, positions in self.added.items():
+                merged[key].extend(positions)
+            table = HashIndex.from_dict(merged)
+        np.save(directory / f'{name}_hashes.npy', table.hashes)
+        np.save(directory / f'{name}_positions.npy', table.positions)
+
+    @classmethod
+    def load(cls, directory: Path, name: str, mmap_mode: Optional[str] = 'r') -> 'HashIndex':
+        return cls(
+            load_array(directory / f'{name}_hashes.npy', mmap_mode),
+            load_array(directory / f'{name}_positions.npy', mmap_mode),
+        )
+
+
+# Score minimal d'une entrée pour être classée par le matcher, le même pour
+# toutes : le seuil de confiance de l'entrée est le seul seuil de réponse
+MIN_DYNAMIC_THRESHOLD = 0.2
+
+
+class CompiledEntry:
+    """
+    Entrée compilée de la base de connaissances : tout ce dont le calcul de
+    score a besoin, pré-calculé une fois pour toutes (question et mots-clés
+    normalisés comme les messages, voir `normalization.normalize`)
+    """
+
+    __slots__ = (
+        'id', 'question', 'question_text', 'question_hash', 'question_stems', 'keywords',
+        'is_greeting', 'confidence_threshold', 'dynamic_threshold', 'category',
+    )
+
+    def __init__(self, id: int, question: str, keywords: str, confidence_threshold: float, stored_hash: str = '',
+                 category: str = ''):
+        self.id = id
+        self.question = question
+        normalized = normalize(question)
+        self.question_text = normalized.text
+        # Empreinte toujours recalculée avec la normalisation actuelle : celle
+        # stockée en base (`stored_hash`) peut dater d'une normalisation antérieure
+        self.question_hash = question_hash(normalized)
+        self.question_stems = frozenset(normalized.stems)
+        keywords = [normalize(k).text for k in keywords.split(',')] if keywords else []
+        self.keywords = tuple(k for k in keywords if k)
+        self.is_greeting = any(sal in keyword for keyword in self.keywords for sal in SALUTATIONS)
+        self.confidence_threshold = confidence_threshold
+        # Seuil appliqué par le matcher avant le seuil de confiance : un plancher
+        # commun, et non une fraction du seuil de confiance (qui ferait dépendre
+        # le classement lui-même des seuils calibrés par `calibrate_thresholds`)
+        self.dynamic_threshold = MIN_DYNAMIC_THRESHOLD
+        # Catégorie d'origine (sans suffixe de variation), prédite par le classifieur
+        self.category = base_category(category)
+
+    def __reduce__(self):
+        # Sérialisation compacte (un tuple par entrée) : rechargement bien plus
+        # rapide que l'état par défaut des objets à __slots__
+        return _restore_entry, tuple(getattr(self, name) for name in self.__slots__)
+
+
+def _restore_entry(*values) -> CompiledEntry:
+    entry = CompiledEntry.__new__(CompiledEntry)
+    for name, value in zip(CompiledEntry.__slots__, values):
+        setattr(entry, name, value)
+    return entry
+
+
+def keyword_share(entry: CompiledEntry) -> float:
+    """
+    Part maximale d'un mot-clé de l'entrée dans sa proportion de mots-clés
+    présents (un mot-clé répété compte plusieurs fois)
+    """
+    return max(Counter(entry.keywords).values()) / len(entry.keywords) if entry.keywords else 0.0
+
+
+class EntryTable:
+    """
+    Entrées compilées stockées en colonnes : nombres dans des tableaux NumPy,
+    textes dans des StringTable, tous projetés en mémoire depuis le disque.
+    Une entrée n'est recréée (CompiledEntry) qu'à l'accès, et aucun
+    processus ne charge ni ne copie l'ensemble des entrées ; celles
+    remplacées ou ajoutées par mise à jour incrémentale restent en Python.
+    """
+
+    NUMBERS = {'id': np.int64, 'confidence_threshold': np.float64, 'dynamic_threshold': np.float64,
+               'is_greeting': np.bool_}
+    TEXTS = ('question', 'question_text', 'question_hash', 'category', 'question_stems', 'keywords')
+    # Séparateur des racines et des mots-clés (absent des textes normalisés)
+    SEPARATOR = '\n'
+
+    def __init__(self, columns: Dict[str, np.ndarray], texts: Dict[str, StringTable]):
+        self.columns = columns
+        self.texts = texts
+        # Accès élément par élément sans passer par NumPy (voir StringTable)
+        self._numbers = {name: memoryview(column) for name, column in columns.items()}
+        self._stored = len(columns['id'])
+        self._replaced: Dict[int, CompiledEntry] = {}
+        self._added: List[CompiledEntry] = []
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[CompiledEntry]) -> 'EntryTable':
+        entries = list(entries)
+        columns = {
+            name: np.array([getattr(entry, name) for entry in entries], dtype=dtype)
+            for name, dtype in cls.NUMBERS.items()
+        }
+        texts = {name: StringTable.from_strings(cls._text(entry, name) for entry in entries) for name in cls.TEXTS}
+        return cls(columns, texts)
+
+    @classmethod
+    def _text(cls, entry: CompiledEntry, name: str) -> str:
+        value = getattr(entry, name)
+        if name == 'question_stems':
+            return cls.SEPARATOR.join(sorted(value))
+        if name == 'keywords':
+            return cls.SEPARATOR.join(value)
+        return value
+
+    def __len__(self):
+        return self._stored + len(self._added)
+
+    def __getitem__(self, position: int) -> CompiledEntry:
+        if position < 0:
+            position += len(self)
+        if position >= self._stored:
+            return self._added[position - self._stored]
+        entry = self._replaced.get(position)
+        if entry is not None:
+            return entry
+
+        entry = CompiledEntry.__new__(CompiledEntry)
+        for name, column in self._numbers.items():
+            setattr(entry, name, column[position])
+        for name in self.TEXTS:
+            setattr(entry, name, self.texts[name][position])
+        entry.question_stems = frozenset(entry.question_stems.split(self.SEPARATOR)) if entry.question_stems else frozenset()
+        entry.keywords = tuple(entry.keywords.split(self.SEPARATOR)) if entry.keywords else ()
+        return entry
+
+    def __setitem__(self, position: int, entry: CompiledEntry):
+        if position >= self._stored:
+            self._added[position - self._stored] = entry
+        else:
+            self._replaced[position] = entry
+
+    def __iter__(self):
+        return (self[position] for position in range(len(self)))
+
+    def append(self, entry: CompiledEntry):
+        self._added.append(entry)
+
+    def ids(self) -> List[int]:
+        """Ids de toutes les positions, sans recréer les entrées"""
+        ids = self.columns['id'].tolist()
+        for position, entry in self._replaced.items():
+            ids[position] = entry.id
+        return ids + [entry.id for entry in self._added]
+
+    def save(self, directory: Path):
+        table = EntryTable.from_entries(self) if self._replaced or self._added else self
+        for name, column in table.columns.items():
+            np.save(directory / f'entries_{name}.npy', column)
+        for name, texts in table.texts.items():
+            texts.save(directory, f'entries_{name}')
+
+    @classmethod
+    def load(cls, directory: Path, mmap_mode: Optional[str] = 'r') -> 'EntryTable':
+        return cls(
+            {name: load_array(directory / f'entries_{name}.npy', mmap_mode) for name in cls.NUMBERS},
+            {name: StringTable.load(directory, f'entries_{name}', mmap_mode) for name in cls.TEXTS},
+        )
+
+
+class KnowledgeIndex:
+    """
+    Index inversé (racine -> entrées) construit à partir des questions et des
+    mots-clés de la base de connaissances.
+
+    Il sert à restreindre le calcul de score aux seules entrées susceptibles
+    d'obtenir un score non nul pour un message donné.
+    """
+
+    FIELDS = ('id', 'question', 'keywords', 'confidence_threshold', 'question_hash', 'category')
+
+    # Petites structures Python sauvegardées telles quelles (pickle) par `save` ;
+    # les entrées, les questions, les empreintes et les tableaux NumPy (listes
+    # de positions, matrices) sont stockés à plat et projetés en mémoire
+    PICKLED_ATTRIBUTES = (
+        'greeting_positions', '_keyword_ids', '_keyword_entries',
+        '_keywords', '_category_positions', 'automaton', '_extra_keywords', 'removed', '_speller',
+    )
+    # Tableaux de `entry_arrays`, sauvegardés avec l'index
+    ENTRY_ARRAYS = ('entry_ids', 'entry_stems', 'entry_keyword_shares', 'entry_thresholds')
+
+    def __init__(self, entries: Iterable[CompiledEntry], previous: Optional['KnowledgeIndex'] = None):
+        self.entries = list(entries)
+        postings: Dict[str, List[int]] = defaultdict(list)
+        self.greeting_positions: List[int] = []
+
+        keyword_ids: Dict[str, int] = {}
+        self._keyword_entries: List[List[int]] = []
+        # Positions par empreinte de question normalisée (correspondance exacte)
+        exact: Dict[str, List[int]] = defaultdict(list)
+        # Positions par catégorie (restriction aux catégories prédites)
+        self._category_positions: Dict[str, List[int]] = defaultdict(list)
+
+        for position, entry in enumerate(self.entries):
+            exact[entry.question_hash].append(position)
+            self._category_positions[entry.category].append(position)
+            for word in entry.question_stems:
+                postings[word].append(position)
+
+            for keyword in set(entry.keywords):
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(self._keyword_entries)
+                    self._keyword_entries.append([])
+                self._keyword_entries[keyword_ids[keyword]].append(position)
+
+            if entry.is_greeting:
+                self.greeting_positions.append(position)
+
+        self.postings = PostingLists.from_dict(postings)
+        self._exact = HashIndex.from_dict(exact)
+        self._keyword_ids = keyword_ids
+        self._keywords = SubstringIndex(keyword_ids)
+        self._questions = SubstringIndex(entry.question_text for entry in self.entries)
+
+        # Un seul automate pour tous les mots-clés de la base
+        self.automaton = AhoCorasick(keyword_ids)
+        # Mots-clés ajoutés par mise à jour incrémentale, absents de l'automate
+        self._extra_keywords: List[str] = []
+        # Positions des entrées supprimées ou remplacées depuis la construction
+        self.removed: Set[int] = set()
+
+        self._init_caches(previous)
+
+    def _init_caches(self, previous: Optional['KnowledgeIndex']):
+        # Langue des entrées, version du journal des modifications et empreinte
+        # de la base reflétées par l'index
+        self.language = None
+        self.version = 0
+        self.fingerprint = None
+        # Version sauvegardée d'où l'index a été rechargé (index IVF de ses plongements)
+        self.directory: Optional[Path] = None
+        self._positions_by_id: Optional[Dict[int, int]] = None
+
+        self._sparse_matrices = {}
+        self._sparse_lock = threading.Lock()
+
+        self._speller = None
+        self._speller_lock = threading.Lock()
+
+        self._entry_arrays = None
+        self._arrays_lock = threading.Lock()
+
+        # Les plongements de l'index précédent sont réutilisés pour les lignes inchangées
+        self._embeddings = None
+        self._previous_embeddings = (previous._embeddings or previous._previous_embeddings) if previous is not None else None
+        self._embedding_lock = threading.Lock()
+
+    @classmethod
+    def from_queryset(cls, queryset, previous: Optional['KnowledgeIndex'] = None) -> 'KnowledgeIndex':
+        """
+        Compile les entrées d'un queryset sans instancier d'objets ORM
+        """
+        rows = list(queryset.values_list(*cls.FIELDS))
+        entries = [CompiledEntry(*row) for row in rows]
+        stored = cls.FIELDS.index('question_hash')
+        stale = sum(1 for row, entry in zip(rows, entries) if row[stored] and row[stored] != entry.question_hash)
+        if stale:
+            logger.warning(
+                f"{stale} empreintes de questions stockées ne correspondent plus à la normalisation "
+                f"(recalculées dans l'index ; réenregistrer les entrées pour mettre la base à jour)"
+            )
+        return cls(entries, previous)
+
+    def __len__(self):
+        return len(self.entries) - len(self.removed)
+
+    def apply_delta(self, entries: Iterable[CompiledEntry], changed_ids: Iterable[int]):
+        """
+        Met à jour l'index en place pour des entrées modifiées ou supprimées,
+        sans reconstruction :
+        - seuil ou statut seul modifié : l'entrée est remplacée à sa position
+        - question ou mots-clés modifiés : l'ancienne position est retirée et
+          l'entrée est ajoutée en fin d'index (listes de positions, mots-clés,
+          correcteur, matrices et plongements)
+
+        Les lecteurs concurrents voient soit l'ancien, soit le nouvel état de
+        chaque structure : les entrées sont ajoutées avant d'être référencées
+        et les moteurs vectoriels sont remplacés par des copies à jour.
+
+        Args:
+            entries: Entrées compilées actives parmi `changed_ids`
+            changed_ids: Ids de toutes les entrées modifiées, supprimées ou désactivées
+        """
+        if self._positions_by_id is None:
+            ids = self.entries.ids() if isinstance(self.entries, EntryTable) else [entry.id for entry in self.entries]
+            self._positions_by_id = {
+                entry_id: position for position, entry_id in enumerate(ids) if position not in self.removed
+            }
+
+        active = {entry.id: entry for entry in entries}
+        for entry_id in set(changed_ids):
+            position = self._positions_by_id.get(entry_id)
+            entry = active.get(entry_id)
+            if position is not None and entry is not None and self._same_text(self.entries[position], entry):
+                self.entries[position] = entry
+                self._set_threshold(position, entry.dynamic_threshold)
+                continue
+            if position is not None:
+                self._remove(position)
+            if entry is not None:
+                self._append(entry)
+
+    @staticmethod
+    def _same_text(old: CompiledEntry, new: CompiledEntry) -> bool:
+        return (old.question == new.question and old.keywords == new.keywords
+                and old.is_greeting == new.is_greeting and old.category == new.category)
+
+    def _set_threshold(self, position: int, threshold: float):
+        with self._arrays_lock:
+            if self._entry_arrays is not None:
+                *columns, thresholds = self._entry_arrays
+                thresholds = np.array(thresholds)
+                thresholds[position] = threshold
+                self._entry_arrays = (*columns, thresholds)
+        with self._sparse_lock:
+            for weighting, matrix in list(self._sparse_matrices.items()):
+                self._sparse_matrices[weighting] = matrix.with_threshold(position, threshold)
+        with self._embedding_lock:
+            if self._embeddings is not None:
+                self._embeddings = self._embeddings.with_threshold(position, threshold)
+
+    def _remove(self, position: int):
+        self.removed.add(position)
+        del self._positions_by_id[self.entries[position].id]
+        # Un seuil infini exclut la ligne des moteurs vectoriels
+        self._set_threshold(position, np.inf)
+
+    def _append(self, entry: CompiledEntry):
+        with self._arrays_lock:
+            if self._entry_arrays is not None:
+                values = (entry.id, len(entry.question_stems), keyword_share(entry), entry.dynamic_threshold)
+                self._entry_arrays = tuple(np.append(array, value) for array, value in zip(self._entry_arrays, values))
+        position = len(self.entries)
+        self.entries.append(entry)
+        self._positions_by_id[entry.id] = position
+
+        self._exact.add(entry.question_hash, position)
+        self._category_positions[entry.category].append(position)
+        for word in entry.question_stems:
+            self.postings.add(word, position)
+        for keyword in set(entry.keywords):
+            if keyword not in self._keyword_ids:
+                self._keyword_entries.append([])
+                self._keywords.add(keyword)
+                self._extra_keywords.append(keyword)
+                self._keyword_ids[keyword] = len(self._keyword_entries) - 1
+            self._keyword_entries[self._keyword_ids[keyword]].append(position)
+        if entry.is_greeting:
+            self.greeting_positions.append(position)
+        self._questions.add(entry.question_text)
+
+        with self._speller_lock:
+            if self._speller is not None:
+                self._speller.add(vocabulary([entry]))
+        with self._sparse_lock:
+            for weighting, matrix in list(self._sparse_matrices.items()):
+                self._sparse_matrices[weighting] = matrix.with_entry(entry)
+        with self._embedding_lock:
+            if self._embeddings is not None and self._embeddings.model is not None:
+                self._embeddings = self._embeddings.with_entry(entry)
+            elif self._embeddings is not None:
+                # Plongements rechargés du disque sans modèle rattaché : recalcul à la
+                # prochaine utilisation, en réutilisant toutes les lignes inchangées
+                self._previous_embeddings, self._embeddings = self._embeddings, None
+
+    def save(self, directory: Path):
+        """
+        Écrit l'index et les moteurs déjà construits (matrices creuses,
+        plongements, correcteur) dans `directory`
+        """
+        with open(directory / 'snapshot.pkl', 'wb') as f:
+            pickle.dump({name: getattr(self, name) for name in self.PICKLED_ATTRIBUTES}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        entries = self.entries if isinstance(self.entries, EntryTable) else EntryTable.from_entries(self.entries)
+        entries.save(directory)
+        self._questions.save(directory, 'questions')
+        self._exact.save(directory, 'exact')
+        for name, array in zip(self.ENTRY_ARRAYS, self.entry_arrays()):
+            np.save(directory / f'{name}.npy', array)
+        self.postings.save(directory)
+        for matrix in self._sparse_matrices.values():
+            matrix.save(directory)
+        if self._embeddings is not None:
+            self._embeddings.save(directory)
+
+    @classmethod
+    def load(cls, directory: Path, mmap_mode: Optional[str] = 'r') -> 'KnowledgeIndex':
+        """
+        Recharge un index écrit par `save`, sans accès à la base ; les
+        tableaux sont projetés en mémoire (pages partagées entre processus)
+        """
+        index = cls.__new__(cls)
+        index._init_caches(None)
+        # Le ramasse-miettes se déclencherait sans cesse pendant la création
+        # des millions d'objets du pickle, tous vivants
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(directory / 'snapshot.pkl', 'rb') as f:
+                state = pickle.load(f)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        for name, value in state.items():
+            setattr(index, name, value)
+        index.entries = EntryTable.load(directory, mmap_mode)
+        index._questions = SubstringIndex.load(directory, 'questions', mmap_mode)
+        index._exact = HashIndex.load(directory, 'exact', mmap_mode)
+        index._entry_arrays = tuple(load_array(directory / f'{name}.npy', mmap_mode) for name in cls.ENTRY_ARRAYS)
+        index.postings = PostingLists.load(directory, mmap_mode)
+        for weighting in SparseKnowledgeMatrix.WEIGHTINGS:
+            matrix = SparseKnowledgeMatrix.load(directory, weighting, mmap_mode)
+            if matrix is not None:
+                index._sparse_matrices[weighting] = matrix
+        index._embeddings = EmbeddingKnowledgeMatrix.load(directory, mmap_mode)
+        index.directory = Path(directory)
+        return index
+
+    def sparse_matrix(self, weighting: str):
+        """
+        Matrice creuse des entrées pour le moteur vectoriel, construite à la
+        première utilisation puis conservée avec l'index
+        """
+        with self._sparse_lock:
+            if weighting not in self._sparse_matrices:
+                matrix = SparseKnowledgeMatrix(self.entries, weighting)
+                matrix.thresholds[list(self.removed)] = np.inf
+                self._sparse_matrices[weighting] = matrix
+            return self._sparse_matrices[weighting]
+
+    def speller(self) -> SymSpellIndex:
+        """
+        Correcteur orthographique construit sur le vocabulaire de l'index
+        """
+        with self._speller_lock:
+            if self._speller is None:
+                self._speller = SymSpellIndex(vocabulary(self.entries))
+            return self._speller
+
+    def entry_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Tableaux par position, calculés à la première utilisation : id,
+        nombre de racines de la question, part maximale d'un mot-clé dans la
+        proportion de mots-clés présents (mots-clés répétés compris) et seuil
+        dynamique (infini pour les positions retirées)
+        """
+        with self._arrays_lock:
+            if self._entry_arrays is None:
+                ids = np.array(self.entries.ids() if isinstance(self.entries, EntryTable)
+                               else [entry.id for entry in self.entries], dtype=np.int64)
+                stems = np.array([len(entry.question_stems) for entry in self.entries], dtype=np.float64)
+                keyword_shares = np.array([keyword_share(entry) for entry in self.entries], dtype=np.float64)
+                thresholds = np.array([entry.dynamic_threshold for entry in self.entries], dtype=np.float64)
+                thresholds[list(self.removed)] = np.inf
+                self._entry_arrays = ids, stems, keyword_shares, thresholds
+            return self._entry_arrays
+
+    def embedding_matrix(self, model, quantize: bool = False) -> EmbeddingKnowledgeMatrix:
+        """
+        Plongements des questions, calculés à la première utilisation en ne
+        ré-encodant que les lignes nouvelles ou modifiées depuis l'index précédent
+        """
+        with self._embedding_lock:
+            if self._embeddings is not None and self._embeddings.model is None:
+                # Plongements rechargés depuis le disque : le modèle est rattaché à la première utilisation
+                self._embeddings.model = model
+                self._load_ann()
+
+            if self._embeddings is None or self._embeddings.quantize != quantize:
+                previous = self._embeddings or self._previous_embeddings
+                self._embeddings = EmbeddingKnowledgeMatrix(self.entries, model, quantize, previous)
+                self._embeddings.thresholds[list(self.removed)] = np.inf
+                self._previous_embeddings = None
+                self._load_ann()
+            return self._embeddings
+
+    def _load_ann(self):
+        # Index IVF écrit par `manage.py build_ann_index` dans la version sauvegardée
+        if self.directory is not None and len(self.entries) >= getattr(settings, 'CHATBOT_ANN_MIN_ENTRIES', 50000):
+            self._embeddings.load_ann(self.directory / ANN_DIRECTORY)
+
+    def scan(self, text: str) -> FrozenSet[str]:
+        """
+        Relève en un seul passage les mots-clés (sans accents) présents
+        dans un texte normalisé
+        """
+        hits = self.automaton.find_all(text)
+        if self._extra_keywords:
+            hits |= {keyword for keyword in self._extra_keywords if keyword in text}
+        return hits
+
+    def exact(self, text_hash: str) -> Optional[int]:
+        """
+        Position de l'entrée dont la question normalisée a l'empreinte
+        `text_hash` (la plus ancienne s'il y en a plusieurs), ou None
+        """
+        positions = self.exact_positions(text_hash)
+        return min(positions, key=lambda position: self.entries[position].id) if positions else None
+
+    def exact_positions(self, text_hash: str) -> List[int]:
+        """Positions de toutes les entrées dont la question normalisée a l'empreinte `text_hash`"""
+        return [position for position in self._exact.get(text_hash) if position not in self.removed]
+
+    def category_candidates(self, categories: Iterable[str]) -> List[int]:
+        """
+        Positions des entrées appartenant à l'une des catégories données
+        """
+        found = set()
+        for category in categories:
+            found.update(self._category_positions.get(category, ()))
+        if self.removed:
+            found -= self.removed
+        return sorted(found)
+
+    def partial_keywords(self, long_words: Iterable[str]) -> Set[str]:
+        """
+        Mots-clés contenant au moins un des mots donnés (correspondance partielle)
+        """
+        strings = self._keywords.strings
+        return {strings[keyword_id] for word in long_words for keyword_id in self._keywords.containing(word)}
+
+    def candidate_lists(self, user_message_text: str, user_words: Set[str],
+                        lexicon_hits: FrozenSet[str], partial_keywords: Set[str]) -> List[Tuple[str, Sequence[int]]]:
+        """
+        Listes de positions dont `candidates` fait l'union, chacune avec sa
+        source : 'question' (une racine du message), 'keyword' (un mot-clé
+        présent dans le message), 'partial' (un mot-clé contenant un mot du
+        message), 'phrase' (message contenu dans la question ou l'inverse)
+        et 'greeting' (bonus salutation). Les positions retirées n'en sont
+        pas filtrées.
+
+        Args:
+            user_message_text: Message utilisateur normalisé
+            user_words: Racines des mots du message
+            lexicon_hits: Motifs relevés par `scan`
+            partial_keywords: Mots-clés relevés par `partial_keywords`
+
+        Returns:
+            List[Tuple[str, Sequence[int]]]: [(source, positions)]
+        """
+        lists = []
+
+        # Mots communs avec la question
+        for word in user_words:
+            positions = self.postings.array(word)
+            if len(positions):
+                lists.append(('question', positions))
+
+        # Mots-clés présents dans le message, ou contenant un mot du message
+        for keyword in lexicon_hits | partial_keywords:
+            keyword_id = self._keyword_ids.get(keyword)
+            if keyword_id is not None:
+                lists.append(('keyword' if keyword in lexicon_hits else 'partial', self._keyword_entries[keyword_id]))
+
+        # Message contenu dans la question ou question contenue dans le message
+        phrases = self._questions.containing(user_message_text) + self._questions.contained_in(user_message_text)
+        if phrases:
+            lists.append(('phrase', phrases))
+
+        # Bonus salutation
+        if self.greeting_positions and any(sal in user_message_text for sal in SALUTATIONS):
+            lists.append(('greeting', self.greeting_positions))
+        return lists
+
+    def candidates(self, user_message_text: str, user_words: Set[str],
+                   lexicon_hits: FrozenSet[str], partial_keywords: Set[str]) -> List[int]:
+        """
+        Retourne, dans l'ordre de la base, les positions des entrées qui
+        partagent au moins un terme ou une sous-chaîne avec le message
+        (arguments de `candidate_lists`)
+
+        Returns:
+            List[int]: positions dans `self.entries`
+        """
+        lists = self.candidate_lists(user_message_text, user_words, lexicon_hits, partial_keywords)
+        if not lists:
+            return []
+        found = np.unique(np.concatenate([np.asarray(positions, dtype=np.int64) for _, positions in lists]))
+        if self.removed:
+            found = found[~np.isin(found, list(self.removed))]
+        return found.tolist()
+
+
+_index_lock = threading.Lock()
+# Un index par langue : {langue: {'index', 'version', 'checked_at'}}
+_index_caches: Dict[str, Dict[str, object]] = {}
+
+# Version du format des index sauvegardés (à incrémenter si la structure change)
+INDEX_FORMAT_VERSION = 9
+# Sous-répertoire d'une version sauvegardée contenant l'index IVF de ses plongements
+ANN_DIRECTORY = 'ann'
+
+
+def knowledge_languages() -> List[str]:
+    """Langues de la base, chacune ayant son propre index"""
+    return [code for code, _ in KnowledgeBase.LANGUAGE_CHOICES]
+
+
+def default_language() -> str:
+    return getattr(settings, 'CHATBOT_DEFAULT_LANGUAGE', 'fr')
+
+
+def route_language(language: Optional[str]) -> List[str]:
+    """
+    Index à consulter, dans l'ordre, pour un message de langue détectée
+    `language` : celui de sa langue puis, à défaut de correspondance (ou si
+    la langue n'a pas d'index), celui de la langue par défaut
+    """
+    default = default_language()
+    if language in knowledge_languages() and language != default:
+        return [language, default]
+    return [default]
+
+
+def knowledge_base_fingerprint(language: Optional[str] = None) -> Tuple[int, Optional[int], object]:
+    """
+    Empreinte légère de la table KnowledgeBase (des entrées de `language`),
+    vérifiée au chargement d'un index sauvegardé (modifications faites hors
+    de l'ORM)
+    """
+    queryset = KnowledgeBase.objects.all()
+    if language is not None:
+        queryset = queryset.filter(language=language)
+    stats = queryset.aggregate(
+        total=Count('id'), last_id=Max('id'), last_update=Max('updated_at')
+    )
+    return stats['total'], stats['last_id'], stats['last_update']
+
+
+def serialize_fingerprint(fingerprint) -> Optional[list]:
+    """Empreinte sous forme sérialisable en JSON (manifeste des index sauvegardés)"""
+    if fingerprint is None:
+        return None
+    total, last_id, last_update = fingerprint
+    return [total, last_id, last_update.isoformat() if last_update else None]
+
+
+def latest_knowledge_base_version() -> int:
+    """
+    Dernière version de la base partagée par tous les processus (id de la
+    dernière modification journalisée) : une seule requête sur la clé primaire
+    """
+    return KnowledgeBaseChange.objects.aggregate(version=Max('id'))['version'] or 0
+
+
+def _written_at(directory: Path) -> int:
+    try:
+        return (directory / 'manifest.json').stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+def save_knowledge_index(index: KnowledgeIndex, root: Path) -> Path:
+    """
+    Écrit l'index dans un nouveau répertoire versionné de `root`, puis le
+    désigne comme version courante en remplaçant atomiquement le fichier
+    CURRENT. Seule la version précédente est conservée en plus.
+
+    Returns:
+        Path: répertoire de la nouvelle version
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    directory = Path(tempfile.mkdtemp(prefix=time.strftime('%Y%m%d-%H%M%S-'), dir=root))
+    version = directory.name
+
+    index.save(directory)
+    manifest = {
+        'format': INDEX_FORMAT_VERSION,
+        'language': index.language,
+        'version': index.version,
+        'fingerprint': serialize_fingerprint(index.fingerprint),
+        'entries': len(index),
+        'created_at': time.time(),
+    }
+    (directory / 'manifest.json').write_text(json.dumps(manifest))
+
+    pointer = root / f'CURRENT.{os.getpid()}.tmp'
+    pointer.write_text(version)
+    os.replace(pointer, root / 'CURRENT')
+
+    # Versions par date d'écriture du manifeste (le nom ne départage pas deux
+    # versions de la même seconde) ; une écriture interrompue passe en premier
+    versions = sorted((path for path in root.iterdir() if path.is_dir() and path.name != version), key=_written_at)
+    for old in versions[:-1]:
+        shutil.rmtree(old, ignore_errors=True)
+    return directory
+
+
+def load_knowledge_index(root: Path) -> Tuple[Optional[KnowledgeIndex], Optional[dict]]:
+    """
+    Recharge la version courante de l'index sauvegardé dans `root`
+
+    Returns:
+        Tuple[KnowledgeIndex, dict]: (index, manifeste : version et empreinte
+        de la base au moment de l'écriture), ou (None, None) si rien d'utilisable
+    """
+    root = Path(root)
+    try:
+        directory = root / (root / 'CURRENT').read_text().strip()
+        manifest = json.loads((directory / 'manifest.json').read_text())
+        if manifest.get('format') != INDEX_FORMAT_VERSION:
+            logger.info(f"Index sauvegardé ignoré (format {manifest.get('format')} != {INDEX_FORMAT_VERSION})")
+            return None, None
+        index = KnowledgeIndex.load(directory)
+        index.language = manifest['language']
+        index.version = manifest['version']
+        return index, manifest
+    except FileNotFoundError:
+        return None, None
+    except (OSError, ValueError, KeyError, EOFError, pickle.UnpicklingError) as e:
+        logger.warning(f"Index sauvegardé illisible ({root}): {e}")
+        return None, None
+
+
+def index_directory(language: str) -> Optional[Path]:
+    """Répertoire des index sauvegardés de `language` (None si CHATBOT_INDEX_DIR n'est pas configuré)"""
+    index_dir = getattr(settings, 'CHATBOT_INDEX_DIR', None)
+    return Path(index_dir) / language if index_dir else None
+
+
+def _build_index(language: str, previous: Optional[KnowledgeIndex] = None) -> KnowledgeIndex:
+    # La version est lue avant les lignes : une modification concurrente sera
+    # ré-appliquée au prochain contrôle (les mises à jour sont idempotentes)
+    version = latest_knowledge_base_version()
+    index = KnowledgeIndex.from_queryset(
+        KnowledgeBase.objects.filter(is_active=True, language=language), previous=previous
+    )
+    index.language = language
+    index.version = version
+    index.fingerprint = knowledge_base_fingerprint(language)
+    return index
+
+
+def _startup_index(language: str) -> KnowledgeIndex:
+    """
+    Premier index de `language` dans le processus : celui écrit par
+    `manage.py build_chatbot_index` s'il existe, mis à jour avec les
+    modifications journalisées depuis
+    """
+    root = index_directory(language)
+    stored, manifest = load_knowledge_index(root) if root else (None, None)
+    return _current_index(stored, manifest) or _rebuild_index(language, previous=stored)
+
+
+def _current_index(stored: Optional[KnowledgeIndex], manifest: Optional[dict]) -> Optional[KnowledgeIndex]:
+    """
+    Index sauvegardé `stored` s'il reflète la base (éventuellement après
+    application des modifications journalisées), None sinon
+    """
+    if stored is None:
+        return None
+    if stored.version != latest_knowledge_base_version():
+        return _catch_up(stored)
+
+    fingerprint = knowledge_base_fingerprint(stored.language)
+    if manifest['fingerprint'] != serialize_fingerprint(fingerprint):
+        # Base modifiée hors de l'ORM
+        return None
+    stored.fingerprint = fingerprint
+    return stored
+
+
+def _rebuild_index(language: str, previous: Optional[KnowledgeIndex] = None) -> KnowledgeIndex:
+    """
+    Reconstruction complète de l'index de `language`.
+
+    Avec CHATBOT_SHARED_INDEX, un seul processus de la machine (celui qui
+    obtient le verrou build.lock) reconstruit l'index, pré-calcule les
+    structures du moteur configuré et publie le résultat dans
+    CHATBOT_INDEX_DIR ; les autres attendent le verrou puis projettent en
+    mémoire la version publiée. Les tableaux étant lus par mmap, leurs pages
+    sont partagées par tous les processus au lieu d'être copiées dans chacun.
+    """
+    root = index_directory(language)
+    if root is None or fcntl is None or not getattr(settings, 'CHATBOT_SHARED_INDEX', True):
+        return _build_index(language, previous=previous)
+
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / 'build.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            # Un autre processus a pu publier une version à jour pendant l'attente
+            stored, manifest = load_knowledge_index(root)
+            index = _current_index(stored, manifest)
+            if index is not None:
+                return index
+
+            index = _build_index(language, previous=previous or stored)
+            prepare_knowledge_index(index)
+            save_knowledge_index(index, root)
+            published, _ = load_knowledge_index(root)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+    if published is None:
+        return index
+    published.fingerprint = index.fingerprint
+    return published
+
+
+def prepare_knowledge_index(index: KnowledgeIndex, backends: Iterable[str] = ()):
+    """
+    Pré-calcule les structures des moteurs `backends` (par défaut
+    CHATBOT_MATCHER_BACKEND) et le correcteur orthographique, pour qu'elles
+    soient sauvegardées avec l'index
+
+    Returns:
+        List[str]: moteurs sémantiques ignorés faute de modèle
+    """
+    skipped = []
+    if getattr(settings, 'CHATBOT_SPELL_CORRECTION', True):
+        index.speller()
+
+    for backend in backends or [getattr(settings, 'CHATBOT_MATCHER_BACKEND', 'heuristic')]:
+        if backend == 'semantic':
+            model = get_embedding_model()
+            if model is None:
+                skipped.append(backend)
+                continue
+            index.embedding_matrix(model, getattr(settings, 'CHATBOT_EMBEDDING_QUANTIZE', False))
+        elif backend in SparseKnowledgeMatrix.WEIGHTINGS:
+            index.sparse_matrix(backend)
+    return skipped
+
+
+def _catch_up(index: KnowledgeIndex) -> Optional[KnowledgeIndex]:
+    """
+    Applique à `index` les modifications journalisées depuis sa version.
+
+    Returns:
+        L'index à jour, ou None si une reconstruction est préférable
+        (journal purgé depuis cette version, ou modifications trop nombreuses)
+    """
+    changes = list(
+        KnowledgeBaseChange.objects.filter(id__gt=index.version).order_by('id').values_list('id', 'knowledge_id')
+    )
+    if not changes:
+        return index
+
+    # Journal purgé au-delà de la version de l'index : des modifications manquent
+    if KnowledgeBaseChange.objects.aggregate(oldest=Min('id'))['oldest'] > index.version + 1:
+        return None
+
+    ids = {knowledge_id for _, knowledge_id in changes}
+    if len(ids) > max(1000, len(index) // 10):
+        # Modification massive : une reconstruction complète est plus rapide
+        return None
+
+    # Une entrée passée dans une autre langue est retirée de cet index
+    rows = KnowledgeBase.objects.filter(
+        pk__in=ids, is_active=True, language=index.language
+    ).values_list(*KnowledgeIndex.FIELDS)
+    index.apply_delta((CompiledEntry(*row) for row in rows), ids)
+    index.version = changes[-1][0]
+    index.fingerprint = knowledge_base_fingerprint(index.language)
+    return index
+
+
+def get_knowledge_index(language: Optional[str] = None, check: bool = False) -> KnowledgeIndex:
+    """
+    Retourne l'index compilé des entrées de `language` (par défaut
+    CHATBOT_DEFAULT_LANGUAGE) pour ce processus.
+
+    La version partagée de la base (journal KnowledgeBaseChange) est
+    contrôlée au plus une fois toutes les CHATBOT_KB_VERSION_CHECK_MS
+    millisecondes : entre deux contrôles, aucune requête n'est faite. Si un
+    autre processus a modifié la base, seules les entrées concernées sont
+    relues et appliquées à l'index.
+
+    Args:
+        language: Langue des entrées indexées
+        check: Force le contrôle de version (après une modification locale)
+    """
+    language = language or default_language()
+    cache = _index_caches.get(language)
+    interval = getattr(settings, 'CHATBOT_KB_VERSION_CHECK_MS', 500) / 1000
+    if cache is not None and not check and time.monotonic() - cache['checked_at'] < interval:
+        return cache['index']
+
+    with _index_lock:
+        cache = _index_caches.get(language)
+        if cache is None:
+            index = _startup_index(language)
+        elif cache['index'].version != latest_knowledge_base_version():
+            index = _catch_up(cache['index']) or _rebuild_index(language, previous=cache['index'])
+        else:
+            index = cache['index']
+
+        if cache is None or index is not cache['index'] or index.version != cache['version']:
+            # Base modifiée (éventuellement par un autre processus) : correspondances périmées
+            match_cache.clear()
+        # Entrée du cache écrite seulement après une construction réussie : après
+        # une erreur (base indisponible...), l'appel suivant réessaie
+        _index_caches[language] = {'index': index, 'version': index.version, 'checked_at': time.monotonic()}
+        return index
+
+
+def refresh_knowledge_indexes():
+    """
+    Contrôle immédiat de la version de tous les index déjà chargés par le
+    processus (après une modification locale)
+    """
+    for language in list(_index_caches):
+        get_knowledge_index(language, check=True)
+
+
+def knowledge_base_version() -> int:
+    """
+    Version de la base de connaissances reflétée par les index de ce
+    processus : elle augmente à chaque modification journalisée, ce qui
+    permet aux caches de savoir que leurs résultats sont périmés
+    """
+    return max((cache['version'] for cache in list(_index_caches.values())), default=0)
+
+
+def preload_knowledge_index():
+    """
+    Charge l'index dans le processus maître d'un serveur qui crée ses
+    processus par fork après le chargement de l'application (gunicorn
+    --preload) : les objets Python des index sont alors partagés par
+    copie sur écriture au lieu d'être rechargés par chaque processus.
+    """
+    for language in knowledge_languages():
+        get_knowledge_index(language)
+    get_category_classifier()
+    # Les connexions ouvertes ne doivent pas être héritées par les processus enfants
+    connections.close_all()
+    # Objets exclus du ramasse-miettes : ses parcours ne touchent plus leurs pages partagées
+    gc.freeze()
@@ -0,0 +1,40 @@
+"""
+Lexiques partagés par les composants du chatbot
+"""
+
+SALUTATIONS = ['bonjour', 'salut', 'hello', 'hey', 'coucou', 'bonsoir']
+
+EMOTION_KEYWORDS = {
+    'joy': ['heureux', 'content', 'joyeux', 'super', 'génial', 'parfait', 'excellent', 'merci'],
+    'sad': ['triste', 'déprimé', 'malheureux', 'déçu', 'peine', 'chagrin'],
+    'angry': ['énervé', 'furieux', 'colère', 'agacé', 'irrité', 'rage', 'damn', 'merde'],
+    'fear': ['peur', 'inquiet', 'anxieux', 'stress', 'angoisse', 'crainte'],
+    'surprise': ['surpris', 'étonnant', 'incroyable', 'wow', 'oh', 'vraiment'],
+}
+
+# Polarité des mots courants (-1 très négatif, 1 très positif), en français
+# et pour les messages en anglais ; remplace l'analyse de TextBlob, limitée
+# à l'anglais
+POLARITY_WORDS = {
+    # Français
+    'bien': 0.5, 'bon': 0.5, 'bonne': 0.5, 'mieux': 0.5, 'meilleur': 0.6, 'bravo': 0.8,
+    'agréable': 0.6, 'formidable': 0.9, 'magnifique': 0.9, 'top': 0.7, 'cool': 0.5,
+    'satisfait': 0.6, 'ravi': 0.8, 'aimer': 0.5, 'adore': 0.8, 'efficace': 0.5,
+    'rapide': 0.4, 'facile': 0.4, 'simple': 0.3, 'utile': 0.5, 'sympa': 0.6,
+    'gentil': 0.6, 'clair': 0.4, 'pratique': 0.4, 'remercie': 0.6, 'impeccable': 0.9,
+    'mal': -0.5, 'mauvais': -0.7, 'mauvaise': -0.7, 'nul': -0.8, 'nulle': -0.8,
+    'horrible': -1.0, 'terrible': -0.8, 'catastrophe': -0.9, 'problème': -0.4,
+    'difficile': -0.4, 'compliqué': -0.4, 'lent': -0.4, 'cher': -0.3, 'arnaque': -0.9,
+    'inadmissible': -0.9, 'inacceptable': -0.9, 'insatisfait': -0.7, 'mécontent': -0.7,
+    'plainte': -0.5, 'honte': -0.7, 'pire': -0.8, 'dommage': -0.4, 'déteste': -0.9,
+    'inutile': -0.6, 'panne': -0.4, 'retard': -0.4, 'bug': -0.4, 'erreur': -0.4,
+    # Anglais
+    'good': 0.7, 'great': 0.8, 'nice': 0.6, 'love': 0.5, 'happy': 0.8, 'thanks': 0.4,
+    'awesome': 1.0, 'perfect': 1.0, 'best': 1.0, 'fine': 0.4, 'helpful': 0.5,
+    'bad': -0.7, 'worst': -1.0, 'awful': -1.0, 'hate': -0.8, 'poor': -0.4,
+    'wrong': -0.5, 'sad': -0.5, 'angry': -0.5, 'useless': -0.5, 'slow': -0.3,
+}
+
+# Mots inversant (et atténuant) la polarité des deux mots suivants ;
+# « pas content » ne compte pas comme de la joie
+NEGATIONS = ['pas', 'jamais', 'aucun', 'aucune', 'not', 'never', 'no']
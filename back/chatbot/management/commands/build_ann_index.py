@@ -0,0 +1,158 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+import numpy as np
+import os
+import shutil
+import time
+
+from chatbot.ann import IVFIndex, recall_benchmark
+from chatbot.backends import get_embedding_model
+from chatbot.index import ANN_DIRECTORY, index_directory, knowledge_languages, load_knowledge_index
+
+
+class Command(BaseCommand):
+    help = (
+        'Construit l\'index approximatif (IVF) des plongements de chaque langue dans la version courante '
+        'de son index sauvegardé (à relancer après `build_chatbot_index`) et mesure son rappel'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--language',
+            action='append',
+            choices=knowledge_languages(),
+            help='Langue(s) dont l\'index IVF est construit (par défaut toutes)'
+        )
+        parser.add_argument(
+            '--nlist',
+            type=int,
+            default=None,
+            help='Nombre de listes IVF (par défaut 4 x racine du nombre de vecteurs)'
+        )
+        parser.add_argument(
+            '--nprobe',
+            type=int,
+            default=getattr(settings, 'CHATBOT_ANN_NPROBE', 8),
+            help='Nombre de listes sondées par recherche (rappel / latence)'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=8,
+            help='Itérations du k-means'
+        )
+        parser.add_argument(
+            '--benchmark',
+            action='store_true',
+            help='Mesure le rappel@k et la latence par rapport à la recherche exacte'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=200,
+            help='Nombre de requêtes du benchmark'
+        )
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=10,
+            help='k du rappel@k'
+        )
+        parser.add_argument(
+            '--synthetic',
+            type=int,
+            default=0,
+            help='Benchmark sur N vecteurs synthétiques au lieu de la base (rien n\'est sauvegardé)'
+        )
+        parser.add_argument(
+            '--dim',
+            type=int,
+            default=384,
+            help='Dimension des vecteurs synthétiques'
+        )
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+
+        if options['synthetic']:
+            vectors = self._synthetic_vectors(options['synthetic'], options['dim'], rng)
+            self.stdout.write(f'🧪 {len(vectors)} vecteurs synthétiques de dimension {vectors.shape[1]}')
+            self._build(vectors, options, rng)
+            return
+
+        if not getattr(settings, 'CHATBOT_INDEX_DIR', None):
+            self.stdout.write(self.style.ERROR('❌ CHATBOT_INDEX_DIR n\'est pas configuré'))
+            return
+        model = get_embedding_model()
+        if model is None:
+            self.stdout.write(self.style.ERROR(
+                f'❌ Modèle introuvable: {getattr(settings, "CHATBOT_EMBEDDING_MODEL_PATH", None)}'
+            ))
+            return
+
+        for language in options['language'] or knowledge_languages():
+            self.stdout.write(f'\n🌐 Langue: {language}')
+            stored, _ = load_knowledge_index(index_directory(language))
+            if stored is None:
+                self.stdout.write(self.style.ERROR(
+                    '❌ Aucun index sauvegardé, lancer d\'abord `manage.py build_chatbot_index`'
+                ))
+                continue
+
+            quantize = getattr(settings, 'CHATBOT_EMBEDDING_QUANTIZE', False)
+            embeddings = stored.embedding_matrix(model, quantize)
+            vectors = embeddings.dense_vectors()
+            self.stdout.write(f'📊 {len(vectors)} questions encodées ({embeddings.encoded_count} calculées)')
+            if not len(vectors):
+                self.stdout.write(self.style.ERROR('❌ Aucun vecteur à indexer'))
+                continue
+
+            index = self._build(vectors, options, rng)
+            self._save(index, stored.directory, np.asarray(embeddings.ids, dtype=np.int64))
+
+    def _build(self, vectors, options, rng):
+        started = time.perf_counter()
+        index = IVFIndex(nlist=options['nlist'], nprobe=options['nprobe'], n_iter=options['iterations']).build(vectors)
+        self.stdout.write(
+            f'🔧 Index IVF construit en {time.perf_counter() - started:.1f}s '
+            f'({index.nlist} listes, nprobe={index.nprobe})'
+        )
+
+        if options['benchmark']:
+            # Requêtes : vecteurs de la base légèrement bruités (paraphrases simulées)
+            sample = vectors[rng.choice(len(vectors), min(options['queries'], len(vectors)), replace=False)]
+            queries = sample + rng.normal(scale=0.05, size=sample.shape).astype(np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+            self.stdout.write(f'\n🎯 Rappel@{options["k"]} par rapport à la recherche exacte')
+            self.stdout.write('-' * 50)
+            for result in recall_benchmark(index, vectors, queries, options['k']):
+                self.stdout.write(
+                    f'nprobe={result["nprobe"]:<4} rappel={result["recall"]:.3f} '
+                    f'latence={result["latency_ms"]:.3f} ms (exacte: {result["exact_latency_ms"]:.3f} ms)'
+                )
+        return index
+
+    def _save(self, index, directory, ids):
+        """
+        Écrit l'index IVF à côté de l'index sauvegardé dont il couvre les
+        plongements : écrit à part puis renommé, un processus qui le charge
+        au même moment ne voit jamais un index incomplet
+        """
+        path = directory / ANN_DIRECTORY
+        staging = directory / f'{ANN_DIRECTORY}.{os.getpid()}.tmp'
+        index.save(staging, ids=ids)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(staging, path)
+        self.stdout.write(self.style.SUCCESS(f'✅ Index IVF sauvegardé dans {path}'))
+
+    def _synthetic_vectors(self, size, dim, rng):
+        """Vecteurs normalisés regroupés autour de thèmes, comme des paraphrases générées"""
+        topics = rng.normal(size=(max(size // 50, 1), dim)).astype(np.float32)
+        vectors = np.empty((size, dim), dtype=np.float32)
+        for start in range(0, size, 65536):
+            end = min(start + 65536, size)
+            vectors[start:end] = topics[rng.integers(0, len(topics), end - start)]
+            vectors[start:end] += rng.normal(scale=1.0, size=(end - start, dim))
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
@@ -0,0 +1,102 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+import time
+
+from chatbot.backends import get_embedding_model
+from chatbot.index import (
+    _build_index, index_directory, knowledge_languages, load_knowledge_index,
+    prepare_knowledge_index, save_knowledge_index,
+)
+from chatbot.models import KnowledgeBaseChange
+from chatbot.services import KnowledgeBaseMatcher
+
+
+class Command(BaseCommand):
+    help = 'Construit et sauvegarde l\'index du chatbot (projeté en mémoire au démarrage des processus)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend',
+            action='append',
+            choices=KnowledgeBaseMatcher.BACKENDS,
+            help='Moteur(s) dont les structures sont pré-calculées (par défaut CHATBOT_MATCHER_BACKEND)'
+        )
+        parser.add_argument(
+            '--language',
+            action='append',
+            choices=knowledge_languages(),
+            help='Langue(s) dont l\'index est construit (par défaut toutes)'
+        )
+        parser.add_argument(
+            '--keep-changes-days',
+            type=float,
+            default=1,
+            help='Conserve les modifications journalisées plus récentes (processus en retard)'
+        )
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'CHATBOT_INDEX_DIR', None):
+            self.stdout.write(self.style.ERROR('❌ CHATBOT_INDEX_DIR n\'est pas configuré'))
+            return
+
+        backends = options['backend'] or [getattr(settings, 'CHATBOT_MATCHER_BACKEND', 'heuristic')]
+        languages = options['language'] or knowledge_languages()
+
+        versions = []
+        for language in languages:
+            index = self._build(language, backends)
+            if index is None:
+                return
+            versions.append(index.version)
+
+        # Les modifications intégrées à tous les index sauvegardés ne sont plus utiles au démarrage
+        deleted, _ = KnowledgeBaseChange.objects.filter(
+            id__lte=min(versions),
+            created_at__lt=timezone.now() - timedelta(days=options['keep_changes_days']),
+        ).delete()
+        if deleted:
+            self.stdout.write(f'🧹 {deleted} modifications journalisées purgées')
+
+    def _build(self, language, backends):
+        root = index_directory(language)
+        self.stdout.write(f'\n🌐 Langue: {language}')
+
+        started = time.perf_counter()
+        # Index neuf lu dans la base (et non l'index sauvegardé mis à jour par le
+        # journal) : entrées supprimées, mots-clés hors automate et vocabulaire
+        # périmé ne sont pas réécrits. Les plongements de la version courante
+        # sont repris pour les questions inchangées.
+        previous, _ = load_knowledge_index(root)
+        index = _build_index(language, previous=previous)
+        previous = None  # seuls ses plongements restent référencés par le nouvel index
+        self.stdout.write(f'📊 {len(index)} entrées compilées ({len(index.postings)} termes)')
+
+        skipped = prepare_knowledge_index(index, backends)
+        for backend in backends:
+            if backend in skipped:
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️ Modèle introuvable, plongements non sauvegardés: {settings.CHATBOT_EMBEDDING_MODEL_PATH}'
+                ))
+            elif backend == 'semantic':
+                embeddings = index.embedding_matrix(
+                    get_embedding_model(), getattr(settings, 'CHATBOT_EMBEDDING_QUANTIZE', False)
+                )
+                self.stdout.write(f'🧠 Plongements: {len(embeddings.ids)} questions ({embeddings.encoded_count} encodées)')
+            elif backend != 'heuristic':
+                self.stdout.write(f'🔢 Matrice creuse {backend} construite')
+
+        directory = save_knowledge_index(index, root)
+        self.stdout.write(f'🔧 Index construit et écrit en {time.perf_counter() - started:.2f}s')
+
+        # Temps de démarrage d'un processus qui recharge cet index
+        started = time.perf_counter()
+        loaded, _ = load_knowledge_index(root)
+        if loaded is None:
+            self.stdout.write(self.style.ERROR('❌ Relecture de l\'index impossible'))
+            return None
+        self.stdout.write(f'⚡ Rechargement (mmap): {(time.perf_counter() - started) * 1000:.1f} ms')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Index sauvegardé dans {directory} (version {index.version})'))
+        return index
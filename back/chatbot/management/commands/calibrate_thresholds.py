@@ -0,0 +1,148 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+import numpy as np
+import time
+
+from chatbot.evaluation import (
+    answer_judge, best_predictions, calibrate_thresholds, knowledge_rows, labeled_examples, load_examples,
+)
+from chatbot.index import MIN_DYNAMIC_THRESHOLD, default_language, get_knowledge_index, knowledge_languages
+from chatbot.models import KnowledgeBase
+from chatbot.services import KnowledgeBaseMatcher
+
+
+class Command(BaseCommand):
+    help = 'Calibre les seuils de confiance sur un jeu de messages étiquetés (précision maximale à rappel cible)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend',
+            choices=KnowledgeBaseMatcher.BACKENDS,
+            default=None,
+            help='Moteur dont les scores sont calibrés (par défaut CHATBOT_MATCHER_BACKEND)'
+        )
+        parser.add_argument(
+            '--by',
+            choices=['entry', 'category'],
+            default='category',
+            help='Un seuil par entrée ou par catégorie'
+        )
+        parser.add_argument(
+            '--target-recall',
+            type=float,
+            default=0.9,
+            help='Part minimale des bonnes correspondances de chaque groupe conservées'
+        )
+        parser.add_argument(
+            '--min-threshold',
+            type=float,
+            default=MIN_DYNAMIC_THRESHOLD,
+            help='Seuil minimal (score minimal classé par le matcher)'
+        )
+        parser.add_argument(
+            '--min-support',
+            type=int,
+            default=3,
+            help='Nombre minimal de messages prédits pour modifier le seuil d\'un groupe'
+        )
+        parser.add_argument(
+            '--dataset',
+            type=str,
+            default=None,
+            help='Jeu étiqueté JSON [{"message", "expected"}] (par défaut généré à partir de la base)'
+        )
+        parser.add_argument(
+            '--language',
+            choices=knowledge_languages(),
+            default=None,
+            help='Langue des entrées calibrées (par défaut CHATBOT_DEFAULT_LANGUAGE)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche les seuils calculés sans les enregistrer'
+        )
+
+    def handle(self, *args, **options):
+        language = options['language'] or default_language()
+        rows = knowledge_rows(language=language)
+        if not rows:
+            self.stdout.write(self.style.ERROR('❌ Aucune entrée active à calibrer'))
+            return
+
+        examples = load_examples(options['dataset']) if options['dataset'] else labeled_examples(rows)
+        matcher = KnowledgeBaseMatcher(options['backend'])
+        index = get_knowledge_index(language)
+        self.stdout.write(f'📚 {len(examples)} messages étiquetés, {len(index)} entrées (moteur: {matcher.backend})')
+
+        # Scores de tous les messages contre toute la base en un passage
+        started = time.perf_counter()
+        scores = matcher.score_matrix(index, [example.message for example in examples])
+        best, best_scores = best_predictions(scores)
+        self.stdout.write(f'🧮 Matrice {scores.shape[0]} x {scores.shape[1]} calculée en {time.perf_counter() - started:.2f}s')
+
+        is_correct = answer_judge(rows)
+        entries = [index.entries[position] for position in best]
+        correct = np.array([is_correct(example, entry) for example, entry in zip(examples, entries)], dtype=bool)
+        if options['by'] == 'entry':
+            groups = np.array([entry.id for entry in entries])
+        else:
+            groups = np.array([entry.category for entry in entries])
+
+        choices = calibrate_thresholds(
+            best_scores, correct, groups, options['target_recall'], options['min_threshold']
+        )
+        choices = {group: choice for group, choice in choices.items() if choice.support >= options['min_support']}
+        # Groupes sans aucune bonne correspondance : seuils actuels conservés, à revoir à la main
+        uncalibrated = sorted((group for group, choice in choices.items() if choice.threshold is None), key=str)
+        choices = {group: choice for group, choice in choices.items() if choice.threshold is not None}
+
+        thresholds, previous = {}, {}
+        for position, entry in enumerate(index.entries):
+            if position in index.removed:
+                continue
+            group = entry.id if options['by'] == 'entry' else entry.category
+            if group in choices:
+                thresholds[entry.id] = round(choices[group].threshold, 4)
+                previous[entry.id] = entry.confidence_threshold
+
+        current = np.array([entry.confidence_threshold for entry in entries])
+        calibrated = np.array([thresholds.get(entry.id, entry.confidence_threshold) for entry in entries])
+        self._report('Avant', best_scores, current, correct)
+        self._report('Après', best_scores, calibrated, correct)
+
+        for group, choice in sorted(choices.items(), key=lambda item: -item[1].support)[:15]:
+            self.stdout.write(
+                f'   {str(group)[:40]:<40} seuil {choice.threshold:.3f}  précision {choice.precision:.1%}  '
+                f'rappel {choice.recall:.1%}  ({choice.support} messages)'
+            )
+
+        if uncalibrated:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ {len(uncalibrated)} groupes sans bonne correspondance, seuils inchangés:'
+            ))
+            for group in uncalibrated:
+                self.stdout.write(f'   {str(group)[:60]}')
+
+        changed = [
+            KnowledgeBase(id=entry_id, confidence_threshold=threshold)
+            for entry_id, threshold in thresholds.items()
+            if threshold != previous[entry_id]
+        ]
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'🔎 Simulation: {len(changed)} seuils seraient modifiés'))
+            return
+
+        # Un seul bulk_update (une requête UPDATE par lot, signalée aux index) pour tous les seuils modifiés
+        with transaction.atomic():
+            KnowledgeBase.objects.bulk_update(changed, ['confidence_threshold'])
+        self.stdout.write(self.style.SUCCESS(f'🎉 {len(changed)} seuils mis à jour !'))
+
+    def _report(self, label, best_scores, thresholds, correct):
+        answered = (best_scores > 0) & (best_scores > thresholds)
+        right = int((answered & correct).sum())
+        precision = right / answered.sum() if answered.any() else 0.0
+        self.stdout.write(
+            f'📊 {label}: {int(answered.sum())} réponses, précision {precision:.1%}, '
+            f'rappel {right / len(correct):.1%}'
+        )
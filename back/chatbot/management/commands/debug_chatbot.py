@@ -16,6 +16,19 @@ class Command(BaseCommand):
             default='Bonjour',
             help='Message à tester'
         )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Nombre d\'entrées détaillées'
+        )
+        parser.add_argument(
+            '--backend',
+            type=str,
+            default=None,
+            choices=KnowledgeBaseMatcher.BACKENDS,
+            help='Moteur de correspondance à utiliser (par défaut celui des paramètres)'
+        )
 
     def handle(self, *args, **options):
         test_message = options['message']
@@ -35,42 +48,18 @@ class Command(BaseCommand):
             return
         
         # 2. Tester le matcher
-        matcher = KnowledgeBaseMatcher()
+        matcher = KnowledgeBaseMatcher(options['backend'])
         
-        # 3. Analyser chaque entrée
-        self.stdout.write(f"\n🔎 Analyse détaillée pour: '{test_message}'")
+        # 3. Détail des scores calculés par le matcher lui-même
+        self.stdout.write(f"\n🔎 Analyse détaillée pour: '{test_message}' (moteur: {matcher.backend})")
         self.stdout.write("-" * 50)
         
-        user_message_lower = test_message.lower()
-        knowledge_entries = KnowledgeBase.objects.filter(is_active=True)[:10]  # Limiter pour le debug
-        
-        for entry in knowledge_entries:
-            score = 0.0
-            details = []
-            
-            # Test mots-clés
-            if entry.keywords:
-                keywords = [k.strip().lower() for k in entry.keywords.split(',')]
-                keyword_matches = sum(1 for keyword in keywords if keyword in user_message_lower)
-                keyword_score = (keyword_matches / len(keywords)) * 0.4 if keywords else 0
-                score += keyword_score
-                details.append(f"Mots-clés: {keyword_matches}/{len(keywords)} = {keyword_score:.2f}")
-            
-            # Test correspondance question
-            question_words = entry.question.lower().split()
-            message_words = user_message_lower.split()
-            common_words = set(question_words) & set(message_words)
-            question_score = (len(common_words) / len(question_words)) * 0.3 if question_words else 0
-            score += question_score
-            details.append(f"Question: {len(common_words)}/{len(question_words)} = {question_score:.2f}")
-            
-            # Affichage
-            status = "✅ MATCH" if score >= entry.confidence_threshold else "❌ NO MATCH"
-            self.stdout.write(f"\n{status} [{score:.3f} >= {entry.confidence_threshold}]")
-            self.stdout.write(f"Q: {entry.question[:50]}...")
-            self.stdout.write(f"Mots-clés: {entry.keywords[:50]}...")
-            for detail in details:
-                self.stdout.write(f"  - {detail}")
+        for explanation in matcher.explain(test_message, k=options['top']):
+            status = "✅ MATCH" if explanation['matched'] else "❌ NO MATCH"
+            self.stdout.write(f"\n{status} [{explanation['score']:.3f} >= {explanation['threshold']:.3f}]")
+            self.stdout.write(f"Q: {explanation['question'][:50]}...")
+            for component, value in explanation['components'].items():
+                self.stdout.write(f"  - {component}: {value:.3f}")
         
         # 4. Test du service complet
         self.stdout.write(f"\n🤖 Test du service chatbot complet")
@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+import time
+
+from chatbot.dedup import KnowledgeRow, find_duplicates
+from chatbot.index import knowledge_languages
+from chatbot.models import KnowledgeBase
+
+
+class Command(BaseCommand):
+    help = 'Détecte les questions quasi dupliquées ayant la même réponse (MinHash + LSH) et désactive les redondantes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.8,
+            help='Similarité de Jaccard (n-grammes des questions) à partir de laquelle deux questions sont dupliquées'
+        )
+        parser.add_argument(
+            '--num-perm',
+            type=int,
+            default=128,
+            help='Nombre de permutations MinHash (précision de l\'estimation)'
+        )
+        parser.add_argument(
+            '--language',
+            choices=knowledge_languages(),
+            default=None,
+            help='Langue des entrées analysées (par défaut toutes)'
+        )
+        parser.add_argument(
+            '--show',
+            type=int,
+            default=20,
+            help='Nombre de groupes affichés'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Graine des permutations MinHash'
+        )
+        parser.add_argument(
+            '--deactivate',
+            action='store_true',
+            help='Désactive les entrées redondantes (l\'entrée d\'origine la plus ancienne de chaque groupe est conservée)'
+        )
+
+    def handle(self, *args, **options):
+        queryset = KnowledgeBase.objects.filter(is_active=True)
+        if options['language']:
+            queryset = queryset.filter(language=options['language'])
+        rows = [KnowledgeRow(*values) for values in queryset.order_by('id').values_list(
+            'id', 'category', 'question', 'answer', 'language'
+        )]
+        if not rows:
+            self.stdout.write(self.style.ERROR('❌ Aucune entrée active à analyser'))
+            return
+
+        started = time.perf_counter()
+        clusters, stats = find_duplicates(rows, options['threshold'], options['num_perm'], options['seed'])
+        self.stdout.write(
+            f'🔍 {stats["entries"]} entrées analysées en {time.perf_counter() - started:.2f}s '
+            f'({stats["bands"]} bandes de {stats["rows_per_band"]} lignes, '
+            f'{stats["candidate_pairs"]} paires candidates, {stats["confirmed_pairs"]} confirmées)'
+        )
+
+        if not clusters:
+            self.stdout.write(self.style.SUCCESS('✅ Aucune question dupliquée'))
+            return
+
+        self.stdout.write(
+            f'📋 {stats["clusters"]} groupes de doublons, {stats["redundant"]} entrées redondantes'
+        )
+        for cluster in clusters[:options['show']]:
+            self.stdout.write(
+                f'\n   ✅ #{cluster.keep.id} [{cluster.keep.category}] {cluster.keep.question[:70]}'
+                f'  (similarité ≥ {cluster.similarity:.2f})'
+            )
+            for row in cluster.redundant:
+                self.stdout.write(f'   ➖ #{row.id} [{row.category}] {row.question[:70]}')
+        if len(clusters) > options['show']:
+            self.stdout.write(f'\n   ... et {len(clusters) - options["show"]} autres groupes')
+
+        if not options['deactivate']:
+            self.stdout.write(self.style.WARNING('\n🔎 Simulation: relancez avec --deactivate pour désactiver les doublons'))
+            return
+
+        # Une seule requête UPDATE (signalée aux index) pour toutes les entrées redondantes
+        redundant = [row.id for cluster in clusters for row in cluster.redundant]
+        with transaction.atomic():
+            count = KnowledgeBase.objects.filter(id__in=redundant).update(is_active=False)
+        self.stdout.write(self.style.SUCCESS(f'\n🎉 {count} entrées redondantes désactivées !'))
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from collections import Counter
+import time
+
+from chatbot.models import Message
+from chatbot.services import EmotionDetector
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les émotions détectées des messages utilisateurs existants (par lots)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recalcule tous les messages (par défaut seulement ceux sans émotion détectée)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Nombre de messages évalués et enregistrés ensemble'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Affiche la répartition des émotions sans l\'enregistrer'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Message.objects.filter(sender='user')
+        if not options['all']:
+            queryset = queryset.filter(detected_emotion__isnull=True)
+
+        total = queryset.count()
+        if not total:
+            self.stdout.write(self.style.SUCCESS('✅ Aucun message à traiter'))
+            return
+        self.stdout.write(f'📚 {total} messages à traiter')
+
+        started = time.perf_counter()
+        emotions = Counter()
+        changed = 0
+        last_id = 0
+        while True:
+            # Pagination par id : les messages modifiés ne décalent pas les lots
+            batch = list(queryset.filter(id__gt=last_id).order_by('id').only(
+                'id', 'content', 'detected_emotion', 'emotion_confidence'
+            )[:options['batch_size']])
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            updated = []
+            for message, (emotion, confidence) in zip(batch, EmotionDetector.detect_batch([m.content for m in batch])):
+                emotions[emotion] += 1
+                if (message.detected_emotion, message.emotion_confidence) != (emotion, confidence):
+                    message.detected_emotion, message.emotion_confidence = emotion, confidence
+                    updated.append(message)
+            changed += len(updated)
+            if updated and not options['dry_run']:
+                with transaction.atomic():
+                    Message.objects.bulk_update(updated, ['detected_emotion', 'emotion_confidence'])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'⚡ {total} messages en {elapsed:.2f}s ({total / max(elapsed, 1e-9):.0f} messages/s)')
+        for emotion, count in emotions.most_common():
+            self.stdout.write(f'   {emotion:<10} {count}')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'🔎 Simulation: {changed} messages seraient modifiés'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'🎉 {changed} messages mis à jour !'))
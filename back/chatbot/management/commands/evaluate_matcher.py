@@ -0,0 +1,131 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+import json
+import time
+
+from chatbot.evaluation import (
+    build_index, evaluate, knowledge_rows, labeled_examples, load_examples, save_examples, with_distractors,
+)
+from chatbot.index import default_language, knowledge_languages, prepare_knowledge_index
+from chatbot.services import KnowledgeBaseMatcher
+
+
+class Command(BaseCommand):
+    help = 'Évalue les moteurs de correspondance hors ligne : précision top-1/top-k, latence et débit'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend',
+            action='append',
+            choices=KnowledgeBaseMatcher.BACKENDS,
+            help='Moteur(s) évalué(s) (par défaut CHATBOT_MATCHER_BACKEND)'
+        )
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=[0],
+            help='Tailles de base évaluées, complétées par des entrées synthétiques (0 : base réelle seule)'
+        )
+        parser.add_argument(
+            '--k',
+            type=int,
+            default=3,
+            help='Nombre de correspondances retenues pour la précision top-k'
+        )
+        parser.add_argument(
+            '--dataset',
+            type=str,
+            default=None,
+            help='Jeu étiqueté JSON [{"message", "expected"}] (par défaut généré à partir de la base)'
+        )
+        parser.add_argument(
+            '--export',
+            type=str,
+            default=None,
+            help='Écrit le jeu étiqueté utilisé dans ce fichier JSON'
+        )
+        parser.add_argument(
+            '--knowledge-file',
+            type=str,
+            default=None,
+            help='Entrées lues dans un fichier JSON (format de import_knowledge_base) au lieu de la base'
+        )
+        parser.add_argument(
+            '--language',
+            choices=knowledge_languages(),
+            default=None,
+            help='Langue des entrées évaluées (par défaut CHATBOT_DEFAULT_LANGUAGE)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Nombre maximal de messages évalués'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Graine des reformulations et des entrées synthétiques'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Résultats au format JSON'
+        )
+
+    def handle(self, *args, **options):
+        language = options['language'] or default_language()
+        rows = knowledge_rows(options['knowledge_file'], None if options['knowledge_file'] else language)
+        if not rows:
+            self.stdout.write(self.style.ERROR('❌ Aucune entrée active à évaluer'))
+            return
+
+        examples = load_examples(options['dataset']) if options['dataset'] else labeled_examples(rows, options['seed'])
+        examples = examples[:options['limit']] if options['limit'] else examples
+        if options['export']:
+            save_examples(examples, options['export'])
+        if not options['json']:
+            if options['export']:
+                self.stdout.write(f'💾 Jeu étiqueté écrit dans {options["export"]}')
+            self.stdout.write(f'📚 {len(examples)} messages étiquetés, {len(rows)} entrées réelles')
+
+        backends = options['backend'] or [getattr(settings, 'CHATBOT_MATCHER_BACKEND', 'heuristic')]
+        results = []
+
+        for size in sorted(set(options['sizes'])):
+            sized_rows = with_distractors(rows, size, options['seed'])
+            started = time.perf_counter()
+            index = build_index(sized_rows, language)
+            built = time.perf_counter() - started
+
+            for backend in backends:
+                matcher = KnowledgeBaseMatcher(backend)
+                if matcher.backend != backend:
+                    self.stdout.write(self.style.WARNING(f'⚠️ Moteur {backend} indisponible, ignoré'))
+                    continue
+                # Structures du moteur construites avant les mesures de latence
+                prepare_knowledge_index(index, [backend])
+                result = evaluate(matcher, index, sized_rows, examples, options['k'])
+                results.append(result.to_dict())
+                if not options['json']:
+                    self._report(result, built)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, ensure_ascii=False, indent=2))
+
+    def _report(self, result, built):
+        data = result.to_dict()
+        self.stdout.write(f'\n🔎 {result.backend} — {result.size} entrées (index construit en {built:.2f}s)')
+        self.stdout.write(
+            f'🎯 Précision top-1: {data["top1_accuracy"]:.1%}   '
+            f'top-{result.k}: {data[f"top{result.k}_accuracy"]:.1%}'
+        )
+        self.stdout.write(
+            f'⏱️ Latence p50: {data["p50_ms"]:.3f} ms   p95: {data["p95_ms"]:.3f} ms   p99: {data["p99_ms"]:.3f} ms'
+        )
+        self.stdout.write(f'⚡ Débit: {data["throughput"]:.0f} messages/s')
+        if any(result.tiers.values()):
+            tiers = ', '.join(f'{tier} {count}' for tier, count in result.tiers.items())
+            self.stdout.write(f'🪜 Paliers: {tiers}')
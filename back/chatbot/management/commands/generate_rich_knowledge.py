@@ -238,8 +238,7 @@ class Command(BaseCommand):
         # Sauvegarde dans la base de données
         created_count = 0
         for data in knowledge_data:
-            kb, created = KnowledgeBase.objects.get_or_create(
-                question=data['question'],
+            kb, created = KnowledgeBase.objects.for_question(data['question']).get_or_create(
                 defaults=data
             )
             if created:
@@ -52,9 +52,7 @@ class Command(BaseCommand):
             
             for entry_data in knowledge_entries:
                 # Vérifier si l'entrée existe déjà
-                existing = KnowledgeBase.objects.filter(
-                    question=entry_data['question']
-                ).first()
+                existing = KnowledgeBase.objects.for_question(entry_data['question']).first()
                 
                 if existing:
                     # Mettre à jour l'entrée existante
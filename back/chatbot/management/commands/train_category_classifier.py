@@ -0,0 +1,105 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+import random
+import time
+
+from chatbot.classifier import CategoryClassifier, base_category, reset_category_classifier
+from chatbot.models import KnowledgeBase
+from chatbot.management.commands.generate_question_variations import QUESTION_PATTERNS, variation_examples
+
+
+class Command(BaseCommand):
+    help = 'Entraîne le classifieur de catégories des messages (palier de recherche restreint aux catégories prédites)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=0.1,
+            help='Lissage de Laplace des fréquences'
+        )
+        parser.add_argument(
+            '--holdout',
+            type=float,
+            default=0.2,
+            help='Part des exemples réservée à la mesure de précision (0 pour ne pas mesurer)'
+        )
+        parser.add_argument(
+            '--no-patterns',
+            action='store_true',
+            help='N\'ajoute pas les questions types (« C\'est quoi ... ? ») construites sur les mots-clés'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=42,
+            help='Graine du tirage des exemples réservés'
+        )
+
+    def handle(self, *args, **options):
+        path = getattr(settings, 'CHATBOT_CLASSIFIER_PATH', None)
+        if not path:
+            self.stdout.write(self.style.ERROR('❌ CHATBOT_CLASSIFIER_PATH n\'est pas configuré'))
+            return
+
+        examples = list(self._examples(not options['no_patterns']))
+        if len({category for _, category in examples}) < 2:
+            self.stdout.write(self.style.ERROR('❌ Il faut au moins deux catégories pour entraîner le classifieur'))
+            return
+        self.stdout.write(f'📚 {len(examples)} exemples, {len({c for _, c in examples})} catégories')
+
+        if options['holdout'] > 0:
+            self._evaluate(examples, options['holdout'], options['alpha'], options['seed'])
+
+        started = time.perf_counter()
+        classifier = CategoryClassifier.fit(
+            [text for text, _ in examples], [category for _, category in examples], alpha=options['alpha']
+        )
+        classifier.save(path)
+        reset_category_classifier()
+        self.stdout.write(
+            f'🔧 Entraînement en {time.perf_counter() - started:.2f}s ({len(classifier.features)} empreintes)'
+        )
+        self.stdout.write(self.style.SUCCESS(f'✅ Classifieur sauvegardé dans {path}'))
+
+    def _examples(self, patterns):
+        """
+        Exemples (texte, catégorie) : questions et mots-clés des entrées
+        actives, variations générées et, si demandé, questions types
+        construites sur les mots-clés
+        """
+        entries = KnowledgeBase.objects.filter(is_active=True).values_list('question', 'keywords', 'category')
+        for question, keywords, category in entries:
+            category = base_category(category)
+            yield question, category
+            for keyword in (k.strip() for k in (keywords or '').split(',')):
+                if not keyword:
+                    continue
+                yield keyword, category
+                if patterns:
+                    for pattern in QUESTION_PATTERNS['what_is']:
+                        yield pattern.format(keyword), category
+
+        for question, category in variation_examples():
+            yield question, base_category(category)
+
+    def _evaluate(self, examples, holdout, alpha, seed):
+        shuffled = list(examples)
+        random.Random(seed).shuffle(shuffled)
+        split = max(1, int(len(shuffled) * holdout))
+        test, train = shuffled[:split], shuffled[split:]
+
+        classifier = CategoryClassifier.fit([text for text, _ in train], [category for _, category in train], alpha=alpha)
+        top_k = getattr(settings, 'CHATBOT_CLASSIFIER_TOP_K', 3)
+        first = within = 0
+        started = time.perf_counter()
+        for text, category in test:
+            predicted = [c for c, _ in classifier.top_categories(text, top_k)]
+            first += predicted[0] == category
+            within += category in predicted
+        elapsed = (time.perf_counter() - started) * 1000 / len(test)
+
+        self.stdout.write(
+            f'🎯 Précision sur {len(test)} exemples réservés: {first / len(test):.1%} '
+            f'(top-{top_k}: {within / len(test):.1%}), {elapsed:.3f} ms par message'
+        )
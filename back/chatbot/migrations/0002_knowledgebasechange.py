@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KnowledgeBaseChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('knowledge_id', models.BigIntegerField(help_text="Id de l'entrée modifiée, créée ou supprimée")),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Modification de la base de connaissances',
+                'verbose_name_plural': 'Modifications de la base de connaissances',
+            },
+        ),
+    ]
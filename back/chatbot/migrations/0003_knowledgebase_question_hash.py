@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:18
+
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Copie figée de chatbot.normalization.question_hash au moment de cette
+# migration : une évolution ultérieure de la normalisation ne doit pas
+# changer les empreintes calculées ici (l'index les recalcule de toute façon)
+_LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae', '’': "'", '‘': "'", '`': "'", '´': "'"})
+_ELISION = re.compile(r"\b(?:l|d|j|m|n|s|t|c|qu|jusqu|lorsqu|puisqu)'")
+_NON_ALNUM = re.compile(r'[^\w]+|_')
+
+
+def question_hash(text):
+    text = unicodedata.normalize('NFKD', (text or '').casefold().translate(_LIGATURES))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    text = ' '.join(_NON_ALNUM.sub(' ', _ELISION.sub(' ', text)).split())
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def fill_question_hash(apps, schema_editor):
+    KnowledgeBase = apps.get_model('chatbot', 'KnowledgeBase')
+    entries = list(KnowledgeBase.objects.only('id', 'question'))
+    for entry in entries:
+        entry.question_hash = question_hash(entry.question)
+    KnowledgeBase.objects.bulk_update(entries, ['question_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0002_knowledgebasechange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='knowledgebase',
+            name='question_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='Empreinte de la question normalisée (correspondance exacte)', max_length=40),
+        ),
+        migrations.RunPython(fill_question_hash, migrations.RunPython.noop),
+    ]
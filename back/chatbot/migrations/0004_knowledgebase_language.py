@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0003_knowledgebase_question_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='knowledgebase',
+            name='language',
+            field=models.CharField(choices=[('fr', 'Français'), ('en', 'Anglais')], db_index=True, default='fr', help_text='Langue de la question et de la réponse', max_length=10),
+        ),
+    ]
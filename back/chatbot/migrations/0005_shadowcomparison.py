@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 21:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0004_knowledgebase_language'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShadowComparison',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('primary_backend', models.CharField(help_text='Moteur en service', max_length=20)),
+                ('shadow_backend', models.CharField(help_text='Moteur candidat', max_length=20)),
+                ('language', models.CharField(help_text='Index consulté', max_length=10)),
+                ('period', models.DateTimeField(help_text="Début de l'heure agrégée")),
+                ('messages', models.PositiveIntegerField(default=0)),
+                ('agreements', models.PositiveIntegerField(default=0, help_text='Même meilleure entrée (ou aucune des deux)')),
+                ('primary_only', models.PositiveIntegerField(default=0, help_text='Entrée trouvée par le moteur en service seul')),
+                ('shadow_only', models.PositiveIntegerField(default=0, help_text='Entrée trouvée par le moteur candidat seul')),
+                ('compared', models.PositiveIntegerField(default=0, help_text='Messages avec une entrée pour les deux moteurs')),
+                ('score_delta_sum', models.FloatField(default=0.0, help_text='Somme des écarts de score (candidat - en service)')),
+                ('score_delta_abs_sum', models.FloatField(default=0.0)),
+                ('primary_timed', models.PositiveIntegerField(default=0, help_text='Recherches chronométrées (hors cache)')),
+                ('primary_latency_ms_sum', models.FloatField(default=0.0)),
+                ('shadow_latency_ms_sum', models.FloatField(default=0.0)),
+                ('shadow_latency_ms_max', models.FloatField(default=0.0)),
+            ],
+            options={
+                'verbose_name': 'Comparaison en mode fantôme',
+                'verbose_name_plural': 'Comparaisons en mode fantôme',
+                'ordering': ['-period'],
+                'unique_together': {('primary_backend', 'shadow_backend', 'language', 'period')},
+            },
+        ),
+    ]
@@ -1,19 +1,84 @@
 from django.db import models
+from django.dispatch import Signal
 from authentication.models import User
+from .normalization import question_hash
 import json
 
 
+# Émis après les modifications en masse de la base de connaissances (qui
+# n'émettent pas post_save), avec les ids des entrées concernées : `ids`
+knowledge_base_bulk_changed = Signal()
+
+
+class KnowledgeBaseQuerySet(models.QuerySet):
+    """
+    QuerySet signalant les mises à jour et créations en masse (update,
+    bulk_update, bulk_create) pour que l'index du chatbot reste à jour, et
+    maintenant l'empreinte des questions qu'elles modifient
+    """
+
+    def for_question(self, question: str):
+        """
+        Entrées dont la question normalisée est celle de `question` (casse,
+        accents et ponctuation ignorés), cherchées par la colonne indexée
+        `question_hash`
+        """
+        return self.filter(question_hash=question_hash(question))
+
+    def update(self, **kwargs):
+        if isinstance(kwargs.get('question'), str):
+            kwargs['question_hash'] = question_hash(kwargs['question'])
+        ids = list(self.values_list('pk', flat=True))
+        count = super().update(**kwargs)
+        knowledge_base_bulk_changed.send(sender=self.model, ids=ids)
+        return count
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        if 'question' in fields and 'question_hash' not in fields:
+            for obj in objs:
+                obj.question_hash = question_hash(obj.question)
+            fields = list(fields) + ['question_hash']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+    def bulk_create(self, objs, *args, **kwargs):
+        for obj in objs:
+            obj.question_hash = question_hash(obj.question)
+        objs = super().bulk_create(objs, *args, **kwargs)
+        knowledge_base_bulk_changed.send(sender=self.model, ids=[obj.pk for obj in objs if obj.pk is not None])
+        return objs
+
+
 class KnowledgeBase(models.Model):
     """
     Base de connaissances pour le chatbot - questions/réponses prédéfinies
     """
+    # Langues de la base : un index par langue, choisi selon la langue détectée du message
+    LANGUAGE_CHOICES = [
+        ('fr', 'Français'),
+        ('en', 'Anglais'),
+    ]
+
     category = models.CharField(max_length=100, help_text="Catégorie de la question")
     question = models.TextField(help_text="Question ou phrase clé")
+    question_hash = models.CharField(
+        max_length=40,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text="Empreinte de la question normalisée (correspondance exacte)"
+    )
     answer = models.TextField(help_text="Réponse correspondante")
     keywords = models.TextField(
         blank=True, 
         help_text="Mots-clés associés (séparés par des virgules)"
     )
+    language = models.CharField(
+        max_length=10,
+        choices=LANGUAGE_CHOICES,
+        default='fr',
+        db_index=True,
+        help_text="Langue de la question et de la réponse"
+    )
     confidence_threshold = models.FloatField(
         default=0.7, 
         help_text="Seuil de confiance pour déclencher cette réponse"
@@ -22,6 +87,15 @@ class KnowledgeBase(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = KnowledgeBaseQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.question_hash = question_hash(self.question)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'question' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'question_hash'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.category}: {self.question[:50]}..."
 
@@ -30,6 +104,73 @@ class KnowledgeBase(models.Model):
         verbose_name_plural = "Bases de connaissances"
 
 
+class KnowledgeBaseChange(models.Model):
+    """
+    Journal des modifications de la base de connaissances. L'id croissant
+    sert de numéro de version partagé par tous les processus : chacun
+    compare sa version à la dernière du journal et n'applique que les
+    entrées modifiées depuis.
+    """
+    knowledge_id = models.BigIntegerField(help_text="Id de l'entrée modifiée, créée ou supprimée")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Modification #{self.id} de l'entrée {self.knowledge_id}"
+
+    class Meta:
+        verbose_name = "Modification de la base de connaissances"
+        verbose_name_plural = "Modifications de la base de connaissances"
+
+
+class ShadowComparison(models.Model):
+    """
+    Comparaison agrégée (par heure) du moteur de correspondance en service
+    et d'un moteur candidat exécuté en arrière-plan sur les mêmes messages
+    (mode fantôme, voir chatbot/shadow.py)
+    """
+    primary_backend = models.CharField(max_length=20, help_text="Moteur en service")
+    shadow_backend = models.CharField(max_length=20, help_text="Moteur candidat")
+    language = models.CharField(max_length=10, help_text="Index consulté")
+    period = models.DateTimeField(help_text="Début de l'heure agrégée")
+
+    messages = models.PositiveIntegerField(default=0)
+    agreements = models.PositiveIntegerField(default=0, help_text="Même meilleure entrée (ou aucune des deux)")
+    primary_only = models.PositiveIntegerField(default=0, help_text="Entrée trouvée par le moteur en service seul")
+    shadow_only = models.PositiveIntegerField(default=0, help_text="Entrée trouvée par le moteur candidat seul")
+    compared = models.PositiveIntegerField(default=0, help_text="Messages avec une entrée pour les deux moteurs")
+    score_delta_sum = models.FloatField(default=0.0, help_text="Somme des écarts de score (candidat - en service)")
+    score_delta_abs_sum = models.FloatField(default=0.0)
+    primary_timed = models.PositiveIntegerField(default=0, help_text="Recherches chronométrées (hors cache)")
+    primary_latency_ms_sum = models.FloatField(default=0.0)
+    shadow_latency_ms_sum = models.FloatField(default=0.0)
+    shadow_latency_ms_max = models.FloatField(default=0.0)
+
+    @property
+    def agreement_rate(self) -> float:
+        return self.agreements / self.messages if self.messages else 0.0
+
+    @property
+    def mean_score_delta(self) -> float:
+        return self.score_delta_sum / self.compared if self.compared else 0.0
+
+    @property
+    def mean_primary_latency_ms(self) -> float:
+        return self.primary_latency_ms_sum / self.primary_timed if self.primary_timed else 0.0
+
+    @property
+    def mean_shadow_latency_ms(self) -> float:
+        return self.shadow_latency_ms_sum / self.messages if self.messages else 0.0
+
+    def __str__(self):
+        return f"{self.primary_backend} / {self.shadow_backend} ({self.language}) {self.period:%d/%m/%Y %H:00}"
+
+    class Meta:
+        verbose_name = "Comparaison en mode fantôme"
+        verbose_name_plural = "Comparaisons en mode fantôme"
+        unique_together = ('primary_backend', 'shadow_backend', 'language', 'period')
+        ordering = ['-period']
+
+
 class Conversation(models.Model):
     """
     Historique des conversations avec le chatbot
@@ -0,0 +1,84 @@
+"""
+Normalisation des textes français, partagée par tous les composants du chatbot
+"""
+import hashlib
+import re
+import unicodedata
+from typing import Iterable, Tuple, Union
+
+# Ligatures que la décomposition Unicode ne sépare pas
+_LIGATURES = str.maketrans({'œ': 'oe', 'æ': 'ae', '’': "'", '‘': "'", '`': "'", '´': "'"})
+# Articles et pronoms élidés : « l'assurance » -> « assurance »
+_ELISION = re.compile(r"\b(?:l|d|j|m|n|s|t|c|qu|jusqu|lorsqu|puisqu)'")
+_NON_ALNUM = re.compile(r'[^\w]+|_')
+
+
+def fold(text: str) -> str:
+    """
+    Casse repliée et accents supprimés : « Élève » -> « eleve »
+    """
+    text = unicodedata.normalize('NFKD', text.casefold().translate(_LIGATURES))
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def stem(token: str) -> str:
+    """
+    Racinisation légère (pluriels et terminaisons fréquentes), appliquée à
+    un mot déjà replié : « assurances » et « assurance » -> « assuranc »
+    """
+    if len(token) <= 4 or not token.isalpha():
+        return token
+    if token.endswith('aux'):
+        token = token[:-3] + 'al'
+    elif token[-1] in 'sx':
+        token = token[:-1]
+    for ending in ('r', 'e'):
+        if len(token) > 4 and token.endswith(ending):
+            token = token[:-1]
+    # Consonne finale doublée : « appell » -> « appel »
+    if len(token) > 4 and token[-1] == token[-2] and token[-1] not in 'aeiouy':
+        token = token[:-1]
+    return token
+
+
+class NormalizedText:
+    """
+    Texte normalisé une seule fois : forme repliée sans ponctuation ni
+    élisions, mots et racines
+    """
+
+    __slots__ = ('text', 'tokens', 'stems')
+
+    def __init__(self, tokens: Iterable[str]):
+        self.tokens: Tuple[str, ...] = tuple(tokens)
+        self.text = ' '.join(self.tokens)
+        self.stems: Tuple[str, ...] = tuple(stem(token) for token in self.tokens)
+
+    def __eq__(self, other):
+        return isinstance(other, NormalizedText) and self.tokens == other.tokens
+
+    def __hash__(self):
+        return hash(self.tokens)
+
+    def __repr__(self):
+        return f'NormalizedText({self.text!r})'
+
+
+def normalize(text: str) -> NormalizedText:
+    """
+    Normalise un message ou une question de la base
+
+    Exemple: "  L'assurance AUTO, ça coûte combien ?!" -> "assurance auto ca coute combien"
+    """
+    text = _ELISION.sub(' ', fold(text or ''))
+    return NormalizedText(_NON_ALNUM.sub(' ', text).split())
+
+
+def question_hash(text: Union[str, NormalizedText]) -> str:
+    """
+    Empreinte (SHA-1) d'une question normalisée : deux questions ne
+    différant que par la casse, les accents ou la ponctuation ont la même
+    """
+    if not isinstance(text, NormalizedText):
+        text = normalize(text)
+    return hashlib.sha1(text.text.encode('utf-8')).hexdigest()
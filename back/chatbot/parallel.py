@@ -0,0 +1,113 @@
+"""
+Score heuristique réparti sur plusieurs processus pour les très grandes bases
+"""
+import heapq
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Index hérité (fork) par les processus du pool
+_worker_index = None
+
+
+def _init_worker(index):
+    global _worker_index
+    _worker_index = index
+
+
+def _ready(_) -> int:
+    return os.getpid()
+
+
+def _score_shard(positions: np.ndarray, query, k: int) -> List[Tuple[int, float]]:
+    """
+    Exécuté dans un processus du pool : k meilleures entrées d'un tronçon
+    de positions candidates
+    """
+    from .services import KnowledgeBaseMatcher
+    return KnowledgeBaseMatcher._heuristic_rank(_worker_index, query, positions.tolist(), {}, k)
+
+
+class ShardedScorer:
+    """
+    Pool persistant de processus qui se partagent le score heuristique des
+    entrées candidates : chaque processus évalue un tronçon de positions et
+    renvoie ses k meilleures entrées, fusionnées ensuite.
+
+    Les processus sont créés par fork et héritent de l'index (pages
+    partagées, aucun envoi de l'index) ; le pool est recréé quand l'index
+    change. En dessous de `min_candidates` entrées, le coût des échanges
+    entre processus dépasse le gain et le score reste dans le processus
+    appelant.
+    """
+
+    def __init__(self, workers: int, min_candidates: int):
+        self.workers = workers
+        self.min_candidates = min_candidates
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._index = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.workers > 1 and 'fork' in multiprocessing.get_all_start_methods()
+
+    def should_shard(self, candidates: int) -> bool:
+        return self.available and candidates >= self.min_candidates
+
+    def _pool(self, index) -> ProcessPoolExecutor:
+        """Pool dont les processus ont hérité de `index` (appelé sous self._lock)"""
+        if self._executor is None or self._index is not index or self._version != index.version:
+            if self._executor is not None:
+                # Ancien pool retiré sans annuler ses tâches : celles déjà
+                # soumises par d'autres requêtes se terminent
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_init_worker,
+                initargs=(index,),
+            )
+            # Tous les processus sont créés maintenant, sur l'état actuel de l'index
+            list(executor.map(_ready, range(self.workers)))
+            self._executor, self._index, self._version = executor, index, index.version
+        return self._executor
+
+    def rank(self, index, query, positions: List[int], k: int) -> List[Tuple[int, float]]:
+        """
+        Les k meilleures entrées parmi `positions`, évaluées en parallèle
+
+        Returns:
+            List[Tuple[int, float]]: [(position, score)], meilleure d'abord
+        """
+        shards = np.array_split(np.asarray(positions, dtype=np.int64), self.workers)
+        # Tâches soumises sous le verrou : un autre thread ne peut pas retirer le
+        # pool entre son choix et la soumission ; l'attente se fait hors verrou
+        with self._lock:
+            pool = self._pool(index)
+            futures = [pool.submit(_score_shard, shard, query, k) for shard in shards]
+        partial = [ranked for future in futures for ranked in future.result()]
+        # Même ordre qu'en un seul processus : score, puis entrée la plus ancienne
+        return heapq.nlargest(k, partial, key=lambda item: (item[1], -index.entries[item[0]].id))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._index = self._version = None
+
+
+sharded_scorer = ShardedScorer(
+    workers=getattr(settings, 'CHATBOT_PARALLEL_WORKERS', 0),
+    min_candidates=getattr(settings, 'CHATBOT_PARALLEL_MIN_CANDIDATES', 20000),
+)
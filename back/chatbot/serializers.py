@@ -42,6 +42,22 @@ class ChatRequestSerializer(serializers.Serializer):
     message = serializers.CharField(max_length=1000)
     session_id = serializers.CharField(max_length=100, required=False)
     user_id = serializers.IntegerField(required=False)
+    suggestions = serializers.IntegerField(
+        required=False,
+        default=0,
+        min_value=0,
+        max_value=10,
+        help_text="Nombre maximum d'autres questions de la base proposées"
+    )
+
+
+class SuggestionSerializer(serializers.Serializer):
+    """
+    Serializer pour les questions proposées (« vouliez-vous dire ? »)
+    """
+    id = serializers.IntegerField()
+    question = serializers.CharField()
+    score = serializers.FloatField()
 
 
 class ChatResponseSerializer(serializers.Serializer):
@@ -55,6 +71,7 @@ class ChatResponseSerializer(serializers.Serializer):
     emotion_confidence = serializers.FloatField(required=False)
     response_method = serializers.CharField()
     processing_time = serializers.FloatField()
+    suggestions = SuggestionSerializer(many=True, required=False)
 
 
 class KnowledgeBaseSerializer(serializers.ModelSerializer):
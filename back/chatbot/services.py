@@ -1,174 +1,566 @@
 import time
+import heapq
 import logging
 import uuid
-from typing import Tuple, Optional, Dict, Any
+from concurrent.futures import CancelledError
+from concurrent.futures.process import BrokenProcessPool
+from collections import defaultdict
+from typing import Tuple, Optional, Dict, Any, List, Sequence, Set
 from django.conf import settings
 from django.db.models import Q
-from textblob import TextBlob
 from langdetect import detect, DetectorFactory
 from sentence_transformers import SentenceTransformer
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 
 from .models import KnowledgeBase, Conversation, Message, ChatbotSettings
+from .backends import SparseKnowledgeMatrix, get_embedding_model, top_positions
+from .cache import match_cache, response_cache
+from .classifier import get_category_classifier, hashed_vector
+from .emotion import get_emotion_lexicon
+from .parallel import sharded_scorer
+from .shadow import shadow_runner
+from .tracing import TierCounters, match_tiers, match_traces
+from .index import MIN_DYNAMIC_THRESHOLD, get_knowledge_index, knowledge_base_version, route_language
+from .lexicon import EMOTION_KEYWORDS, SALUTATIONS
+from .normalization import NormalizedText, normalize, question_hash
 
 # Configuration pour des résultats reproductibles
 DetectorFactory.seed = 0
 
 logger = logging.getLogger(__name__)
 
+# Écart toléré entre le score maximal calculé par NumPy et le score exact (arrondis)
+BOUND_TOLERANCE = 1e-9
+
 
 class EmotionDetector:
     """
-    Détecteur d'émotions basé sur TextBlob et règles personnalisées
+    Détecteur d'émotions basé sur un lexique compilé (mots d'émotions et
+    polarité des mots, en français et en anglais)
     """
     
-    EMOTION_KEYWORDS = {
-        'joy': ['heureux', 'content', 'joyeux', 'super', 'génial', 'parfait', 'excellent', 'merci'],
-        'sad': ['triste', 'déprimé', 'malheureux', 'déçu', 'peine', 'chagrin'],
-        'angry': ['énervé', 'furieux', 'colère', 'agacé', 'irrité', 'rage', 'damn', 'merde'],
-        'fear': ['peur', 'inquiet', 'anxieux', 'stress', 'angoisse', 'crainte'],
-        'surprise': ['surpris', 'étonnant', 'incroyable', 'wow', 'oh', 'vraiment'],
-    }
+    EMOTION_KEYWORDS = EMOTION_KEYWORDS
     
     @staticmethod
-    def detect_emotion(text: str) -> Tuple[str, float]:
+    def detect_emotion(text: str, normalized: Optional[NormalizedText] = None) -> Tuple[str, float]:
         """
         Détecte l'émotion dans un texte
         
+        Args:
+            text: Texte à analyser
+            normalized: Texte déjà normalisé (optionnel)
+        
         Returns:
             Tuple[str, float]: (émotion, confiance)
         """
-        text_lower = text.lower()
-        
-        # Analyse de polarité avec TextBlob
-        blob = TextBlob(text)
-        polarity = blob.sentiment.polarity
-        
-        # Détection par mots-clés
-        emotion_scores = {}
-        for emotion, keywords in EmotionDetector.EMOTION_KEYWORDS.items():
-            score = sum(1 for keyword in keywords if keyword in text_lower)
-            if score > 0:
-                emotion_scores[emotion] = score
-        
-        # Si des émotions spécifiques sont détectées
-        if emotion_scores:
-            best_emotion = max(emotion_scores, key=emotion_scores.get)
-            confidence = min(emotion_scores[best_emotion] * 0.3, 1.0)
-            return best_emotion, confidence
-        
-        # Sinon, utilise la polarité
-        if polarity > 0.3:
-            return 'positive', abs(polarity)
-        elif polarity < -0.3:
-            return 'negative', abs(polarity)
-        else:
-            return 'neutral', 0.5
+        return get_emotion_lexicon().detect(normalized if normalized is not None else text)
+    
+    @staticmethod
+    def detect_batch(texts: List[str]) -> List[Tuple[str, float]]:
+        """
+        Émotions d'un lot de messages (recalcul de l'historique), évaluées
+        ensemble sur le lexique compilé
+        """
+        return get_emotion_lexicon().detect_batch(texts)
 
 
 class KnowledgeBaseMatcher:
     """
     Système de correspondance avec la base de connaissances
+    
+    Moteurs disponibles :
+    - 'heuristic' : score heuristique (question, mots-clés, salutations...)
+    - 'bm25' / 'tfidf' : score vectoriel sur une matrice creuse de la base
+    - 'semantic' : similarité cosinus avec les plongements pré-calculés des questions
     """
     
-    def __init__(self):
-        # Désactiver temporairement le modèle de similarité sémantique
-        # à cause des problèmes SSL
-        self.model = None
-        logger.info("Modèle de similarité sémantique désactivé temporairement")
+    BACKENDS = ('heuristic',) + SparseKnowledgeMatrix.WEIGHTINGS + ('semantic',)
     
-    def find_best_match(self, user_message: str) -> Tuple[Optional[KnowledgeBase], float]:
+    def __init__(self, backend: str = None, tiers: Optional[TierCounters] = None):
+        self.backend = backend or getattr(settings, 'CHATBOT_MATCHER_BACKEND', 'heuristic')
+        if self.backend not in self.BACKENDS:
+            raise ValueError(f"Moteur de correspondance inconnu: {self.backend}")
+        # Compteurs des paliers (ceux de /chatbot/stats/ par défaut)
+        self.tiers = tiers if tiers is not None else match_tiers
+        
+        # Le modèle de similarité sémantique est chargé depuis un chemin local
+        # (pas de téléchargement, donc pas de problème SSL)
+        self.model = get_embedding_model() if self.backend == 'semantic' else None
+        if self.backend == 'semantic' and self.model is None:
+            logger.warning("Modèle de similarité sémantique indisponible, repli sur le moteur heuristique")
+            self.backend = 'heuristic'
+    
+    def find_best_match(self, user_message: str, lexicon_hits=None,
+                        normalized: Optional[NormalizedText] = None,
+                        language: Optional[str] = None) -> Tuple[Optional[KnowledgeBase], float]:
         """
         Trouve la meilleure correspondance dans la base de connaissances
         ALGORITHME AMÉLIORÉ ET PLUS PERMISSIF
         
         Args:
             user_message: Message de l'utilisateur
+            lexicon_hits: Motifs déjà relevés par KnowledgeIndex.scan sur l'index
+                de la langue du message (optionnel)
+            normalized: Message déjà normalisé (optionnel)
+            language: Langue détectée du message (par défaut CHATBOT_DEFAULT_LANGUAGE)
             
         Returns:
             Tuple[KnowledgeBase, float]: (meilleure correspondance, score de confiance)
         """
-        knowledge_entries = KnowledgeBase.objects.filter(is_active=True)
+        matches = self.find_top_matches(user_message, 1, lexicon_hits, normalized, language)
+        return matches[0] if matches else (None, 0.0)
+    
+    def find_top_matches(self, user_message: str, k: int = 3, lexicon_hits=None,
+                         normalized: Optional[NormalizedText] = None,
+                         language: Optional[str] = None) -> List[Tuple[KnowledgeBase, float]]:
+        """
+        Les k meilleures correspondances au-dessus de leur seuil dynamique,
+        meilleure d'abord, tirées du même passage de score que la meilleure
+        (tri partiel des scores déjà calculés).
         
-        if not knowledge_entries.exists():
-            return None, 0.0
+        Seules les entrées de la langue du message sont évaluées ; l'index de
+        la langue par défaut n'est consulté que si aucune d'elles ne dépasse
+        son seuil de confiance (le meilleur des deux classements est retenu).
         
-        best_match = None
-        best_score = 0.0
+        Returns:
+            List[Tuple[KnowledgeBase, float]]: [(correspondance, score de confiance)]
+        """
+        normalized = normalized or normalize(user_message)
+        started = time.perf_counter()
+        index, ranked = self.rank(user_message, normalized, lexicon_hits, language, k)
+        if index is None:
+            return []
+        
+        # Trace détaillée pour un échantillon des messages seulement
+        if match_traces.should_sample():
+            best_position, best_score = ranked[0] if ranked else (None, 0.0)
+            match_traces.record(self._trace(index, user_message, best_position, best_score, time.perf_counter() - started))
+        
+        # Seules les entrées retenues sont chargées depuis la base
+        ids = [index.entries[position].id for position, _ in ranked]
+        entries = KnowledgeBase.objects.in_bulk(ids)
+        return [(entries[entry_id], score) for entry_id, (_, score) in zip(ids, ranked) if entry_id in entries]
+    
+    def rank(self, user_message: str, normalized: NormalizedText, lexicon_hits=None,
+             language: Optional[str] = None, k: int = 1) -> Tuple[Optional[Any], List[Tuple[int, float]]]:
+        """
+        Classement des entrées (positions dans l'index) sans accès à la base :
+        index de la langue du message, puis celui de la langue par défaut
+        
+        Returns:
+            Tuple[KnowledgeIndex, List[Tuple[int, float]]]: (index consulté ou
+            None si tous sont vides, [(position, score)] meilleure d'abord)
+        """
+        searched, ranked = None, []
+        for i, partition in enumerate(route_language(language)):
+            index = get_knowledge_index(partition)
+            if not len(index):
+                continue
+            # Les motifs relevés ne valent que pour l'index de la langue du message
+            partition_ranked = self._top(index, user_message, normalized, lexicon_hits if i == 0 else None, k)
+            if searched is None or (partition_ranked and (not ranked or partition_ranked[0][1] > ranked[0][1])):
+                searched, ranked = index, partition_ranked
+            if ranked and ranked[0][1] > searched.entries[ranked[0][0]].confidence_threshold:
+                break
+        return searched, ranked
+    
+    def explain(self, user_message: str, k: int = 5, language: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Détail des scores des k entrées les mieux classées de l'index de
+        `language`, composante par composante (mode diagnostic : jamais
+        utilisé sur le chemin normal)
+        
+        Returns:
+            List[Dict]: [{'id', 'question', 'score', 'threshold', 'matched', 'components'}]
+        """
+        return self._explain(get_knowledge_index(language), user_message, k)
+    
+    def _top(self, index, user_message: str, normalized: NormalizedText, lexicon_hits=None,
+             k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Meilleures entrées selon le moteur configuré, cherchées par paliers
+        (CHATBOT_MATCH_CASCADE) du moins au plus coûteux :
+        1. empreinte de la question normalisée (correspondance exacte), notée
+           par le moteur configuré et suivie des k-1 meilleures autres entrées
+        2. moteur heuristique : entrées atteintes par les mots-clés et les phrases,
+           puis entrées des catégories prédites par le classifieur
+        3. score complet : toutes les entrées candidates, ou moteur vectoriel
+        Un palier s'arrête dès que son meilleur score dépasse le seuil de
+        confiance de l'entrée (`confidence_threshold`) ; les suivantes sont
+        prises parmi les entrées évaluées par ce palier.
         
-        user_message_lower = user_message.lower().strip()
-        user_words = set(user_message_lower.split())
+        Returns:
+            List[Tuple[int, float]]: [(position, score)], meilleure d'abord
+        """
+        cascade = getattr(settings, 'CHATBOT_MATCH_CASCADE', True)
+        if cascade:
+            position = index.exact(question_hash(normalized))
+            if position is not None and 1.0 > index.entries[position].confidence_threshold:
+                self.tiers.hit('exact')
+                return self._exact_top(index, position, user_message, normalized, lexicon_hits, k)
+        
+        if self.backend == 'heuristic':
+            return self._heuristic_top(index, normalized, lexicon_hits, cascade, k)
+        
+        self.tiers.hit('full')
+        return self._vector_backend(index).top(self._vector_query(index, user_message, normalized), k=k)
+    
+    def _exact_top(self, index, position: int, user_message: str, normalized: NormalizedText, lexicon_hits=None,
+                   k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Correspondance exacte `position` avec le score du moteur configuré
+        (même échelle que les autres paliers), puis les k-1 meilleures autres
+        entrées pour les suggestions
+        """
+        others = []
+        if self.backend == 'heuristic':
+            query = self._heuristic_query(index, normalized, lexicon_hits)
+            scores = {position: self._heuristic_score(index.entries[position], query)}
+            if k > 1:
+                lists = index.candidate_lists(query.text, query.words, query.lexicon_hits, query.partial_keywords)
+                others = self._heuristic_search(index, query, lists, scores, k)
+            score = scores[position]
+        else:
+            backend = self._vector_backend(index)
+            vector_scores = backend.score(self._vector_query(index, user_message, normalized))
+            if vector_scores is None:
+                return [(position, 1.0)]
+            score = float(vector_scores[position])
+            if k > 1:
+                others = top_positions(vector_scores, backend.thresholds, k)
+        return [(position, score)] + [item for item in others if item[0] != position][:k - 1]
+    
+    def score_matrix(self, index, user_messages: List[str]) -> np.ndarray:
+        """
+        Scores complets (sans paliers ni seuils) de toutes les entrées de
+        l'index pour plusieurs messages : un seul produit de matrices pour
+        les moteurs vectoriels, les entrées candidates de chaque message
+        pour le moteur heuristique
         
-        logger.info(f"🔍 Recherche pour: '{user_message}' -> mots: {user_words}")
+        Returns:
+            np.ndarray: matrice messages x positions de l'index
+        """
+        normalized = [normalize(message) for message in user_messages]
+        if self.backend == 'heuristic':
+            scores = np.zeros((len(user_messages), len(index.entries)), dtype=np.float32)
+            for row, text in enumerate(normalized):
+                query = self._heuristic_query(index, text)
+                for position in index.candidates(query.text, query.words, query.lexicon_hits, query.partial_keywords):
+                    scores[row, position] = self._heuristic_score(index.entries[position], query)
+        else:
+            queries = [
+                self._vector_query(index, message, text) for message, text in zip(user_messages, normalized)
+            ]
+            scores = self._vector_backend(index).score_batch(queries)
         
-        for entry in knowledge_entries:
-            score = 0.0
-            details = []
-            
-            # 1. CORRESPONDANCE EXACTE - Score très élevé
-            if user_message_lower == entry.question.lower():
-                score = 1.0
-                details.append("MATCH EXACT")
-            
-            # 2. CORRESPONDANCE DANS LA QUESTION - Plus permissif
-            question_words = set(entry.question.lower().split())
-            question_matches = user_words.intersection(question_words)
-            if question_matches and len(question_words) > 0:
-                question_score = len(question_matches) / max(len(user_words), len(question_words))
-                score += question_score * 0.6  # Poids plus élevé
-                details.append(f"Question: {len(question_matches)}/{len(question_words)} = {question_score:.2f}")
-            
-            # 3. CORRESPONDANCE MOTS-CLÉS - Plus intelligente
-            if entry.keywords:
-                keywords = [k.strip().lower() for k in entry.keywords.split(',') if k.strip()]
-                keyword_matches = 0
-                total_keywords = len(keywords)
-                
-                for keyword in keywords:
-                    # Correspondance exacte du mot-clé
-                    if keyword in user_message_lower:
-                        keyword_matches += 1
-                    # Correspondance partielle pour les mots composés
-                    elif any(word in keyword or keyword in word for word in user_words if len(word) > 2):
-                        keyword_matches += 0.5
-                
-                if total_keywords > 0:
-                    keyword_score = keyword_matches / total_keywords
-                    score += keyword_score * 0.5  # Poids élevé pour les mots-clés
-                    details.append(f"Mots-clés: {keyword_matches}/{total_keywords} = {keyword_score:.2f}")
-            
-            # 4. CORRESPONDANCE PARTIELLE DANS LA QUESTION - Nouveau
-            if user_message_lower in entry.question.lower() or entry.question.lower() in user_message_lower:
-                score += 0.3
-                details.append("Correspondance partielle")
-            
-            # 5. BONUS POUR LES SALUTATIONS
-            salutations = ['bonjour', 'salut', 'hello', 'hey', 'coucou', 'bonsoir']
-            if any(sal in user_message_lower for sal in salutations) and any(sal in entry.keywords.lower() for sal in salutations if entry.keywords):
-                score += 0.4
-                details.append("Bonus salutation")
-            
-            # 6. BONUS POUR LES QUESTIONS COURTES
-            if len(user_words) <= 3 and score > 0:
-                score += 0.2
-                details.append("Bonus question courte")
+        if index.removed:
+            scores[:, sorted(index.removed)] = 0.0
+        return scores
+    
+    def _vector_backend(self, index):
+        if self.backend == 'semantic':
+            return index.embedding_matrix(self.model, getattr(settings, 'CHATBOT_EMBEDDING_QUANTIZE', False))
+        return index.sparse_matrix(self.backend)
+    
+    def _vector_query(self, index, user_message: str, normalized: NormalizedText) -> str:
+        # Le modèle de phrases gère lui-même la casse, les accents et les fautes de frappe
+        if self.backend == 'semantic':
+            return user_message.strip()
+        return self._correct(index, normalized).text
+    
+    @staticmethod
+    def _correct(index, normalized: NormalizedText) -> NormalizedText:
+        """
+        Corrige les mots absents du vocabulaire de la base (« assurence »,
+        « paiment »...) avec le correcteur construit sur le même index
+        """
+        if not getattr(settings, 'CHATBOT_SPELL_CORRECTION', True):
+            return normalized
+        corrected = index.speller().correct(normalized.text)
+        return normalized if corrected == normalized.text else NormalizedText(corrected.split())
+    
+    def _heuristic_query(self, index, normalized: NormalizedText, lexicon_hits=None) -> '_HeuristicQuery':
+        corrected = self._correct(index, normalized)
+        if corrected is not normalized:
+            # Les motifs relevés sur le message d'origine ne valent plus
+            normalized, lexicon_hits = corrected, None
+        
+        # Un seul passage de l'automate pour tous les mots-clés de la base
+        if lexicon_hits is None:
+            lexicon_hits = index.scan(normalized.text)
+        return _HeuristicQuery(index, normalized, lexicon_hits)
+    
+    def _heuristic_top(self, index, normalized: NormalizedText, lexicon_hits=None,
+                       cascade: bool = False, k: int = 1) -> List[Tuple[int, float]]:
+        """
+        Score heuristique des entrées candidates de l'index ; avec `cascade`,
+        les entrées atteintes par les mots-clés et les phrases, puis celles
+        des catégories prédites par le classifieur, sont évaluées d'abord et
+        suffisent si la meilleure dépasse son seuil de confiance
+        
+        Returns:
+            List[Tuple[int, float]]: [(position, score)], meilleure d'abord
+        """
+        query = self._heuristic_query(index, normalized, lexicon_hits)
+        lists = index.candidate_lists(query.text, query.words, query.lexicon_hits, query.partial_keywords)
+        scores: Dict[int, float] = {}
+        
+        if cascade:
+            top = self._heuristic_search(index, query, lists, scores, k, sources={'keyword', 'phrase'})
+            if top and top[0][1] > index.entries[top[0][0]].confidence_threshold:
+                self.tiers.hit('keywords')
+                return top
             
-            # Nouveau seuil beaucoup plus bas et dynamique
-            dynamic_threshold = max(0.2, entry.confidence_threshold * 0.3)  # Réduction drastique
+            # Entrées des catégories les plus probables selon le classifieur
+            classifier = get_category_classifier()
+            if classifier is not None:
+                categories = [
+                    category for category, _ in
+                    classifier.top_categories(query.text, getattr(settings, 'CHATBOT_CLASSIFIER_TOP_K', 3))
+                ]
+                top = self._rank_batch(index, query, index.category_candidates(categories), scores, k)
+                if top and top[0][1] > index.entries[top[0][0]].confidence_threshold:
+                    self.tiers.hit('category')
+                    return top
+        
+        # Seules les entrées partageant un terme avec le message peuvent obtenir un score
+        self.tiers.hit('full')
+        return self._heuristic_search(index, query, lists, scores, k)
+    
+    def _heuristic_search(self, index, query: '_HeuristicQuery', lists: List[Tuple[str, Sequence[int]]],
+                          scores: Dict[int, float], k: int, sources: Optional[Set[str]] = None) -> List[Tuple[int, float]]:
+        """
+        Les k meilleures entrées de l'union des listes de `lists` (voir
+        `KnowledgeIndex.candidate_lists`), restreinte aux listes de `sources`
+        si elles sont données, sans évaluer toutes les entrées : un score
+        maximal de chaque entrée est calculé d'un bloc (NumPy) à partir des
+        listes où elle apparaît, puis les entrées sont évaluées par score
+        maximal décroissant jusqu'à ce qu'aucune ne puisse plus entrer dans
+        les k meilleures
+        
+        Returns:
+            List[Tuple[int, float]]: [(position, score)], meilleure d'abord
+        """
+        size = len(index.entries)
+        counts = defaultdict(list)
+        for source, positions in lists:
+            counts[source].append(positions)
+        # Les correspondances exactes ne sont bornées par aucune liste
+        counts['exact'].append(index.exact_positions(query.text_hash))
+        counts = {
+            source: np.bincount(np.concatenate([np.asarray(positions, dtype=np.int64) for positions in arrays]), minlength=size)
+            for source, arrays in counts.items()
+        }
+        
+        selected = [counts[source] for source in (sources or counts) if source in counts] + [counts['exact']]
+        positions = np.flatnonzero(np.sum(selected, axis=0)) if selected else np.array([], dtype=np.int64)
+        if not len(positions):
+            return []
+        
+        def count(source):
+            return counts[source][positions] if source in counts else 0
+        
+        # Score maximal (voir `_heuristic_score`) : exact pour les composantes
+        # question, mots-clés et phrases, sauf mots-clés répétés dans une entrée
+        ids, stems, keyword_shares, thresholds = index.entry_arrays()
+        bounds = np.minimum(count('exact'), 1) * 1.0
+        bounds += count('question') / np.maximum(len(query.words), stems[positions]) * 0.6
+        bounds += np.minimum((count('keyword') + count('partial') * 0.5) * keyword_shares[positions], 1.0) * 0.5
+        bounds += np.minimum(count('phrase'), 1) * 0.3 + np.minimum(count('greeting'), 1) * 0.4
+        bounds += 0.2 if query.is_short else 0.0
+        
+        # Entrées retirées ou sous leur seuil même au score maximal
+        keep = bounds >= thresholds[positions] - BOUND_TOLERANCE
+        positions, bounds = positions[keep], bounds[keep]
+        
+        # Tas des k meilleures (score, -id, position) : à score égal, l'entrée
+        # la plus ancienne l'emporte. Les entrées sont parcourues par score
+        # maximal décroissant puis id croissant : une entrée dont le score
+        # maximal égale le k-ième score et d'id plus grand ne peut pas entrer.
+        ids = ids[positions]
+        heap = []
+        for i in np.lexsort((ids, -bounds)).tolist():
+            if len(heap) == k:
+                if bounds[i] + BOUND_TOLERANCE < heap[0][0]:
+                    break
+                if bounds[i] <= heap[0][0] + BOUND_TOLERANCE and ids[i] > -heap[0][1]:
+                    continue
+            position = int(positions[i])
+            entry = index.entries[position]
+            score = scores.get(position)
+            if score is None:
+                score = scores[position] = self._heuristic_score(entry, query)
+            if score > 0 and score >= entry.dynamic_threshold:
+                item = (score, -entry.id, position)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                else:
+                    heapq.heappushpop(heap, item)
+        return [(position, score) for score, _, position in sorted(heap, reverse=True)]
+    
+    def _rank_batch(self, index, query: '_HeuristicQuery', positions: List[int],
+                    scores: Dict[int, float], k: int) -> List[Tuple[int, float]]:
+        if sharded_scorer.should_shard(len(positions)):
+            # Très grande liste : positions réparties entre les processus du pool
+            try:
+                return sharded_scorer.rank(index, query, positions, k)
+            except BrokenProcessPool as e:
+                logger.warning(f"Pool de score interrompu, score dans le processus courant: {e}")
+                sharded_scorer.shutdown()
+            except (CancelledError, RuntimeError) as e:
+                # Pool arrêté par un autre thread (pool interrompu) pendant cette recherche
+                logger.info(f"Pool de score arrêté, score dans le processus courant: {e}")
+        return self._heuristic_rank(index, query, positions, scores, k)
+    
+    @classmethod
+    def _heuristic_rank(cls, index, query: '_HeuristicQuery', positions: List[int],
+                        scores: Dict[int, float], k: int) -> List[Tuple[int, float]]:
+        """
+        Les k meilleures entrées parmi `positions` (tri partiel) ; les scores
+        déjà calculés par un palier précédent sont repris de `scores`
+        """
+        passing = []
+        for position in positions:
+            entry = index.entries[position]
+            score = scores.get(position)
+            if score is None:
+                score = scores[position] = cls._heuristic_score(entry, query)
             
-            logger.info(f"{'✅' if score >= dynamic_threshold else '❌'} [{score:.3f} >= {dynamic_threshold:.3f}] {entry.question[:50]}... | {', '.join(details)}")
+            # Plancher commun du classement (pré-calculé dans l'index), le seuil de
+            # confiance de l'entrée décide ensuite de la réponse
+            if score > 0 and score >= entry.dynamic_threshold:
+                passing.append((score, -entry.id, position))
+        
+        # À score égal, l'entrée la plus ancienne l'emporte (les entrées
+        # modifiées sont déplacées en fin d'index)
+        return [(position, score) for score, _, position in heapq.nlargest(k, passing)]
+    
+    @staticmethod
+    def _heuristic_score(entry, query: '_HeuristicQuery', components: Optional[Dict[str, float]] = None) -> float:
+        """
+        Score heuristique d'une entrée ; le détail par composante n'est
+        construit que si un dictionnaire `components` est fourni
+        """
+        score = 0.0
+        
+        # 1. CORRESPONDANCE EXACTE - Score très élevé
+        if query.text == entry.question_text:
+            score = 1.0
+            if components is not None:
+                components['exact'] = 1.0
+        
+        # 2. CORRESPONDANCE DANS LA QUESTION - Plus permissif
+        question_matches = query.words.intersection(entry.question_stems)
+        if question_matches:
+            question_score = len(question_matches) / max(len(query.words), len(entry.question_stems))
+            score += question_score * 0.6  # Poids plus élevé
+            if components is not None:
+                components['question'] = question_score * 0.6
+        
+        # 3. CORRESPONDANCE MOTS-CLÉS - Plus intelligente
+        if entry.keywords:
+            keyword_matches = 0
+            for keyword in entry.keywords:
+                # Correspondance exacte du mot-clé
+                if keyword in query.lexicon_hits:
+                    keyword_matches += 1
+                # Correspondance partielle pour les mots composés
+                elif keyword in query.partial_keywords:
+                    keyword_matches += 0.5
             
-            if score >= dynamic_threshold and score > best_score:
-                best_match = entry
-                best_score = score
-        
-        if best_match:
-            logger.info(f"🎯 MEILLEURE CORRESPONDANCE: '{best_match.question}' avec score {best_score:.3f}")
+            keyword_score = keyword_matches / len(entry.keywords)
+            score += keyword_score * 0.5  # Poids élevé pour les mots-clés
+            if components is not None:
+                components['keywords'] = keyword_score * 0.5
+        
+        # 4. CORRESPONDANCE PARTIELLE DANS LA QUESTION - Nouveau
+        if query.text in entry.question_text or entry.question_text in query.text:
+            score += 0.3
+            if components is not None:
+                components['partial'] = 0.3
+        
+        # 5. BONUS POUR LES SALUTATIONS
+        if query.has_salutation and entry.is_greeting:
+            score += 0.4
+            if components is not None:
+                components['salutation'] = 0.4
+        
+        # 6. BONUS POUR LES QUESTIONS COURTES
+        if query.is_short and score > 0:
+            score += 0.2
+            if components is not None:
+                components['short_question'] = 0.2
+        
+        return score
+    
+    def _explain(self, index, user_message: str, k: int = 5) -> List[Dict[str, Any]]:
+        if not len(index):
+            return []
+        
+        normalized = normalize(user_message)
+        if self.backend == 'heuristic':
+            query = self._heuristic_query(index, normalized)
+            scored = []
+            for position in index.candidates(query.text, query.words, query.lexicon_hits, query.partial_keywords):
+                components = {}
+                scored.append((self._heuristic_score(index.entries[position], query, components), position, components))
+            top = heapq.nsmallest(k, scored, key=lambda item: (-item[0], item[1]))
         else:
-            logger.info("❌ Aucune correspondance trouvée")
-        
-        return best_match, best_score
+            backend = self._vector_backend(index)
+            vector_query = self._vector_query(index, user_message, normalized)
+            scores = backend.score(vector_query)
+            top = []
+            if scores is not None:
+                # Les positions retirées par mise à jour incrémentale sont ignorées
+                ranked = np.argsort(-scores, kind='stable')[:k + len(index.removed)]
+                positions = [int(position) for position in ranked if position not in index.removed][:k]
+                details = backend.explain(vector_query, positions)
+                top = [(float(scores[position]), position, components) for position, components in zip(positions, details)]
+        
+        explanation = []
+        for score, position, components in top:
+            entry = index.entries[position]
+            explanation.append({
+                'id': entry.id,
+                'question': entry.question,
+                'score': score,
+                'threshold': entry.dynamic_threshold,
+                'matched': score >= entry.dynamic_threshold and score > 0,
+                'components': components,
+            })
+        return explanation
+    
+    def _trace(self, index, user_message: str, best_position: Optional[int], best_score: float, duration: float) -> Dict[str, Any]:
+        return {
+            'timestamp': time.time(),
+            'message': user_message,
+            'backend': self.backend,
+            'match_id': index.entries[best_position].id if best_position is not None else None,
+            'score': best_score,
+            'duration_ms': duration * 1000,
+            'top': self._explain(index, user_message, k=getattr(settings, 'CHATBOT_TRACE_TOP_K', 5)),
+        }
+
+
+class _HeuristicQuery:
+    """
+    Message préparé une fois pour le score heuristique de toutes les entrées
+    """
+    
+    __slots__ = (
+        'text', 'text_hash', 'words', 'long_words', 'is_short', 'has_salutation', 'lexicon_hits', 'partial_keywords',
+    )
+    
+    def __init__(self, index, normalized: NormalizedText, lexicon_hits):
+        self.text = normalized.text
+        self.text_hash = question_hash(normalized)
+        self.words = set(normalized.stems)
+        self.long_words = [word for word in set(normalized.tokens) if len(word) > 2]
+        self.is_short = len(self.words) <= 3
+        self.has_salutation = any(sal in self.text for sal in SALUTATIONS)
+        self.lexicon_hits = lexicon_hits
+        self.partial_keywords = index.partial_keywords(self.long_words)
 
 
 class AIResponseGenerator:
@@ -210,7 +602,8 @@ class AIResponseGenerator:
             ]
         }
     
-    def generate_response(self, user_message: str, conversation_history: list = None, detected_emotion: str = None) -> str:
+    def generate_response(self, user_message: str, conversation_history: list = None, detected_emotion: str = None,
+                          normalized: Optional[NormalizedText] = None) -> str:
         """
         Génère une réponse IA naturelle et empathique
         
@@ -218,14 +611,16 @@ class AIResponseGenerator:
             user_message: Message de l'utilisateur
             conversation_history: Historique de la conversation
             detected_emotion: Émotion détectée
+            normalized: Message déjà normalisé (optionnel)
             
         Returns:
             str: Réponse générée
         """
-        user_message_lower = user_message.lower()
+        # Mots recherchés sans accents, dans le message normalisé
+        text = (normalized or normalize(user_message)).text
         
         # Réponses contextuelles et naturelles
-        if any(greeting in user_message_lower for greeting in ['bonjour', 'salut', 'hello', 'hey', 'coucou']):
+        if any(greeting in text for greeting in ['bonjour', 'salut', 'hello', 'hey', 'coucou']):
             greetings = [
                 "Salut ! 😊 Super de vous voir ! Comment ça va aujourd'hui ?",
                 "Hello ! Ravi de vous retrouver ! Qu'est-ce qui vous amène ?",
@@ -235,7 +630,7 @@ class AIResponseGenerator:
             ]
             return self._random_choice(greetings)
         
-        if any(thanks in user_message_lower for thanks in ['merci', 'thank', 'remercie', 'super', 'génial']):
+        if any(thanks in text for thanks in ['merci', 'thank', 'remercie', 'super', 'genial']):
             thanks_responses = [
                 "Mais de rien, ça me fait plaisir ! 😊 C'est pour ça que je suis là !",
                 "Avec grand plaisir ! N'hésitez surtout pas si vous avez d'autres questions !",
@@ -245,7 +640,7 @@ class AIResponseGenerator:
             ]
             return self._random_choice(thanks_responses)
         
-        if any(goodbye in user_message_lower for goodbye in ['au revoir', 'bye', 'à bientôt', 'salut', 'tchao']):
+        if any(goodbye in text for goodbye in ['au revoir', 'bye', 'a bientot', 'salut', 'tchao']):
             goodbye_responses = [
                 "Au revoir ! 👋 C'était un vrai plaisir de discuter avec vous ! À très bientôt !",
                 "Bye bye ! J'espère qu'on se reparlera bientôt ! Passez une excellente journée ! ☀️",
@@ -257,12 +652,12 @@ class AIResponseGenerator:
         
         # Réponses selon l'émotion détectée
         if detected_emotion:
-            emotion_response = self._get_empathetic_response(detected_emotion, user_message_lower)
+            emotion_response = self._get_empathetic_response(detected_emotion, text)
             if emotion_response:
                 return emotion_response
         
         # Réponses contextuelles spécifiques
-        if any(word in user_message_lower for word in ['aide', 'aider', 'help', 'assistance']):
+        if any(word in text for word in ['aide', 'aider', 'help', 'assistance']):
             help_responses = [
                 "Bien sûr que je peux vous aider ! 😊 C'est exactement pour ça que je suis là ! Dites-moi ce qui vous préoccupe !",
                 "Avec plaisir ! J'adore pouvoir rendre service ! Alors, qu'est-ce qui vous tracasse ?",
@@ -271,7 +666,7 @@ class AIResponseGenerator:
             ]
             return self._random_choice(help_responses)
         
-        if any(word in user_message_lower for word in ['problème', 'souci', 'bug', 'erreur', 'marche pas']):
+        if any(word in text for word in ['probleme', 'souci', 'bug', 'erreur', 'marche pas']):
             problem_responses = [
                 "Oh là là, un petit souci ? 😔 Pas de panique, on va régler ça ensemble ! Dites-moi exactement ce qui se passe !",
                 "Aïe, un problème ! Ne vous inquiétez pas, je vais faire de mon mieux pour vous aider ! Pouvez-vous me décrire la situation ?",
@@ -280,8 +675,8 @@ class AIResponseGenerator:
             ]
             return self._random_choice(problem_responses)
         
-        # Réponse par défaut aléatoire et naturelle
-        return self._get_natural_fallback_response(user_message_lower)
+        # Réponse par défaut aléatoire et naturelle (la ponctuation compte ici)
+        return self._get_natural_fallback_response(user_message.lower())
     
     def _get_empathetic_response(self, emotion: str, message: str) -> str:
         """Génère une réponse empathique selon l'émotion"""
@@ -331,7 +726,8 @@ class ChatbotService:
         self.knowledge_matcher = KnowledgeBaseMatcher()
         self.ai_generator = AIResponseGenerator()
     
-    def process_message(self, user_message: str, session_id: str = None, user_id: int = None) -> Dict[str, Any]:
+    def process_message(self, user_message: str, session_id: str = None, user_id: int = None,
+                        suggestions: int = 0) -> Dict[str, Any]:
         """
         Traite un message utilisateur et génère une réponse
         
@@ -339,6 +735,8 @@ class ChatbotService:
             user_message: Message de l'utilisateur
             session_id: ID de session (optionnel)
             user_id: ID utilisateur (optionnel)
+            suggestions: Nombre maximum d'autres questions de la base proposées
+                (« vouliez-vous dire ? »), tirées de la même recherche
             
         Returns:
             Dict: Réponse complète avec métadonnées
@@ -358,8 +756,13 @@ class ChatbotService:
         except:
             detected_language = 'fr'  # Français par défaut
         
+        # Normalisation et relevé uniques des mots-clés (de l'index de la
+        # langue du message)
+        normalized = normalize(user_message)
+        lexicon_hits = get_knowledge_index(route_language(detected_language)[0]).scan(normalized.text)
+        
         # Détection d'émotion
-        emotion, emotion_confidence = self.emotion_detector.detect_emotion(user_message)
+        emotion, emotion_confidence = self.emotion_detector.detect_emotion(user_message, normalized)
         
         # Sauvegarde du message utilisateur
         user_message_obj = Message.objects.create(
@@ -371,10 +774,23 @@ class ChatbotService:
             detected_language=detected_language
         )
         
+        # Réponse déjà donnée à un message très proche (même langue, même version
+        # de la base) ; les suggestions demandent une recherche complète
+        vector = self._response_vector(user_message, normalized) if response_cache.enabled else None
+        cache_scope = (route_language(detected_language)[0], knowledge_base_version())
+        cached = response_cache.get(vector, *cache_scope) if vector is not None and not suggestions else None
+        
         # Génération de la réponse
-        response_text, response_method, knowledge_used = self._generate_response(
-            user_message, conversation
-        )
+        if cached is not None:
+            response_text, response_method, knowledge_used = cached
+            runners_up = []
+        else:
+            response_text, response_method, knowledge_used, runners_up = self._generate_response(
+                user_message, conversation, lexicon_hits, normalized, suggestions, detected_language
+            )
+            if vector is not None and response_method in getattr(
+                    settings, 'CHATBOT_RESPONSE_CACHE_METHODS', ('ai_generation',)):
+                response_cache.set(vector, *cache_scope, (response_text, response_method, knowledge_used))
         
         # Calcul du temps de traitement
         processing_time = time.time() - start_time
@@ -389,7 +805,7 @@ class ChatbotService:
             processing_time=processing_time
         )
         
-        return {
+        response = {
             'message': response_text,
             'session_id': session_id,
             'conversation_id': conversation.id,
@@ -398,6 +814,26 @@ class ChatbotService:
             'response_method': response_method,
             'processing_time': processing_time
         }
+        if suggestions:
+            response['suggestions'] = [
+                {'id': entry.id, 'question': entry.question, 'score': score} for entry, score in runners_up
+            ]
+        return response
+    
+    def _response_vector(self, user_message: str, normalized: NormalizedText) -> np.ndarray:
+        """
+        Vecteur du message pour le cache des réponses : plongement du modèle
+        de phrases (CHATBOT_RESPONSE_CACHE_VECTORS = 'semantic') ou n-grammes
+        hachés, sans modèle
+        """
+        if getattr(settings, 'CHATBOT_RESPONSE_CACHE_VECTORS', 'hashed') == 'semantic':
+            model = get_embedding_model()
+            if model is not None:
+                return model.encode(
+                    [user_message.strip()], convert_to_numpy=True,
+                    normalize_embeddings=True, show_progress_bar=False,
+                )[0].astype(np.float32)
+        return hashed_vector(normalized.text)
     
     def _get_or_create_conversation(self, session_id: str, user_id: int = None) -> Conversation:
         """
@@ -417,18 +853,26 @@ class ChatbotService:
         
         return conversation
     
-    def _generate_response(self, user_message: str, conversation: Conversation) -> Tuple[str, str, Optional[KnowledgeBase]]:
+    def _generate_response(self, user_message: str, conversation: Conversation, lexicon_hits=None,
+                           normalized: Optional[NormalizedText] = None, suggestions: int = 0,
+                           language: Optional[str] = None
+                           ) -> Tuple[str, str, Optional[KnowledgeBase], List[Tuple[KnowledgeBase, float]]]:
         """
         Génère une réponse en utilisant la stratégie en couches
         
         Returns:
-            Tuple[str, str, KnowledgeBase]: (réponse, méthode, base_connaissance_utilisée)
+            Tuple[str, str, KnowledgeBase, List]: (réponse, méthode, base_connaissance_utilisée,
+            au plus `suggestions` autres correspondances)
         """
         # 1. Recherche dans la base de connaissances
-        knowledge_match, confidence = self.knowledge_matcher.find_best_match(user_message)
+        normalized = normalized or normalize(user_message)
+        matches = self._find_knowledge_matches(user_message, lexicon_hits, normalized, 1 + suggestions, language)
+        knowledge_match, confidence = matches[0] if matches else (None, 0.0)
         
         if knowledge_match and confidence > knowledge_match.confidence_threshold:
-            return knowledge_match.answer, 'knowledge_base', knowledge_match
+            return knowledge_match.answer, 'knowledge_base', knowledge_match, matches[1:]
+        # Sans réponse de la base, toutes les correspondances sont proposées
+        runners_up = matches[:suggestions]
           # 2. Génération IA
         settings_obj = ChatbotSettings.objects.first()
         if not settings_obj or settings_obj.enable_ai_generation:
@@ -442,12 +886,48 @@ class ChatbotService:
             if last_user_message:
                 user_emotion = last_user_message.detected_emotion
             
-            ai_response = self.ai_generator.generate_response(user_message, conversation_history, user_emotion)
-            return ai_response, 'ai_generation', None
+            ai_response = self.ai_generator.generate_response(user_message, conversation_history, user_emotion, normalized)
+            return ai_response, 'ai_generation', None, runners_up
         
         # 3. Réponse par défaut
         default_response = "Je ne suis pas sûr de comprendre votre question. Pouvez-vous la reformuler ?"
         if settings_obj:
             default_response = settings_obj.default_response
         
-        return default_response, 'fallback', None
+        return default_response, 'fallback', None, runners_up
+    
+    def _find_knowledge_matches(self, user_message: str, lexicon_hits=None,
+                                normalized: Optional[NormalizedText] = None,
+                                k: int = 1, language: Optional[str] = None) -> List[Tuple[KnowledgeBase, float]]:
+        """
+        Les k meilleures correspondances dans la base de connaissances (index
+        de la langue du message), servies depuis le cache pour les messages
+        déjà vus (même message une fois normalisé) tant que la version de la
+        base n'a pas changé
+        """
+        normalized = normalized or normalize(user_message)
+        cache_key = (
+            knowledge_base_version(), self.knowledge_matcher.backend, route_language(language)[0], normalized.text, k
+        )
+        cached = match_cache.get(cache_key)
+        if cached is not None:
+            self._shadow(user_message, normalized, language, cached)
+            entries = KnowledgeBase.objects.in_bulk([entry_id for entry_id, _ in cached])
+            return [(entries[entry_id], score) for entry_id, score in cached if entry_id in entries]
+        
+        started = time.perf_counter()
+        matches = self.knowledge_matcher.find_top_matches(user_message, k, lexicon_hits, normalized, language)
+        ranked = tuple((entry.id, score) for entry, score in matches)
+        self._shadow(user_message, normalized, language, ranked, time.perf_counter() - started)
+        match_cache.set(cache_key, ranked)
+        return matches
+    
+    def _shadow(self, user_message: str, normalized: NormalizedText, language: Optional[str],
+                ranked, latency: Optional[float] = None):
+        # Mode fantôme (CHATBOT_SHADOW_BACKEND) : le moteur candidat est évalué
+        # sur le même message après l'envoi de la réponse
+        if shadow_runner.enabled:
+            shadow_runner.submit(
+                user_message, normalized, language, self.knowledge_matcher.backend,
+                ranked[0] if ranked else None, latency,
+            )
@@ -0,0 +1,222 @@
+"""
+Mode fantôme : comparaison d'un moteur de correspondance candidat avec le
+moteur en service, sur les messages réels, sans ralentir les réponses
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import defaultdict, namedtuple
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .normalization import NormalizedText
+from .tracing import TierCounters
+
+logger = logging.getLogger(__name__)
+
+# Recherche du moteur en service, transmise au moteur candidat
+ShadowRequest = namedtuple('ShadowRequest', (
+    'user_message', 'normalized', 'language', 'primary_backend', 'primary', 'primary_latency',
+))
+
+_COUNTERS = (
+    'messages', 'agreements', 'primary_only', 'shadow_only', 'compared', 'score_delta_sum',
+    'score_delta_abs_sum', 'primary_timed', 'primary_latency_ms_sum', 'shadow_latency_ms_sum',
+)
+
+
+class ShadowRunner:
+    """
+    File bornée et thread d'arrière-plan qui rejouent les messages sur le
+    moteur candidat `backend`.
+
+    Pendant une requête, les recherches sont seulement mises de côté ; elles
+    sont déposées dans la file une fois la réponse envoyée (signal
+    request_finished), sans jamais bloquer : une recherche est abandonnée
+    si la file est pleine.
+    Le thread compare les meilleures entrées des deux moteurs et cumule
+    les résultats en mémoire ; ils sont écrits dans ShadowComparison (une
+    ligne par heure) toutes les `flush_seconds` secondes.
+    """
+
+    def __init__(self, backend: Optional[str], sample_rate: float = 1.0, maxsize: int = 1000,
+                 flush_seconds: float = 30.0):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.flush_seconds = flush_seconds
+        self.tiers = TierCounters(('exact', 'keywords', 'category', 'full'))
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._pending: Dict[Tuple, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        self._matcher = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+        self._lock = threading.Lock()
+        # Recherches de la requête en cours du thread, déposées à sa fin
+        self._local = threading.local()
+        self._submitted = self._dropped = self._processed = self._failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.backend)
+
+    def submit(self, user_message: str, normalized: NormalizedText, language: str, primary_backend: str,
+               primary: Optional[Tuple[int, float]], primary_latency: Optional[float] = None):
+        """
+        Dépose une recherche du moteur en service (id et score de sa
+        meilleure entrée, durée si elle n'a pas été servie par le cache)
+        """
+        if not self.enabled or self.backend == primary_backend or random.random() >= self.sample_rate:
+            return
+        request = ShadowRequest(user_message, normalized, language, primary_backend, primary, primary_latency)
+        deferred = getattr(self._local, 'deferred', None)
+        if deferred is not None:
+            deferred.append(request)
+        else:
+            self._enqueue([request])
+
+    def request_started(self, **kwargs):
+        self._local.deferred = []
+
+    def request_finished(self, **kwargs):
+        deferred, self._local.deferred = getattr(self._local, 'deferred', None), None
+        if deferred:
+            self._enqueue(deferred)
+
+    def _enqueue(self, requests):
+        self._ensure_thread()
+        for request in requests:
+            try:
+                self._queue.put_nowait(request)
+                self._submitted += 1
+            except queue.Full:
+                self._dropped += 1
+
+    def _ensure_thread(self):
+        # Les threads ne survivent pas à un fork : un thread par processus
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue(maxsize=self._queue.maxsize)
+                    self._pending.clear()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='chatbot-shadow', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                request = self._queue.get(timeout=self.flush_seconds)
+            except queue.Empty:
+                request = None
+            if request is not None:
+                try:
+                    self._compare(request)
+                    self._processed += 1
+                except Exception as e:
+                    self._failed += 1
+                    logger.warning(f"Mode fantôme: comparaison impossible: {e}")
+            if time.monotonic() - last_flush >= self.flush_seconds:
+                self.flush()
+                last_flush = time.monotonic()
+
+    def _compare(self, request: ShadowRequest):
+        from .services import KnowledgeBaseMatcher
+
+        if self._matcher is None:
+            self._matcher = KnowledgeBaseMatcher(self.backend, tiers=self.tiers)
+
+        started = time.perf_counter()
+        index, ranked = self._matcher.rank(request.user_message, request.normalized, None, request.language, 1)
+        shadow_latency = time.perf_counter() - started
+        shadow = (index.entries[ranked[0][0]].id, ranked[0][1]) if ranked else None
+        primary = request.primary
+
+        period = timezone.now().replace(minute=0, second=0, microsecond=0)
+        key = (request.primary_backend, self._matcher.backend, index.language if index else request.language, period)
+        with self._lock:
+            counters = self._pending[key]
+            counters['messages'] += 1
+            counters['agreements'] += (shadow[0] if shadow else None) == (primary[0] if primary else None)
+            counters['primary_only'] += primary is not None and shadow is None
+            counters['shadow_only'] += shadow is not None and primary is None
+            if shadow and primary:
+                delta = shadow[1] - primary[1]
+                counters['compared'] += 1
+                counters['score_delta_sum'] += delta
+                counters['score_delta_abs_sum'] += abs(delta)
+            if request.primary_latency is not None:
+                counters['primary_timed'] += 1
+                counters['primary_latency_ms_sum'] += request.primary_latency * 1000
+            counters['shadow_latency_ms_sum'] += shadow_latency * 1000
+            counters['shadow_latency_ms_max'] = max(counters['shadow_latency_ms_max'], shadow_latency * 1000)
+
+    def flush(self):
+        """
+        Ajoute les résultats cumulés aux lignes horaires de ShadowComparison
+        """
+        from .models import ShadowComparison
+
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: defaultdict(float))
+        if not pending:
+            return
+        try:
+            for (primary_backend, shadow_backend, language, period), counters in pending.items():
+                row, _ = ShadowComparison.objects.get_or_create(
+                    primary_backend=primary_backend, shadow_backend=shadow_backend, language=language, period=period,
+                )
+                ShadowComparison.objects.filter(pk=row.pk).update(
+                    shadow_latency_ms_max=Greatest(F('shadow_latency_ms_max'), counters['shadow_latency_ms_max']),
+                    **{name: F(name) + (counters[name] if name.endswith('_sum') else int(counters[name]))
+                       for name in _COUNTERS},
+                )
+        except Exception as e:
+            logger.warning(f"Mode fantôme: écriture des comparaisons impossible: {e}")
+        finally:
+            # Connexion propre à ce thread : libérée entre deux écritures
+            connection.close()
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            'backend': self.backend,
+            'sample_rate': self.sample_rate,
+            'submitted': self._submitted,
+            'dropped': self._dropped,
+            'processed': self._processed,
+            'failed': self._failed,
+            'queued': self._queue.qsize(),
+            'tiers': self.tiers.stats(),
+        }
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Traite les recherches en attente (au plus `timeout` secondes) et
+        écrit les derniers résultats, à l'arrêt du processus
+        """
+        if self._thread is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.flush()
+
+
+shadow_runner = ShadowRunner(
+    backend=getattr(settings, 'CHATBOT_SHADOW_BACKEND', None),
+    sample_rate=getattr(settings, 'CHATBOT_SHADOW_SAMPLE_RATE', 1.0),
+    maxsize=getattr(settings, 'CHATBOT_SHADOW_QUEUE_SIZE', 1000),
+    flush_seconds=getattr(settings, 'CHATBOT_SHADOW_FLUSH_SECONDS', 30),
+)
+atexit.register(shadow_runner.stop)
@@ -0,0 +1,43 @@
+from django.core.signals import request_finished, request_started
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import match_cache, response_cache
+from .index import refresh_knowledge_indexes
+from .models import KnowledgeBase, KnowledgeBaseChange, knowledge_base_bulk_changed
+from .shadow import shadow_runner
+
+
+def _record_changes(ids):
+    """
+    Journalise les entrées modifiées (dans la transaction de la
+    modification) ; tous les processus les appliquent à leur index
+    """
+    KnowledgeBaseChange.objects.bulk_create([KnowledgeBaseChange(knowledge_id=pk) for pk in ids])
+    match_cache.clear()
+    response_cache.clear()
+    # Le processus auteur de la modification n'attend pas son prochain contrôle de version
+    transaction.on_commit(refresh_knowledge_indexes)
+
+
+@receiver(post_save, sender=KnowledgeBase)
+@receiver(post_delete, sender=KnowledgeBase)
+def update_knowledge_index(sender, instance, **kwargs):
+    """
+    Toute modification de la base de connaissances invalide les
+    correspondances mises en cache et est répercutée sur les index
+    """
+    _record_changes([instance.pk])
+
+
+@receiver(knowledge_base_bulk_changed, sender=KnowledgeBase)
+def update_knowledge_index_bulk(sender, ids, **kwargs):
+    if ids:
+        _record_changes(ids)
+
+
+# Mode fantôme : les recherches d'une requête sont rejouées une fois la réponse envoyée
+if shadow_runner.enabled:
+    request_started.connect(shadow_runner.request_started, dispatch_uid='chatbot_shadow_started')
+    request_finished.connect(shadow_runner.request_finished, dispatch_uid='chatbot_shadow_finished')
@@ -0,0 +1,146 @@
+"""
+Correction orthographique des messages (SymSpell) sur le vocabulaire de la base
+"""
+import re
+from collections import Counter
+from typing import Dict, Iterable, Optional, Set
+
+_WORD = re.compile(r'\w+')
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """Toutes les variantes de `word` obtenues en supprimant jusqu'à `max_distance` caractères"""
+    found = set()
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for candidate in frontier:
+            if len(candidate) <= 1:
+                continue
+            for i in range(len(candidate)):
+                deleted = candidate[:i] + candidate[i + 1:]
+                if deleted not in found:
+                    next_frontier.add(deleted)
+        found |= next_frontier
+        frontier = next_frontier
+    return found
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    Distance de Damerau-Levenshtein (transpositions adjacentes) ; retourne
+    `max_distance + 1` dès que la distance dépasse `max_distance`
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous_previous is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        # Une transposition peut s'appuyer sur la ligne précédente : elle doit aussi dépasser
+        if min(current) > max_distance and min(previous) >= max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SymSpellIndex:
+    """
+    Index de voisinage par suppressions (SymSpell) du vocabulaire.
+
+    Chaque mot du vocabulaire est enregistré sous toutes ses variantes à une
+    ou deux suppressions près. Un mot mal orthographié est corrigé en
+    consultant ses propres variantes : le nombre de recherches dépend de la
+    longueur du mot, pas de la taille du vocabulaire.
+    """
+
+    def __init__(self, words: Iterable[str], max_distance: int = 2, min_length: int = 4):
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.frequencies: Dict[str, int] = Counter(word for word in words if not word.isdigit())
+        self._deletes: Dict[str, list] = {}
+        for word in self.frequencies:
+            self._register(word)
+        self._corrections: Dict[str, Optional[str]] = {}
+
+    def _register(self, word: str):
+        if len(word) < self.min_length - self.max_distance:
+            return
+        for variant in _deletes(word, self.max_distance) | {word}:
+            self._deletes.setdefault(variant, []).append(word)
+
+    def add(self, words: Iterable[str]):
+        """
+        Ajoute des mots au vocabulaire (entrée ajoutée ou modifiée)
+        """
+        for word in words:
+            if word.isdigit():
+                continue
+            if word not in self.frequencies:
+                self._register(word)
+            self.frequencies[word] += 1
+        # Les corrections mémorisées peuvent désormais être différentes
+        self._corrections = {}
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.frequencies
+
+    def _allowed_distance(self, word: str) -> int:
+        # Une seule erreur tolérée pour les mots courts
+        return self.max_distance if len(word) >= 8 else min(1, self.max_distance)
+
+    def lookup(self, word: str) -> Optional[str]:
+        """
+        Mot du vocabulaire le plus proche (distance minimale, puis le plus
+        fréquent), ou None s'il n'y en a pas dans la distance autorisée
+        """
+        if word in self.frequencies:
+            return word
+        if len(word) < self.min_length or word.isdigit():
+            return None
+        if word in self._corrections:
+            return self._corrections[word]
+
+        max_distance = self._allowed_distance(word)
+        best, best_key = None, None
+        for variant in _deletes(word, max_distance) | {word}:
+            for candidate in self._deletes.get(variant, ()):
+                distance = edit_distance(word, candidate, max_distance)
+                if distance > max_distance:
+                    continue
+                key = (distance, -self.frequencies[candidate], candidate)
+                if best_key is None or key < best_key:
+                    best, best_key = candidate, key
+
+        if len(self._corrections) < 100000:
+            self._corrections[word] = best
+        return best
+
+    def correct(self, text: str) -> str:
+        """
+        Remplace dans `text` (normalisé) les mots inconnus par leur
+        correction ; la ponctuation et les mots connus sont conservés
+        """
+        def replace(match):
+            word = match.group(0)
+            return self.lookup(word) or word
+
+        return _WORD.sub(replace, text)
+
+
+def vocabulary(entries: Iterable) -> Iterable[str]:
+    """
+    Mots des questions et des mots-clés des entrées compilées (un par entrée
+    et par mot, ce qui donne la fréquence documentaire)
+    """
+    for entry in entries:
+        words = set(_WORD.findall(entry.question_text))
+        for keyword in entry.keywords:
+            words.update(_WORD.findall(keyword))
+        yield from words
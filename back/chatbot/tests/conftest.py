@@ -0,0 +1,29 @@
+"""
+Fixtures communes des tests du chatbot
+"""
+import pytest
+
+from chatbot import index as knowledge_index
+from chatbot.cache import match_cache, response_cache
+from chatbot.classifier import reset_category_classifier
+
+
+def _reset_process_state():
+    knowledge_index._index_caches.clear()
+    match_cache.clear()
+    response_cache.clear()
+    reset_category_classifier()
+
+
+@pytest.fixture
+def knowledge_base(db, settings, tmp_path):
+    """
+    Base de test vide : index et classifieur dans un répertoire temporaire,
+    version de la base contrôlée à chaque appel, caches du processus vidés
+    """
+    settings.CHATBOT_INDEX_DIR = tmp_path / 'index'
+    settings.CHATBOT_CLASSIFIER_PATH = tmp_path / 'category_classifier.npz'
+    settings.CHATBOT_KB_VERSION_CHECK_MS = 0
+    _reset_process_state()
+    yield
+    _reset_process_state()
@@ -0,0 +1,116 @@
+"""
+Calibration des seuils de confiance (evaluation.calibrate_thresholds,
+manage.py calibrate_thresholds) : précision maximale au rappel cible,
+seuils bornés par MIN_DYNAMIC_THRESHOLD et MAX_THRESHOLD
+"""
+from io import StringIO
+from pathlib import Path
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+from chatbot.evaluation import MAX_THRESHOLD, best_predictions, calibrate_thresholds, knowledge_rows
+from chatbot.index import MIN_DYNAMIC_THRESHOLD, get_knowledge_index
+from chatbot.models import KnowledgeBase
+
+KNOWLEDGE_FILE = Path(__file__).resolve().parent.parent / 'knowledge_base.json'
+
+
+def calibrate(predictions, **kwargs):
+    scores, correct, groups = zip(*predictions)
+    return calibrate_thresholds(np.array(scores), np.array(correct), np.array(groups), **kwargs)
+
+
+PREDICTIONS = [(0.9, True, 'A'), (0.8, True, 'A'), (0.6, False, 'A'), (0.5, True, 'A')]
+
+
+def test_best_precision_at_target_recall():
+    [choice] = calibrate(PREDICTIONS, target_recall=0.6).values()
+    # Coupe après 0.8 : réponses au-dessus de 0.6 (strictement), sans erreur
+    assert choice.threshold == pytest.approx(0.6)
+    assert (choice.precision, choice.recall, choice.support) == (1.0, pytest.approx(2 / 3), 4)
+
+
+def test_full_recall_keeps_lowest_correct_score():
+    [choice] = calibrate(PREDICTIONS, target_recall=0.9).values()
+    # Toutes les prédictions conservées : seuil ramené au seuil minimal
+    assert choice.threshold == MIN_DYNAMIC_THRESHOLD
+    assert (choice.precision, choice.recall) == (0.75, 1.0)
+
+
+def test_cut_never_splits_equal_scores():
+    [choice] = calibrate([(0.8, True, 'A'), (0.8, False, 'A'), (0.7, True, 'A')], target_recall=0.5).values()
+    assert choice.threshold == MIN_DYNAMIC_THRESHOLD
+    assert choice.precision == pytest.approx(2 / 3)
+
+
+def test_threshold_is_capped():
+    [choice] = calibrate([(1.0, True, 'A'), (0.99, False, 'A')], target_recall=0.5).values()
+    # Un seuil de 0.99 écarterait aussi les correspondances exactes d'autres messages
+    assert choice.threshold == MAX_THRESHOLD
+
+
+def test_min_threshold():
+    [choice] = calibrate(PREDICTIONS, target_recall=0.9, min_threshold=0.55).values()
+    assert choice.threshold == 0.55
+
+
+def test_group_without_correct_match_is_not_calibrated():
+    choices = calibrate(PREDICTIONS + [(0.7, False, 'B'), (0.3, False, 'B')])
+    assert choices['B'].threshold is None and choices['B'].support == 2
+    assert choices['A'].threshold is not None
+
+
+def test_messages_without_match_are_ignored():
+    choices = calibrate([(0.0, False, 'A'), (0.0, False, 'B'), (0.9, True, 'A')])
+    assert list(choices) == ['A'] and choices['A'].support == 1
+
+
+def test_no_predictions():
+    empty = np.array([])
+    assert calibrate_thresholds(empty, empty.astype(bool), empty) == {}
+
+
+def test_best_predictions():
+    best, scores = best_predictions(np.array([[0.1, 0.7, 0.3], [0.0, 0.0, 0.0]], dtype=np.float32))
+    assert best.tolist() == [1, 0]
+    assert scores.tolist() == pytest.approx([0.7, 0.0])
+    best, scores = best_predictions(np.zeros((2, 0), dtype=np.float32))
+    assert best.tolist() == [0, 0] and scores.tolist() == [0.0, 0.0]
+
+
+@pytest.fixture
+def entries(knowledge_base):
+    KnowledgeBase.objects.bulk_create([
+        KnowledgeBase(question=row['question'], answer=row['answer'], keywords=row['keywords'],
+                      category=row['category'], confidence_threshold=0.7)
+        for row in knowledge_rows(KNOWLEDGE_FILE)
+    ])
+    return get_knowledge_index()
+
+
+def thresholds():
+    return dict(KnowledgeBase.objects.values_list('id', 'confidence_threshold'))
+
+
+def test_dry_run(entries):
+    before = thresholds()
+    out = StringIO()
+    call_command('calibrate_thresholds', by='entry', min_support=1, dry_run=True, stdout=out)
+
+    assert 'Simulation' in out.getvalue()
+    assert thresholds() == before
+
+
+def test_command_updates_thresholds(entries):
+    call_command('calibrate_thresholds', by='entry', backend='heuristic', min_support=1, stdout=StringIO())
+
+    updated = {entry_id: threshold for entry_id, threshold in thresholds().items() if threshold != 0.7}
+    assert updated
+    assert all(MIN_DYNAMIC_THRESHOLD <= threshold <= MAX_THRESHOLD for threshold in updated.values())
+    # Seuils signalés à l'index chargé (journal des modifications)
+    index = get_knowledge_index()
+    assert index is entries
+    for entry in index.entries:
+        assert entry.confidence_threshold == updated.get(entry.id, 0.7)
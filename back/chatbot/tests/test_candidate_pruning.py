@@ -0,0 +1,73 @@
+"""
+L'index des entrées candidates (KnowledgeIndex.candidates) ne doit écarter
+que des entrées de score nul : la recherche indexée donne les mêmes
+meilleures entrées, avec les mêmes scores, qu'un parcours complet de la
+base, en n'évaluant qu'une petite partie des candidates (scores maximaux).
+
+Entrées lues dans chatbot/knowledge_base.json, sans base de données.
+"""
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from chatbot.evaluation import build_index, knowledge_rows, labeled_examples, with_distractors
+from chatbot.normalization import normalize
+from chatbot.services import KnowledgeBaseMatcher
+
+KNOWLEDGE_FILE = Path(__file__).resolve().parent.parent / 'knowledge_base.json'
+
+# Base de taille réaliste pour les mesures de latence
+LARGE_SIZE = 50000
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return knowledge_rows(KNOWLEDGE_FILE)
+
+
+@pytest.fixture(scope='module')
+def messages(rows):
+    return [example.message for example in labeled_examples(rows)]
+
+
+@pytest.mark.parametrize('size', [0, 2000], ids=lambda size: f'{size or "base"}-entries')
+def test_indexed_search_matches_full_scan(rows, messages, size):
+    index = build_index(with_distractors(rows, size) if size else rows)
+    matcher = KnowledgeBaseMatcher('heuristic')
+    every_position = list(range(len(index.entries)))
+
+    for message in messages:
+        normalized = normalize(message)
+        query = matcher._heuristic_query(index, normalized)
+        candidates = set(index.candidates(query.text, query.words, query.lexicon_hits, query.partial_keywords))
+
+        full = {}
+        expected = matcher._heuristic_rank(index, query, every_position, full, 3)
+        indexed = matcher._heuristic_top(index, normalized, k=3)
+
+        # Aucune entrée de score non nul n'est écartée par l'index
+        assert {position for position, score in full.items() if score > 0} <= candidates, message
+        assert [index.entries[p].id for p, _ in indexed] == [index.entries[p].id for p, _ in expected], message
+        assert [s for _, s in indexed] == pytest.approx([s for _, s in expected]), message
+
+
+def test_search_latency_at_scale(rows, messages):
+    index = build_index(with_distractors(rows, LARGE_SIZE))
+    matcher = KnowledgeBaseMatcher('heuristic')
+
+    latencies, evaluated = [], []
+    for message in messages:
+        normalized = normalize(message)
+        started = time.perf_counter()
+        query = matcher._heuristic_query(index, normalized)
+        lists = index.candidate_lists(query.text, query.words, query.lexicon_hits, query.partial_keywords)
+        scores = {}
+        matcher._heuristic_search(index, query, lists, scores, 3)
+        latencies.append(time.perf_counter() - started)
+        evaluated.append(len(scores))
+
+    # Avant les scores maximaux : ~23 000 candidates évaluées, p95 ≈ 100 ms
+    assert np.percentile(evaluated, 95) < LARGE_SIZE * 0.02
+    assert np.percentile(latencies, 95) < 0.04
@@ -0,0 +1,95 @@
+"""
+Recherche par paliers (KnowledgeBaseMatcher._top avec CHATBOT_MATCH_CASCADE) :
+chaque message est résolu par le palier le moins coûteux qui trouve une
+entrée au-dessus de son seuil de confiance
+"""
+import pytest
+
+from chatbot import services
+from chatbot.evaluation import build_index
+from chatbot.normalization import normalize
+from chatbot.services import KnowledgeBaseMatcher
+from chatbot.tracing import TierCounters
+
+ROWS = [
+    {'id': 1, 'question': 'Quels documents fournir pour un sinistre ?', 'keywords': 'sinistre',
+     'confidence_threshold': 0.3, 'question_hash': '', 'category': 'Sinistre', 'answer': ''},
+    {'id': 2, 'question': 'Comment payer ma prime ?', 'keywords': 'payer, prime',
+     'confidence_threshold': 0.7, 'question_hash': '', 'category': 'Paiement', 'answer': ''},
+    {'id': 3, 'question': 'Puis-je modifier mon contrat ?', 'keywords': 'modifier, contrat',
+     'confidence_threshold': 0.7, 'question_hash': '', 'category': 'Contrat', 'answer': ''},
+    {'id': 4, 'question': 'Réponse réservée aux administrateurs', 'keywords': 'administrateurs',
+     'confidence_threshold': 1.0, 'question_hash': '', 'category': 'Interne', 'answer': ''},
+]
+
+
+class StubClassifier:
+    def __init__(self, categories):
+        self.categories = categories
+
+    def top_categories(self, text, k=3):
+        return [(category, 1.0) for category in self.categories[:k]]
+
+
+@pytest.fixture
+def index():
+    return build_index(ROWS)
+
+
+@pytest.fixture
+def matcher(settings, monkeypatch):
+    settings.CHATBOT_MATCH_CASCADE = True
+    monkeypatch.setattr(services, 'get_category_classifier', lambda: None)
+    return KnowledgeBaseMatcher('heuristic', tiers=TierCounters(('exact', 'keywords', 'category', 'full')))
+
+
+def resolve(matcher, index, message, k=1):
+    ranked = matcher._top(index, message, normalize(message), k=k)
+    [(tier, _)] = [(tier, count) for tier, count in matcher.tiers.stats()['hits'].items() if count]
+    matcher.tiers.clear()
+    return tier, [(index.entries[position].id, score) for position, score in ranked]
+
+
+def test_exact_question(matcher, index):
+    tier, ranked = resolve(matcher, index, 'comment PAYER ma prime')
+    assert tier == 'exact'
+    # Score du moteur configuré, sur la même échelle que les autres paliers
+    assert ranked[0][0] == 2 and ranked[0][1] > 1.0
+
+
+def test_exact_question_above_reach_of_its_threshold(matcher, index):
+    # Seuil de 1.0 : même une correspondance exacte ne suffit pas à répondre
+    tier, _ = resolve(matcher, index, 'Réponse réservée aux administrateurs')
+    assert tier != 'exact'
+
+
+def test_keywords_tier(matcher, index):
+    tier, ranked = resolve(matcher, index, 'je veux modifier mon contrat')
+    assert (tier, [entry_id for entry_id, _ in ranked]) == ('keywords', [3])
+
+
+def test_category_tier(matcher, index, monkeypatch):
+    monkeypatch.setattr(services, 'get_category_classifier', lambda: StubClassifier(['Sinistre']))
+    tier, ranked = resolve(matcher, index, 'documents a fournir')
+    assert (tier, [entry_id for entry_id, _ in ranked]) == ('category', [1])
+
+
+def test_full_tier(matcher, index):
+    tier, ranked = resolve(matcher, index, 'documents a fournir')
+    assert (tier, [entry_id for entry_id, _ in ranked]) == ('full', [1])
+
+
+def test_no_cascade(matcher, index, settings):
+    settings.CHATBOT_MATCH_CASCADE = False
+    tier, ranked = resolve(matcher, index, 'Comment payer ma prime ?')
+    assert (tier, ranked[0][0]) == ('full', 2)
+
+
+def test_exact_tier_with_vector_backend(index, settings):
+    settings.CHATBOT_MATCH_CASCADE = True
+    matcher = KnowledgeBaseMatcher('tfidf', tiers=TierCounters(('exact', 'keywords', 'category', 'full')))
+    tier, ranked = resolve(matcher, index, 'Comment payer ma prime ?')
+
+    scores = index.sparse_matrix('tfidf').score(matcher._vector_query(index, '', normalize('Comment payer ma prime ?')))
+    assert (tier, ranked) == ('exact', [(2, pytest.approx(float(scores[1])))])
+    assert ranked[0][1] <= 1.0
@@ -0,0 +1,128 @@
+"""
+Classifieur de catégories (Bayes naïf sur n-grammes hachés) : entraînement,
+catégories les plus probables, sauvegarde et rechargement par les processus
+"""
+import numpy as np
+import pytest
+
+from chatbot.classifier import (
+    CategoryClassifier, base_category, get_category_classifier, hashed_vector, reset_category_classifier,
+)
+
+EXAMPLES = [
+    ('Comment payer ma prime ?', 'Paiement'),
+    ('Puis-je payer par Mobile Money ?', 'Paiement'),
+    ('Quels moyens de paiement acceptez-vous ?', 'Paiement'),
+    ('Comment déclarer un sinistre ?', 'Sinistre'),
+    ('Quels documents fournir pour un sinistre ?', 'Sinistre'),
+    ('Quel est le délai de déclaration d\'un accident ?', 'Sinistre'),
+    ('Puis-je modifier mon contrat ?', 'Contrat'),
+    ('Comment résilier mon contrat ?', 'Contrat'),
+]
+
+
+def train(examples=EXAMPLES):
+    return CategoryClassifier.fit([text for text, _ in examples], [category for _, category in examples])
+
+
+@pytest.fixture
+def classifier_path(settings, tmp_path):
+    settings.CHATBOT_CLASSIFIER_PATH = tmp_path / 'category_classifier.npz'
+    settings.CHATBOT_KB_VERSION_CHECK_MS = 0
+    reset_category_classifier()
+    yield settings.CHATBOT_CLASSIFIER_PATH
+    reset_category_classifier()
+
+
+@pytest.mark.parametrize('category, base', [
+    ('Présentation - Variation 3', 'Présentation'),
+    ('Sinistre - variation 12 ', 'Sinistre'),
+    ('Paiement', 'Paiement'),
+    (None, ''),
+])
+def test_base_category(category, base):
+    assert base_category(category) == base
+
+
+def test_hashed_vector_is_normalized():
+    vector = hashed_vector('Comment déclarer un sinistre ?', dimensions=64)
+    assert vector.dtype == np.float32 and vector.shape == (64,)
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+    assert not hashed_vector('', dimensions=64).any()
+
+
+def test_fit():
+    classifier = train()
+    assert classifier.categories == ['Contrat', 'Paiement', 'Sinistre']
+    assert np.all(np.diff(classifier.features.astype(np.int64)) > 0)
+    assert np.exp(classifier.log_priors).tolist() == pytest.approx([2 / 8, 3 / 8, 3 / 8])
+
+
+@pytest.mark.parametrize('message, category', [
+    ('je voudrais payer ma prime', 'Paiement'),
+    ('declarer un sinsitre', 'Sinistre'),    # faute de frappe : trigrammes de caractères
+    ('résiliation du contrat', 'Contrat'),
+])
+def test_top_categories(message, category):
+    top = train().top_categories(message, k=3)
+
+    assert top[0][0] == category
+    assert [probability for _, probability in top] == sorted((p for _, p in top), reverse=True)
+    assert sum(probability for _, probability in top) == pytest.approx(1.0)
+
+
+def test_top_categories_k_is_bounded():
+    classifier = train()
+    assert len(classifier.top_categories('payer', k=1)) == 1
+    assert len(classifier.top_categories('payer', k=10)) == 3
+
+
+def test_save_load(tmp_path):
+    classifier = train()
+    classifier.save(tmp_path / 'model' / 'classifier.npz')
+    loaded = CategoryClassifier.load(tmp_path / 'model' / 'classifier.npz')
+
+    assert loaded.categories == classifier.categories
+    assert [path.name for path in (tmp_path / 'model').iterdir()] == ['classifier.npz']
+    for message, _ in EXAMPLES:
+        assert loaded.top_categories(message) == classifier.top_categories(message)
+
+
+def test_not_trained(classifier_path):
+    assert get_category_classifier() is None
+
+
+def test_not_configured(settings):
+    settings.CHATBOT_CLASSIFIER_PATH = None
+    assert get_category_classifier() is None
+
+
+def test_classifier_is_kept_in_memory(classifier_path):
+    train().save(classifier_path)
+    assert get_category_classifier() is get_category_classifier()
+
+
+def test_new_training_is_reloaded(classifier_path):
+    train().save(classifier_path)
+    first = get_category_classifier()
+
+    # Nouvel entraînement (autre processus) : rechargé sans reset_category_classifier
+    train(EXAMPLES + [('Où se trouve votre agence ?', 'Agence')]).save(classifier_path)
+    second = get_category_classifier()
+    assert second is not first
+    assert second.categories == ['Agence', 'Contrat', 'Paiement', 'Sinistre']
+
+
+def test_check_interval_delays_reload(classifier_path, settings):
+    settings.CHATBOT_KB_VERSION_CHECK_MS = 60_000
+    assert get_category_classifier() is None
+
+    train().save(classifier_path)
+    assert get_category_classifier() is None
+    reset_category_classifier()
+    assert get_category_classifier() is not None
+
+
+def test_unreadable_classifier(classifier_path):
+    classifier_path.write_bytes(b'pas un fichier npz')
+    assert get_category_classifier() is None
@@ -0,0 +1,108 @@
+"""
+Détection des doublons de la base (MinHash et LSH, chatbot/dedup.py) et
+désactivation des entrées redondantes (manage.py deduplicate_knowledge_base)
+"""
+from io import StringIO
+
+import numpy as np
+import pytest
+from django.core.management import call_command
+
+from chatbot.dedup import KnowledgeRow, MinHasher, find_duplicates, lsh_parameters
+from chatbot.index import get_knowledge_index
+from chatbot.models import KnowledgeBase
+
+PAY = 'Par Mobile Money ou en agence.'
+
+ROWS = [
+    KnowledgeRow(1, 'Paiement', 'Comment payer ma prime ?', PAY, 'fr'),
+    KnowledgeRow(2, 'Paiement', 'Comment payer ma prime ?', 'Réponse différente.', 'fr'),
+    KnowledgeRow(3, 'Paiement - Variation 1', 'Comment payer ma prime', PAY, 'fr'),
+    KnowledgeRow(4, 'Paiement', 'comment payer ma prime ?', PAY, 'en'),
+    KnowledgeRow(5, 'Sinistre', 'Comment déclarer un sinistre ?', 'En ligne.', 'fr'),
+    KnowledgeRow(6, 'Paiement - Variation 2', 'Comment PAYER ma prime ?', ' par mobile money ou en agence ', 'fr'),
+    KnowledgeRow(7, 'Contrat', 'Puis-je modifier mon contrat ?', PAY, 'fr'),
+]
+
+
+@pytest.mark.parametrize('num_perm, threshold', [(128, 0.8), (128, 0.5), (64, 0.9)])
+def test_lsh_parameters(num_perm, threshold):
+    bands, rows = lsh_parameters(num_perm, threshold)
+    assert bands * rows <= num_perm
+    assert (1 / bands) ** (1 / rows) == pytest.approx(threshold, abs=0.1)
+
+
+def test_signature_estimates_similarity():
+    hasher = MinHasher(num_perm=256)
+    question = hasher.signature('Quels documents fournir pour déclarer un sinistre ?')
+
+    assert hasher.signature('Quels documents fournir pour déclarer un sinistre ?').tolist() == question.tolist()
+    close = np.mean(hasher.signature('quels documents fournir pour declarer un sinistre') == question)
+    unrelated = np.mean(hasher.signature('Où se trouve votre agence ?') == question)
+    assert close > 0.8 and unrelated < 0.2
+    assert hasher.signatures([]).shape == (0, 256)
+
+
+def test_signatures_depend_on_seed():
+    text = 'Comment payer ma prime ?'
+    assert MinHasher(seed=1).signature(text).tolist() == MinHasher(seed=1).signature(text).tolist()
+    assert MinHasher(seed=1).signature(text).tolist() != MinHasher(seed=2).signature(text).tolist()
+
+
+def test_find_duplicates():
+    clusters, stats = find_duplicates(ROWS)
+
+    # Même réponse (normalisée) et même langue seulement ; l'entrée d'origine est conservée
+    [cluster] = clusters
+    assert cluster.keep.id == 1
+    assert sorted(row.id for row in cluster.redundant) == [3, 6]
+    assert 0.8 <= cluster.similarity <= 1.0
+    assert (stats['entries'], stats['clusters'], stats['redundant']) == (7, 1, 2)
+    assert stats['confirmed_pairs'] <= stats['candidate_pairs']
+
+
+def test_variation_is_kept_without_original():
+    rows = [
+        KnowledgeRow(1, 'Paiement - Variation 1', 'Comment payer ma prime ?', PAY, 'fr'),
+        KnowledgeRow(2, 'Paiement', 'comment payer ma prime', PAY, 'fr'),
+        KnowledgeRow(3, 'Paiement - Variation 2', 'Comment payer ma prime', PAY, 'fr'),
+    ]
+    [cluster] = find_duplicates(rows)[0]
+    assert cluster.keep.id == 2
+
+
+def test_no_duplicates():
+    clusters, stats = find_duplicates(ROWS[4:5] + ROWS[6:7])
+    assert clusters == [] and stats['redundant'] == 0
+    assert find_duplicates([])[0] == []
+
+
+@pytest.fixture
+def entries(knowledge_base):
+    KnowledgeBase.objects.bulk_create([
+        KnowledgeBase(category=row.category, question=row.question, answer=row.answer, language=row.language)
+        for row in ROWS
+    ])
+    return get_knowledge_index()
+
+
+def test_command_dry_run(entries):
+    out = StringIO()
+    call_command('deduplicate_knowledge_base', stdout=out)
+
+    assert '1 groupes de doublons, 2 entrées redondantes' in out.getvalue()
+    assert KnowledgeBase.objects.filter(is_active=True).count() == len(ROWS)
+
+
+def test_command_deactivates_redundant_entries(entries):
+    call_command('deduplicate_knowledge_base', deactivate=True, stdout=StringIO())
+
+    inactive = KnowledgeBase.objects.filter(is_active=False)
+    assert sorted(inactive.values_list('category', flat=True)) == ['Paiement - Variation 1', 'Paiement - Variation 2']
+    # Entrées retirées de l'index chargé
+    assert get_knowledge_index() is entries
+    assert len(entries) == 4
+
+    out = StringIO()
+    call_command('deduplicate_knowledge_base', stdout=out)
+    assert 'Aucune question dupliquée' in out.getvalue()
@@ -0,0 +1,52 @@
+"""
+Détection des émotions par le lexique compilé (chatbot/emotion.py)
+"""
+import pytest
+
+from chatbot.emotion import EmotionLexicon
+
+INFLECTED = [
+    ('Je suis énervé', 'angry'),
+    ('Je suis énervée', 'angry'),
+    ('Nous sommes énervés', 'angry'),
+    ('Elles sont énervées', 'angry'),
+    ('Je suis agacée', 'angry'),
+    ('Elle est irritée', 'angry'),
+    ('Elles sont furieuses', 'angry'),
+    ('Je suis déprimée', 'sad'),
+    ('Nous sommes déçues', 'sad'),
+    ('Je suis très stressée', 'fear'),
+    ('Ils sont stressés', 'fear'),
+    ('Je suis inquiète', 'fear'),
+    ('Elles sont anxieuses', 'fear'),
+    ('Quelle surprise', 'surprise'),
+    ('Nous sommes surprises', 'surprise'),
+    ('Je suis heureuse', 'joy'),
+    ('Ils sont contents', 'joy'),
+]
+
+
+@pytest.fixture(scope='module')
+def lexicon():
+    return EmotionLexicon()
+
+
+@pytest.mark.parametrize('message, emotion', INFLECTED)
+def test_feminine_and_plural_forms(lexicon, message, emotion):
+    assert lexicon.detect(message)[0] == emotion
+
+
+def test_words_are_matched_whole(lexicon):
+    # « rage » dans « courage », « oh » dans « john » : plus de faux positifs
+    assert lexicon.detect('Bon courage John')[0] != 'angry'
+
+
+def test_negation(lexicon):
+    assert lexicon.detect('Je ne suis pas content')[0] == 'neutral'
+    assert lexicon.detect('Ce service est nul')[0] == 'negative'
+    assert lexicon.detect('Le service est pas nul du tout')[0] != 'negative'
+
+
+def test_batch_matches_single_messages(lexicon):
+    messages = [message for message, _ in INFLECTED] + ['', 'Bonjour', 'This is awesome']
+    assert lexicon.detect_batch(messages) == [lexicon.detect(message) for message in messages]
@@ -0,0 +1,101 @@
+"""
+Mesures de performance de la détection des émotions (pytest-benchmark) :
+lexique compilé, message par message et par lots, comparé à la détection
+d'origine (TextBlob et recherche des mots d'émotions dans le texte)
+
+    pytest chatbot/tests/test_emotion_benchmark.py --benchmark-group-by=group
+"""
+import random
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from chatbot.evaluation import knowledge_rows, perturbations
+from chatbot.lexicon import EMOTION_KEYWORDS
+from chatbot.management.commands.generate_question_variations import EMOTION_ENTRIES
+from chatbot.services import EmotionDetector
+
+KNOWLEDGE_FILE = Path(__file__).resolve().parent.parent / 'knowledge_base.json'
+
+MESSAGES = 2000
+
+
+@pytest.fixture(scope='module')
+def messages():
+    """Questions de la base et messages émotionnels, avec leurs reformulations bruitées"""
+    rnd = random.Random(42)
+    questions = [row['question'] for row in knowledge_rows(KNOWLEDGE_FILE)]
+    questions += [entry['question'] for entry in EMOTION_ENTRIES]
+    pool = questions + [variant for question in questions for variant in perturbations(question, rnd)]
+    return [rnd.choice(pool) for _ in range(MESSAGES)]
+
+
+def legacy_detect_emotion(text, text_blob):
+    """
+    Détection d'origine, remplacée par le lexique compilé : polarité
+    TextBlob et recherche de chaque mot d'émotion dans le texte en minuscules
+    """
+    text_lower = text.lower()
+    polarity = text_blob(text).sentiment.polarity
+    emotion_scores = {}
+    for emotion, keywords in EMOTION_KEYWORDS.items():
+        score = sum(1 for keyword in keywords if keyword in text_lower)
+        if score > 0:
+            emotion_scores[emotion] = score
+    if emotion_scores:
+        best_emotion = max(emotion_scores, key=emotion_scores.get)
+        return best_emotion, min(emotion_scores[best_emotion] * 0.3, 1.0)
+    if polarity > 0.3:
+        return 'positive', abs(polarity)
+    elif polarity < -0.3:
+        return 'negative', abs(polarity)
+    return 'neutral', 0.5
+
+
+# Messages sans ambiguïté sur lesquels les deux détections doivent s'accorder
+AGREEMENT_CORPUS = [
+    'Je suis très content de votre service',
+    'Merci beaucoup pour votre aide',
+    'Je suis triste et déçu',
+    'Je suis énervée par ce retard',
+    "J'ai peur pour ma maison",
+    "Wow, c'est incroyable",
+    'Je suis inquiet pour mon dossier',
+    'Comment déclarer un sinistre ?',
+    'Je voudrais un devis pour ma maison',
+    'Où se trouve votre agence à Cotonou ?',
+]
+
+
+def test_same_labels_as_legacy_detection():
+    text_blob = pytest.importorskip('textblob').TextBlob
+    legacy = [legacy_detect_emotion(message, text_blob)[0] for message in AGREEMENT_CORPUS]
+    assert [emotion for emotion, _ in EmotionDetector.detect_batch(AGREEMENT_CORPUS)] == legacy
+
+
+@pytest.mark.benchmark(group='emotion')
+def test_legacy_detection(benchmark, messages):
+    text_blob = pytest.importorskip('textblob').TextBlob
+
+    def run():
+        return [legacy_detect_emotion(message, text_blob) for message in messages]
+
+    legacy = benchmark.pedantic(run, rounds=3, warmup_rounds=1)
+    compiled = EmotionDetector.detect_batch(messages)
+    benchmark.extra_info['agreement'] = sum(a[0] == b[0] for a, b in zip(legacy, compiled)) / len(messages)
+
+
+@pytest.mark.benchmark(group='emotion')
+def test_detect_emotion(benchmark, messages):
+    benchmark.pedantic(lambda: [EmotionDetector.detect_emotion(message) for message in messages],
+                       rounds=3, warmup_rounds=1)
+
+
+@pytest.mark.benchmark(group='emotion')
+def test_detect_batch(benchmark, messages):
+    results = benchmark.pedantic(EmotionDetector.detect_batch, args=(messages,), rounds=3, warmup_rounds=1)
+
+    # Le lot donne exactement les résultats message par message
+    assert results == [EmotionDetector.detect_emotion(message) for message in messages]
@@ -0,0 +1,122 @@
+"""
+Évaluation hors ligne (chatbot.evaluation, manage.py evaluate_matcher) :
+jeu étiqueté reproductible, juge des correspondances et mesures rapportées
+"""
+import json
+import random
+from io import StringIO
+from pathlib import Path
+
+import pytest
+from django.core.management import call_command
+
+from chatbot.evaluation import (
+    LabeledExample, MatcherEvaluation, answer_judge, build_index, evaluate, knowledge_rows, labeled_examples,
+    load_examples, perturbations, save_examples, with_distractors,
+)
+from chatbot.index import CompiledEntry, KnowledgeIndex
+from chatbot.services import KnowledgeBaseMatcher
+
+KNOWLEDGE_FILE = Path(__file__).resolve().parent.parent / 'knowledge_base.json'
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return knowledge_rows(KNOWLEDGE_FILE)
+
+
+def compiled(row):
+    return CompiledEntry(*(row[field] for field in KnowledgeIndex.FIELDS))
+
+
+def test_perturbations():
+    variants = perturbations('Comment déclarer un sinistre ?', random.Random(1))
+
+    assert variants[0] == 'comment declarer un sinistre'
+    # Deux lettres voisines d'un mot d'au moins cinq lettres inversées
+    assert sorted(variants[1]) == sorted('Comment déclarer un sinistre ?') and variants[1] != variants[0]
+    assert variants[2] == 'Comment déclarer un'
+
+
+def test_perturbations_of_short_question():
+    assert perturbations('Aide ?', random.Random(1)) == ['aide']
+    assert perturbations('aide', random.Random(1)) == []
+
+
+def test_labeled_examples_are_reproducible(rows):
+    examples = labeled_examples(rows)
+
+    assert examples == labeled_examples(rows, seed=42)
+    assert examples != labeled_examples(rows, seed=7)
+    questions = {row['question'] for row in rows}
+    assert all(example.expected in questions for example in examples)
+    assert all(example.message != example.expected for example in examples)
+
+
+def test_examples_round_trip(rows, tmp_path):
+    examples = labeled_examples(rows)[:10] + [LabeledExample('Où est l’agence ?', 'Où se trouve votre agence ?')]
+    save_examples(examples, tmp_path / 'examples.json')
+    assert load_examples(tmp_path / 'examples.json') == examples
+
+
+def test_with_distractors(rows):
+    padded = with_distractors(rows, 100)
+
+    assert len(padded) == 100 and padded[:len(rows)] == rows
+    assert len({row['id'] for row in padded}) == 100
+    assert {row['category'] for row in padded[len(rows):]} == {'Synthétique'}
+    assert padded == with_distractors(rows, 100)
+    assert with_distractors(rows, 0) == rows
+
+
+def test_answer_judge():
+    rows = [
+        {'id': 1, 'question': 'Comment payer ma prime ?', 'keywords': '', 'confidence_threshold': 0.7,
+         'question_hash': '', 'category': 'Paiement', 'answer': 'Par Mobile Money.'},
+        {'id': 2, 'question': 'Comment régler ma prime ?', 'keywords': '', 'confidence_threshold': 0.7,
+         'question_hash': '', 'category': 'Paiement', 'answer': 'Par Mobile Money.'},
+        {'id': 3, 'question': 'Comment déclarer un sinistre ?', 'keywords': '', 'confidence_threshold': 0.7,
+         'question_hash': '', 'category': 'Sinistre', 'answer': 'En ligne.'},
+    ]
+    is_correct = answer_judge(rows)
+    example = LabeledExample('payer ma prime', 'Comment payer ma prime ?')
+
+    assert is_correct(example, compiled(rows[0]))
+    assert is_correct(example, compiled(rows[1]))      # même réponse
+    assert not is_correct(example, compiled(rows[2]))
+    # Message identique à une question de la base
+    assert is_correct(LabeledExample('Comment déclarer un sinistre ?', 'Autre question ?'), compiled(rows[2]))
+
+
+def test_evaluate(rows):
+    index = build_index(rows)
+    examples = labeled_examples(rows)
+    result = evaluate(KnowledgeBaseMatcher('heuristic'), index, rows, examples, k=3)
+    summary = result.to_dict()
+
+    assert (summary['backend'], summary['size'], summary['examples']) == ('heuristic', len(rows), len(examples))
+    assert len(result.latencies) == len(examples)
+    assert 0 < summary['top1_accuracy'] <= summary['top3_accuracy'] <= 1
+    assert summary['p50_ms'] <= summary['p95_ms'] <= summary['p99_ms']
+    assert sum(summary['tiers'].values()) in (0, len(examples))
+
+
+def test_empty_evaluation():
+    summary = MatcherEvaluation('bm25', 0, 5).to_dict()
+    assert summary['top1_accuracy'] == summary['top5_accuracy'] == summary['throughput'] == 0.0
+    assert summary['p99_ms'] == 0.0
+
+
+def test_evaluate_matcher_command(rows, tmp_path):
+    out = StringIO()
+    call_command(
+        'evaluate_matcher', knowledge_file=str(KNOWLEDGE_FILE), backend=['heuristic', 'bm25'], sizes=[0, 50],
+        limit=20, export=str(tmp_path / 'examples.json'), json=True, stdout=out,
+    )
+    results = json.loads(out.getvalue())
+
+    assert [(result['backend'], result['size']) for result in results] == [
+        ('heuristic', len(rows)), ('bm25', len(rows)), ('heuristic', 50), ('bm25', 50),
+    ]
+    assert all(result['examples'] == 20 for result in results)
+    assert len(load_examples(tmp_path / 'examples.json')) == 20
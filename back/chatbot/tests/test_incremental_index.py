@@ -0,0 +1,122 @@
+"""
+Mises à jour incrémentales de l'index (KnowledgeIndex.apply_delta) et
+rattrapage du journal des modifications (KnowledgeBaseChange) : l'index mis
+à jour classe les entrées comme un index reconstruit
+"""
+from pathlib import Path
+
+import pytest
+
+from chatbot.evaluation import build_index, knowledge_rows, labeled_examples
+from chatbot.index import CompiledEntry, KnowledgeIndex, get_knowledge_index
+from chatbot.models import KnowledgeBase, KnowledgeBaseChange
+from chatbot.normalization import normalize, question_hash
+from chatbot.services import KnowledgeBaseMatcher
+
+KNOWLEDGE_FILE = Path(__file__).resolve().parent.parent / 'knowledge_base.json'
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return knowledge_rows(KNOWLEDGE_FILE)
+
+
+def compiled(row):
+    return CompiledEntry(*(row[field] for field in KnowledgeIndex.FIELDS))
+
+
+def ranking(index, message, k=3):
+    ranked = KnowledgeBaseMatcher('heuristic')._top(index, message, normalize(message), k=k)
+    return [(index.entries[position].id, round(score, 6)) for position, score in ranked]
+
+
+def test_delta_matches_rebuilt_index(rows):
+    index = build_index(rows)
+    changed = [
+        dict(rows[0], confidence_threshold=0.9),                                            # seuil seul
+        dict(rows[3], question='Quels moyens de paiement acceptez-vous ?', keywords='paiement, carte'),
+        {**rows[5], 'id': 100, 'question': 'Puis-je résilier mon contrat ?', 'keywords': 'résilier, contrat'},
+    ]
+    deleted = rows[7]['id']
+    index.apply_delta([compiled(row) for row in changed], [row['id'] for row in changed] + [deleted])
+
+    updated = {row['id']: row for row in rows}
+    updated.update({row['id']: row for row in changed})
+    del updated[deleted]
+    rebuilt = build_index(sorted(updated.values(), key=lambda row: row['id']))
+
+    messages = [example.message for example in labeled_examples(rows)]
+    messages += ['Quels moyens de paiement acceptez-vous ?', 'résilier mon contrat', 'Comment déclarer un sinistre ?']
+    for message in messages:
+        assert ranking(index, message) == ranking(rebuilt, message), message
+
+
+def test_threshold_change_keeps_position(rows):
+    index = build_index(rows)
+    index.apply_delta([compiled(dict(rows[0], confidence_threshold=0.9))], [rows[0]['id']])
+
+    assert index.entries[0].confidence_threshold == 0.9
+    assert len(index.entries) == len(rows) and not index.removed
+
+
+def test_question_change_moves_entry_to_the_end(rows):
+    index = build_index(rows)
+    index.apply_delta([compiled(dict(rows[3], question='Puis-je payer par carte ?'))], [rows[3]['id']])
+
+    assert 3 in index.removed
+    assert index.entries[len(rows)].question == 'Puis-je payer par carte ?'
+    assert index.exact(question_hash('Puis-je payer par carte ?')) == len(rows)
+    assert index.exact(question_hash(rows[3]['question'])) is None
+
+
+@pytest.fixture
+def entries(knowledge_base):
+    KnowledgeBase.objects.bulk_create([
+        KnowledgeBase(category='Paiement', question='Comment payer ma prime ?', answer='Par Mobile Money.',
+                      keywords='payer, prime'),
+        KnowledgeBase(category='Sinistre', question='Comment déclarer un sinistre ?', answer='En ligne.',
+                      keywords='sinistre, déclarer'),
+    ])
+    return get_knowledge_index()
+
+
+def best_question(message):
+    entry, _ = KnowledgeBaseMatcher('heuristic').find_best_match(message)
+    return entry.question if entry else None
+
+
+def test_journal_is_applied_to_loaded_index(entries):
+    entry = KnowledgeBase.objects.get(category='Paiement')
+    entry.question = 'Quels sont les moyens de paiement ?'
+    entry.keywords = 'moyens, paiement'
+    entry.save()
+    KnowledgeBase.objects.create(category='Contrat', question='Puis-je modifier mon contrat ?', answer='Oui.',
+                                 keywords='modifier, contrat')
+
+    index = get_knowledge_index()
+    assert index is entries  # mis à jour en place, sans reconstruction
+    assert index.version == KnowledgeBaseChange.objects.latest('id').id
+    assert best_question('Quels sont les moyens de paiement ?') == 'Quels sont les moyens de paiement ?'
+    assert best_question('Puis-je modifier mon contrat ?') == 'Puis-je modifier mon contrat ?'
+    assert best_question('Comment payer ma prime ?') != 'Comment payer ma prime ?'
+
+
+def test_deactivated_entry_is_removed(entries):
+    KnowledgeBase.objects.filter(category='Sinistre').update(is_active=False)
+
+    assert get_knowledge_index() is entries
+    assert best_question('Comment déclarer un sinistre ?') is None
+
+
+def test_purged_journal_rebuilds_index(entries):
+    KnowledgeBase.objects.create(category='Contrat', question='Puis-je modifier mon contrat ?', answer='Oui.',
+                                 keywords='modifier, contrat')
+    KnowledgeBase.objects.create(category='Agence', question='Où se trouve votre agence ?', answer='À Cotonou.',
+                                 keywords='agence')
+    # Journal purgé au-delà de la version de l'index (build_chatbot_index) : il ne suffit plus
+    KnowledgeBaseChange.objects.filter(id__lte=entries.version + 1).delete()
+
+    index = get_knowledge_index()
+    assert index is not entries
+    assert len(index) == 4
+    assert best_question('Où se trouve votre agence ?') == 'Où se trouve votre agence ?'
@@ -0,0 +1,157 @@
+"""
+Index sauvegardés (save_knowledge_index / load_knowledge_index) : relecture
+identique à l'index construit, version courante désignée par le fichier
+CURRENT, formats incompatibles ignorés, tableaux projetés en mémoire
+"""
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from chatbot import index as knowledge_index
+from chatbot.evaluation import build_index, knowledge_rows, labeled_examples
+from chatbot.index import (
+    CompiledEntry, EntryTable, HashIndex, KnowledgeIndex, StringTable, load_knowledge_index, save_knowledge_index,
+)
+from chatbot.normalization import normalize
+from chatbot.services import KnowledgeBaseMatcher
+
+KNOWLEDGE_FILE = Path(__file__).resolve().parent.parent / 'knowledge_base.json'
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return knowledge_rows(KNOWLEDGE_FILE)
+
+
+@pytest.fixture
+def index(rows):
+    index = build_index(rows, language='fr')
+    index.version = 7
+    return index
+
+
+def ranking(index, message, k=3):
+    ranked = KnowledgeBaseMatcher('heuristic')._top(index, message, normalize(message), k=k)
+    return [(index.entries[position].id, round(score, 6)) for position, score in ranked]
+
+
+def test_round_trip(index, rows, tmp_path):
+    directory = save_knowledge_index(index, tmp_path)
+    loaded, manifest = load_knowledge_index(tmp_path)
+
+    assert manifest['language'] == 'fr'
+    assert manifest['version'] == loaded.version == 7
+    assert manifest['entries'] == len(loaded) == len(index)
+    assert loaded.directory == directory
+    assert [entry.id for entry in loaded.entries] == [entry.id for entry in index.entries]
+    assert [entry.question_hash for entry in loaded.entries] == [entry.question_hash for entry in index.entries]
+
+    for example in labeled_examples(rows)[:100]:
+        assert ranking(loaded, example.message) == ranking(index, example.message), example.message
+
+
+def test_current_pointer_designates_latest_version(index, tmp_path):
+    first = save_knowledge_index(index, tmp_path)
+    index.version = 8
+    second = save_knowledge_index(index, tmp_path)
+
+    assert (tmp_path / 'CURRENT').read_text() == second.name
+    assert load_knowledge_index(tmp_path)[1]['version'] == 8
+
+    # Seule la version précédente est conservée en plus de la version courante
+    index.version = 9
+    third = save_knowledge_index(index, tmp_path)
+    assert sorted(path for path in tmp_path.iterdir() if path.is_dir()) == sorted([second, third])
+    assert not first.exists()
+
+
+def test_missing_index(tmp_path):
+    assert load_knowledge_index(tmp_path / 'absent') == (None, None)
+
+
+def test_other_format_is_ignored(index, tmp_path):
+    directory = save_knowledge_index(index, tmp_path)
+    manifest = json.loads((directory / 'manifest.json').read_text())
+    manifest['format'] = knowledge_index.INDEX_FORMAT_VERSION - 1
+    (directory / 'manifest.json').write_text(json.dumps(manifest))
+
+    assert load_knowledge_index(tmp_path) == (None, None)
+
+
+def test_unreadable_index_is_ignored(index, tmp_path):
+    directory = save_knowledge_index(index, tmp_path)
+    (directory / 'snapshot.pkl').write_bytes(b'\x80 tronque')
+
+    assert load_knowledge_index(tmp_path) == (None, None)
+
+
+def test_loaded_arrays_are_memory_mapped(index, tmp_path):
+    save_knowledge_index(index, tmp_path)
+    loaded, _ = load_knowledge_index(tmp_path)
+
+    arrays = [loaded.entries.columns['id'], loaded.entries.texts['question'].blob, loaded.postings.positions]
+    arrays += list(loaded.entry_arrays())
+    for array in arrays:
+        assert isinstance(array.base, np.memmap)
+        assert not array.flags.writeable
+
+
+def test_entry_table_round_trip(index, tmp_path):
+    EntryTable.from_entries(index.entries).save(tmp_path)
+    table = EntryTable.load(tmp_path)
+
+    assert len(table) == len(index.entries)
+    for stored, entry in zip(table, index.entries):
+        for name in CompiledEntry.__slots__:
+            assert getattr(stored, name) == getattr(entry, name), name
+
+
+def test_string_table(tmp_path):
+    table = StringTable.from_strings(['assurance', 'échéance', '', 'œuvre'])
+    table.append('ajoutée')
+    assert list(table) == ['assurance', 'échéance', '', 'œuvre', 'ajoutée']
+    assert table.raw(1) == 'échéance'.encode('utf-8')
+    # Longueurs en octets UTF-8 : « œuvre » en compte 6, « ajoutée » 8
+    assert table.shorter_than(np.arange(5), 7) == [2, 3]
+
+    table.save(tmp_path, 'strings')
+    assert list(StringTable.load(tmp_path, 'strings')) == list(table)
+
+
+def test_hash_index(tmp_path):
+    hashes = HashIndex.from_dict({'a' * 40: [3, 1], 'b' * 40: [2]})
+    hashes.add('b' * 40, 5)
+    hashes.add('c' * 40, 6)
+    assert hashes.get('a' * 40) == [1, 3]
+    assert hashes.get('b' * 40) == [2, 5]
+    assert hashes.get('d' * 40) == ()
+
+    hashes.save(tmp_path, 'exact')
+    loaded = HashIndex.load(tmp_path, 'exact')
+    assert (loaded.get('b' * 40), loaded.get('c' * 40)) == ([2, 5], [6])
+
+
+def test_delta_on_loaded_index(index, rows, tmp_path):
+    save_knowledge_index(index, tmp_path)
+    loaded, _ = load_knowledge_index(tmp_path)
+
+    changed = [
+        dict(rows[0], confidence_threshold=0.9),
+        dict(rows[3], question='Quels moyens de paiement acceptez-vous ?', keywords='paiement, carte'),
+        {**rows[5], 'id': 100, 'question': 'Puis-je résilier mon contrat ?', 'keywords': 'résilier, contrat'},
+    ]
+    delta = [CompiledEntry(*(row[field] for field in KnowledgeIndex.FIELDS)) for row in changed]
+    index.apply_delta(delta, [row['id'] for row in changed])
+    loaded.apply_delta(delta, [row['id'] for row in changed])
+
+    # Index mis à jour puis sauvegardé à nouveau : mêmes classements à chaque étape
+    save_knowledge_index(loaded, tmp_path)
+    reloaded, _ = load_knowledge_index(tmp_path)
+
+    messages = [example.message for example in labeled_examples(rows)[:100]]
+    messages += ['Quels moyens de paiement acceptez-vous ?', 'résilier mon contrat']
+    for message in messages:
+        assert ranking(loaded, message) == ranking(index, message), message
+        assert ranking(reloaded, message) == ranking(index, message), message
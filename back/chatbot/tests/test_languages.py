@@ -0,0 +1,70 @@
+"""
+Base partitionnée par langue : un index par langue, choisi selon la langue
+détectée du message, avec repli sur l'index de la langue par défaut
+"""
+import pytest
+
+from chatbot.index import get_knowledge_index, route_language
+from chatbot.models import KnowledgeBase
+from chatbot.services import KnowledgeBaseMatcher
+
+
+@pytest.mark.parametrize('language, partitions', [
+    ('en', ['en', 'fr']),
+    ('fr', ['fr']),
+    ('de', ['fr']),     # langue sans index
+    (None, ['fr']),
+])
+def test_route_language(settings, language, partitions):
+    settings.CHATBOT_DEFAULT_LANGUAGE = 'fr'
+    assert route_language(language) == partitions
+
+
+def test_route_language_with_other_default(settings):
+    settings.CHATBOT_DEFAULT_LANGUAGE = 'en'
+    assert route_language('fr') == ['fr', 'en']
+    assert route_language('en') == ['en']
+
+
+@pytest.fixture
+def entries(knowledge_base):
+    KnowledgeBase.objects.bulk_create([
+        KnowledgeBase(category='Paiement', question='Comment payer ma prime ?', answer='Par Mobile Money.',
+                      keywords='payer, prime, paiement'),
+        KnowledgeBase(category='Payment', question='How do I pay my premium?', answer='With Mobile Money.',
+                      keywords='pay, premium, payment', language='en'),
+        KnowledgeBase(category='Sinistre', question='Comment déclarer un sinistre ?', answer='En ligne.',
+                      keywords='sinistre, déclarer'),
+    ])
+
+
+def best_question(message, language):
+    entry, _ = KnowledgeBaseMatcher('heuristic').find_best_match(message, language=language)
+    return entry.question if entry else None
+
+
+def test_each_language_has_its_own_index(entries):
+    assert [entry.question for entry in get_knowledge_index('en').entries] == ['How do I pay my premium?']
+    assert len(get_knowledge_index('fr')) == 2
+
+
+def test_message_is_matched_in_its_language(entries):
+    assert best_question('How do I pay my premium?', 'en') == 'How do I pay my premium?'
+    assert best_question('Comment payer ma prime ?', 'fr') == 'Comment payer ma prime ?'
+
+
+def test_fallback_to_default_language(entries):
+    # Message mal détecté comme anglais : aucune entrée anglaise, l'index français répond
+    assert best_question('Comment déclarer un sinistre ?', 'en') == 'Comment déclarer un sinistre ?'
+    assert best_question('Comment déclarer un sinistre ?', 'de') == 'Comment déclarer un sinistre ?'
+
+
+def test_entry_moved_to_another_language(entries):
+    # Index déjà chargés : l'entrée est retirée de l'un et ajoutée à l'autre par le journal
+    french, english = get_knowledge_index('fr'), get_knowledge_index('en')
+    KnowledgeBase.objects.filter(category='Sinistre').update(language='en')
+
+    assert get_knowledge_index('fr') is french and get_knowledge_index('en') is english
+    assert (len(french), len(english)) == (1, 2)
+    assert best_question('Comment déclarer un sinistre ?', 'fr') is None
+    assert best_question('Comment déclarer un sinistre ?', 'en') == 'Comment déclarer un sinistre ?'
@@ -0,0 +1,90 @@
+"""
+Cache des correspondances par message normalisé (chatbot/cache.py) :
+éviction, expiration, et invalidation à chaque modification de la base
+"""
+import pytest
+
+from chatbot import cache
+from chatbot.cache import LRUCache, match_cache
+from chatbot.index import get_knowledge_index
+from chatbot.models import KnowledgeBase
+from chatbot.services import ChatbotService
+
+
+def test_lru_eviction():
+    lru = LRUCache(maxsize=2)
+    lru.set('a', 1)
+    lru.set('b', 2)
+    assert lru.get('a') == 1  # 'b' devient la moins récemment utilisée
+    lru.set('c', 3)
+
+    assert lru.get('b') is None
+    assert (lru.get('a'), lru.get('c')) == (1, 3)
+    assert lru.stats()['evictions'] == 1
+
+
+def test_lru_expiration(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    lru = LRUCache(maxsize=4, ttl=10)
+    lru.set('a', 1)
+
+    now[0] += 5
+    assert lru.get('a') == 1
+    now[0] += 10
+    assert lru.get('a') is None
+    assert len(lru) == 0
+
+
+@pytest.fixture
+def service(knowledge_base):
+    KnowledgeBase.objects.create(
+        category='Paiement', question='Comment payer ma prime ?', answer='Par Mobile Money.',
+        keywords='payer, prime, paiement',
+    )
+    # Index chargé d'avance : la version de la base fait partie de la clé du cache
+    get_knowledge_index()
+    return ChatbotService()
+
+
+def matched_questions(service, message):
+    return [entry.question for entry, _ in service._find_knowledge_matches(message)]
+
+
+def test_repeated_message_is_served_from_cache(service):
+    assert matched_questions(service, 'Comment payer ma prime ?') == ['Comment payer ma prime ?']
+    hits = match_cache.hits
+
+    # Même message une fois normalisé (casse, accents, ponctuation)
+    assert matched_questions(service, 'comment PAYER ma prime') == ['Comment payer ma prime ?']
+    assert match_cache.hits == hits + 1
+
+
+def test_save_invalidates_cached_matches(service):
+    assert matched_questions(service, 'Comment payer ma prime ?') == ['Comment payer ma prime ?']
+
+    entry = KnowledgeBase.objects.get()
+    entry.question = 'Quels sont les moyens de paiement ?'
+    entry.keywords = 'moyens, paiement'
+    entry.save()
+
+    assert len(match_cache) == 0
+    assert matched_questions(service, 'Quels sont les moyens de paiement ?') == ['Quels sont les moyens de paiement ?']
+
+
+def test_delete_invalidates_cached_matches(service):
+    assert matched_questions(service, 'Comment payer ma prime ?') == ['Comment payer ma prime ?']
+
+    KnowledgeBase.objects.get().delete()
+
+    assert len(match_cache) == 0
+    assert matched_questions(service, 'Comment payer ma prime ?') == []
+
+
+def test_bulk_update_invalidates_cached_matches(service):
+    assert matched_questions(service, 'Comment payer ma prime ?') == ['Comment payer ma prime ?']
+
+    KnowledgeBase.objects.update(is_active=False)
+
+    assert len(match_cache) == 0
+    assert matched_questions(service, 'Comment payer ma prime ?') == []
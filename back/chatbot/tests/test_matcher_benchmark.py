@@ -0,0 +1,52 @@
+"""
+Mesures de performance des moteurs de correspondance (pytest-benchmark)
+
+    pip install pytest-django pytest-benchmark
+    pytest chatbot/tests/test_matcher_benchmark.py --benchmark-autosave --benchmark-compare
+
+Les entrées sont lues dans chatbot/knowledge_base.json et complétées par des
+entrées synthétiques : aucune base de données n'est nécessaire.
+"""
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from chatbot.evaluation import build_index, evaluate, knowledge_rows, labeled_examples, with_distractors
+from chatbot.index import prepare_knowledge_index
+from chatbot.services import KnowledgeBaseMatcher
+
+KNOWLEDGE_FILE = Path(__file__).resolve().parent.parent / 'knowledge_base.json'
+
+# Précision top-k minimale de chaque moteur (garde-fou contre les régressions)
+MIN_TOPK_ACCURACY = {'heuristic': 0.4, 'tfidf': 0.55, 'bm25': 0.55}
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return knowledge_rows(KNOWLEDGE_FILE)
+
+
+@pytest.fixture(scope='module')
+def examples(rows):
+    return labeled_examples(rows)
+
+
+@pytest.fixture(scope='module', params=[1000, 10000], ids=lambda size: f'{size}-entries')
+def sized(request, rows):
+    sized_rows = with_distractors(rows, request.param)
+    return sized_rows, build_index(sized_rows)
+
+
+@pytest.mark.parametrize('backend', sorted(MIN_TOPK_ACCURACY))
+def test_matcher(benchmark, backend, sized, examples):
+    sized_rows, index = sized
+    matcher = KnowledgeBaseMatcher(backend)
+    prepare_knowledge_index(index, [backend])
+
+    result = benchmark.pedantic(evaluate, args=(matcher, index, sized_rows, examples), rounds=3, warmup_rounds=1)
+
+    summary = result.to_dict()
+    benchmark.extra_info.update(summary)
+    assert summary['top3_accuracy'] >= MIN_TOPK_ACCURACY[backend]
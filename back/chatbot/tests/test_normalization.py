@@ -0,0 +1,63 @@
+"""
+Normalisation des textes français (chatbot/normalization.py)
+"""
+import pytest
+
+from chatbot.normalization import NormalizedText, fold, normalize, question_hash, stem
+
+
+@pytest.mark.parametrize('text, folded', [
+    ('Élève', 'eleve'),
+    ('ÇA COÛTE', 'ca coute'),
+    ('Œuvres sociales', 'oeuvres sociales'),
+    ('l’assurance', "l'assurance"),
+    ('Straße', 'strasse'),
+])
+def test_fold(text, folded):
+    assert fold(text) == folded
+
+
+@pytest.mark.parametrize('text, normalized', [
+    ("  L'assurance AUTO, ça coûte combien ?!", 'assurance auto ca coute combien'),
+    ("Qu'est-ce qu'Oremi ?", 'est ce oremi'),
+    ('j’ai payé mes cotisations', 'ai paye mes cotisations'),
+    ("Jusqu'à quand ? D'accord, c'est noté", 'a quand accord est note'),
+    ('e-attestation_valide', 'e attestation valide'),
+    ('', ''),
+    (None, ''),
+])
+def test_normalize(text, normalized):
+    assert normalize(text).text == normalized
+
+
+def test_elision_only_at_word_start():
+    # « l' » est retiré ; « d' » au milieu de « aujourd'hui » n'est pas une élision
+    assert normalize("l'appel").tokens == ('appel',)
+    assert normalize("aujourd'hui").tokens == ('aujourd', 'hui')
+
+
+@pytest.mark.parametrize('token, stemmed', [
+    ('assurances', 'assuranc'),
+    ('assurance', 'assuranc'),
+    ('journaux', 'journal'),
+    ('payer', 'paye'),
+    ('appelle', 'appel'),
+    ('aide', 'aide'),       # mots courts inchangés
+    ('mtn2', 'mtn2'),
+])
+def test_stem(token, stemmed):
+    assert stem(token) == stemmed
+
+
+def test_normalized_text():
+    normalized = normalize('Les Assurances habitation')
+    assert normalized.tokens == ('les', 'assurances', 'habitation')
+    assert normalized.stems == ('les', 'assuranc', 'habitation')
+    assert normalized == NormalizedText(['les', 'assurances', 'habitation'])
+    assert len({normalized, normalize('les assurances HABITATION !')}) == 1
+
+
+def test_question_hash_ignores_case_accents_and_punctuation():
+    assert question_hash('Comment déclarer un sinistre ?') == question_hash('comment declarer un SINISTRE')
+    assert question_hash(normalize('Comment déclarer un sinistre ?')) == question_hash('Comment déclarer un sinistre')
+    assert question_hash('Comment déclarer un sinistre ?') != question_hash('Comment déclarer deux sinistres ?')
@@ -0,0 +1,137 @@
+"""
+Cache des réponses par similarité (SemanticResponseCache) : messages
+quasi identiques servis sans recherche, vidé à chaque version de la base
+"""
+import numpy as np
+import pytest
+
+from chatbot import cache
+from chatbot.cache import SemanticResponseCache, response_cache
+from chatbot.index import get_knowledge_index
+from chatbot.models import KnowledgeBase
+from chatbot.services import ChatbotService
+
+
+def unit(*components):
+    vector = np.array(components, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_hit_above_cutoff():
+    responses = SemanticResponseCache(maxsize=4, cutoff=0.9)
+    responses.set(unit(1, 0, 0), 'fr', 1, 'réponse')
+
+    assert responses.get(unit(1, 0.1, 0), 'fr', 1) == 'réponse'
+    assert responses.get(unit(1, 1, 0), 'fr', 1) is None     # similarité 0.71
+    stats = responses.stats()
+    assert (stats['hits'], stats['misses']) == (1, 1)
+    assert stats['mean_hit_similarity'] == pytest.approx(float(unit(1, 0.1, 0)[0]))
+
+
+def test_closest_message_wins():
+    responses = SemanticResponseCache(maxsize=4, cutoff=0.5)
+    responses.set(unit(1, 0, 0), 'fr', 1, 'a')
+    responses.set(unit(0, 1, 0), 'fr', 1, 'b')
+    assert responses.get(unit(0.2, 1, 0), 'fr', 1) == 'b'
+
+
+def test_languages_are_separate():
+    responses = SemanticResponseCache(maxsize=4, cutoff=0.9)
+    responses.set(unit(1, 0), 'fr', 1, 'réponse')
+    assert responses.get(unit(1, 0), 'en', 1) is None
+
+
+def test_near_duplicate_replaces_answer():
+    responses = SemanticResponseCache(maxsize=4, cutoff=0.9)
+    responses.set(unit(1, 0), 'fr', 1, 'ancienne')
+    responses.set(unit(1, 0.01), 'fr', 1, 'nouvelle')
+
+    assert len(responses) == 1
+    assert responses.get(unit(1, 0), 'fr', 1) == 'nouvelle'
+
+
+def test_new_version_empties_cache():
+    responses = SemanticResponseCache(maxsize=4, cutoff=0.9)
+    responses.set(unit(1, 0), 'fr', 1, 'réponse')
+
+    assert responses.get(unit(1, 0), 'fr', 2) is None
+    assert len(responses) == 0 and responses.stats()['invalidations'] == 1
+    # Retour de l'ancienne version : l'entrée ne revient pas
+    assert responses.get(unit(1, 0), 'fr', 1) is None
+
+
+def test_least_recently_used_is_evicted():
+    responses = SemanticResponseCache(maxsize=2, cutoff=0.9)
+    responses.set(unit(1, 0, 0), 'fr', 1, 'a')
+    responses.set(unit(0, 1, 0), 'fr', 1, 'b')
+    responses.get(unit(1, 0, 0), 'fr', 1)      # 'b' devient la moins récemment utilisée
+    responses.set(unit(0, 0, 1), 'fr', 1, 'c')
+
+    assert responses.get(unit(0, 1, 0), 'fr', 1) is None
+    assert (responses.get(unit(1, 0, 0), 'fr', 1), responses.get(unit(0, 0, 1), 'fr', 1)) == ('a', 'c')
+    assert responses.stats()['evictions'] == 1
+
+
+def test_expiration(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    responses = SemanticResponseCache(maxsize=1, cutoff=0.9, ttl=10)
+    responses.set(unit(1, 0), 'fr', 1, 'a')
+
+    now[0] += 5
+    assert responses.get(unit(1, 0), 'fr', 1) == 'a'
+    now[0] += 10
+    assert responses.get(unit(1, 0), 'fr', 1) is None
+    # Emplacement expiré réutilisé sans éviction
+    responses.set(unit(0, 1), 'fr', 1, 'b')
+    assert responses.stats()['evictions'] == 0
+
+
+def test_disabled():
+    assert not SemanticResponseCache(maxsize=0).enabled
+
+
+@pytest.fixture
+def service(knowledge_base, settings):
+    settings.CHATBOT_RESPONSE_CACHE_VECTORS = 'hashed'
+    KnowledgeBase.objects.create(
+        category='Paiement', question='Comment payer ma prime ?', answer='Par Mobile Money.',
+        keywords='payer, prime, paiement',
+    )
+    get_knowledge_index()
+    return ChatbotService()
+
+
+def test_cached_methods_are_served_from_cache(service, settings):
+    settings.CHATBOT_RESPONSE_CACHE_METHODS = ['knowledge_base']
+    first = service.process_message('Comment payer ma prime ?')
+    hits = response_cache.hits
+
+    second = service.process_message('comment payer ma prime')
+    assert response_cache.hits == hits + 1
+    assert (second['message'], second['response_method']) == (first['message'], 'knowledge_base')
+
+
+def test_other_methods_are_not_cached(service, settings):
+    settings.CHATBOT_RESPONSE_CACHE_METHODS = ['ai_generation']
+    service.process_message('Comment payer ma prime ?')
+    assert len(response_cache) == 0
+
+
+def test_modified_entry_invalidates_answers(service, settings):
+    settings.CHATBOT_RESPONSE_CACHE_METHODS = ['knowledge_base']
+    service.process_message('Comment payer ma prime ?')
+
+    KnowledgeBase.objects.filter(category='Paiement').update(answer='Par carte bancaire.')
+    hits = response_cache.hits
+    assert service.process_message('Comment payer ma prime ?')['message'] == 'Par carte bancaire.'
+    assert response_cache.hits == hits
+
+
+def test_suggestions_bypass_cache(service, settings):
+    settings.CHATBOT_RESPONSE_CACHE_METHODS = ['knowledge_base']
+    service.process_message('Comment payer ma prime ?')
+    hits = response_cache.hits
+
+    assert 'suggestions' in service.process_message('Comment payer ma prime ?', suggestions=2)
+    assert response_cache.hits == hits
@@ -0,0 +1,119 @@
+"""
+Mode fantôme (chatbot.shadow) : recherches mises de côté pendant la requête,
+comparées au moteur candidat puis cumulées dans ShadowComparison
+"""
+import pytest
+
+from chatbot import services
+from chatbot.index import get_knowledge_index
+from chatbot.models import KnowledgeBase, ShadowComparison
+from chatbot.normalization import normalize
+from chatbot.services import ChatbotService
+from chatbot.shadow import ShadowRunner
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    runner = ShadowRunner('bm25', maxsize=3)
+    # Recherches comparées dans le test plutôt que par le thread d'arrière-plan
+    monkeypatch.setattr(runner, '_ensure_thread', lambda: None)
+    return runner
+
+
+def drain(runner):
+    while not runner._queue.empty():
+        runner._compare(runner._queue.get_nowait())
+
+
+def submit(runner, message, primary_backend='heuristic', primary=None, latency=None):
+    runner.submit(message, normalize(message), 'fr', primary_backend, primary, latency)
+
+
+def test_disabled():
+    runner = ShadowRunner(None)
+    submit(runner, 'Comment payer ma prime ?')
+    assert not runner.enabled and runner.stats()['submitted'] == 0
+
+
+def test_same_backend_is_not_compared(runner):
+    submit(runner, 'Comment payer ma prime ?', primary_backend='bm25')
+    assert runner.stats()['submitted'] == 0
+
+
+def test_sampling(runner):
+    runner.sample_rate = 0.0
+    submit(runner, 'Comment payer ma prime ?')
+    assert runner.stats()['submitted'] == 0
+
+
+def test_requests_are_deferred_until_response_is_sent(runner):
+    runner.request_started()
+    submit(runner, 'Comment payer ma prime ?')
+    submit(runner, 'Comment déclarer un sinistre ?')
+    assert runner.stats()['queued'] == 0
+
+    runner.request_finished()
+    assert runner.stats()['queued'] == 2
+    # Hors requête (commande, shell) : déposée aussitôt
+    submit(runner, 'Puis-je modifier mon contrat ?')
+    assert runner.stats()['queued'] == 3
+
+
+def test_full_queue_drops_requests(runner):
+    for i in range(5):
+        submit(runner, f'Question {i}')
+    stats = runner.stats()
+    assert (stats['submitted'], stats['dropped'], stats['queued']) == (3, 2, 3)
+
+
+@pytest.fixture
+def entries(knowledge_base):
+    KnowledgeBase.objects.bulk_create([
+        KnowledgeBase(category='Paiement', question='Comment payer ma prime ?', answer='Par Mobile Money.',
+                      keywords='payer, prime'),
+        KnowledgeBase(category='Sinistre', question='Comment déclarer un sinistre ?', answer='En ligne.',
+                      keywords='sinistre, déclarer'),
+    ])
+    get_knowledge_index()
+    return {entry.category: entry.id for entry in KnowledgeBase.objects.all()}
+
+
+def test_comparisons_are_aggregated(runner, entries):
+    submit(runner, 'Comment payer ma prime ?', primary=(entries['Paiement'], 0.9), latency=0.002)
+    submit(runner, 'Comment déclarer un sinistre ?', primary=(entries['Paiement'], 0.4))    # désaccord
+    submit(runner, 'Comment déclarer un sinistre ?')                                         # candidat seul
+    drain(runner)
+    runner.flush()
+
+    row = ShadowComparison.objects.get()
+    assert (row.primary_backend, row.shadow_backend, row.language) == ('heuristic', 'bm25', 'fr')
+    assert row.period.minute == row.period.second == 0
+    assert (row.messages, row.agreements, row.primary_only, row.shadow_only, row.compared) == (3, 1, 0, 1, 2)
+    assert row.agreement_rate == pytest.approx(1 / 3)
+    assert row.primary_timed == 1 and row.mean_primary_latency_ms == pytest.approx(2.0)
+    assert 0 < row.shadow_latency_ms_max <= row.shadow_latency_ms_sum
+
+    # Écritures suivantes ajoutées à la même ligne horaire
+    submit(runner, 'Comment payer ma prime ?', primary=(entries['Paiement'], 0.9))
+    drain(runner)
+    runner.flush()
+    row = ShadowComparison.objects.get()
+    assert (row.messages, row.agreements, row.compared) == (4, 2, 3)
+
+
+def test_nothing_to_flush(runner, db):
+    runner.flush()
+    assert not ShadowComparison.objects.exists()
+
+
+def test_service_submits_primary_match(runner, entries, monkeypatch):
+    monkeypatch.setattr(services, 'shadow_runner', runner)
+    service = ChatbotService()
+    service.process_message('Comment payer ma prime ?')
+    # Deuxième passage servi par le cache : comparé, mais sans durée
+    service.process_message('Comment payer ma prime ?')
+
+    first, second = runner._queue.get_nowait(), runner._queue.get_nowait()
+    assert first.primary[0] == second.primary[0] == entries['Paiement']
+    assert first.primary_backend == service.knowledge_matcher.backend
+    assert first.primary_latency is not None and second.primary_latency is None
@@ -0,0 +1,82 @@
+"""
+Correction orthographique des messages (chatbot/spelling.py) sur le
+vocabulaire de la base
+"""
+from pathlib import Path
+
+import pytest
+
+from chatbot.evaluation import build_index, knowledge_rows
+from chatbot.normalization import normalize
+from chatbot.services import KnowledgeBaseMatcher
+from chatbot.spelling import SymSpellIndex, edit_distance
+
+KNOWLEDGE_FILE = Path(__file__).resolve().parent.parent / 'knowledge_base.json'
+
+
+@pytest.mark.parametrize('a, b, distance', [
+    ('paiement', 'paiement', 0),
+    ('paiment', 'paiement', 1),      # suppression
+    ('assurence', 'assurance', 1),   # substitution
+    ('contart', 'contrat', 1),       # transposition adjacente
+    ('sinystr', 'sinistre', 2),      # substitution et suppression
+])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b, 2) == distance
+
+
+def test_edit_distance_stops_beyond_max():
+    assert edit_distance('remboursement', 'souscription', 2) == 3
+    assert edit_distance('aide', 'assistance', 2) == 3
+
+
+@pytest.fixture
+def speller():
+    return SymSpellIndex(['assurance', 'assurance', 'assurances', 'paiement', 'contrat', 'sinistre', 'mobile'])
+
+
+def test_lookup(speller):
+    assert speller.lookup('assurance') == 'assurance'
+    assert speller.lookup('assurence') == 'assurance'
+    assert speller.lookup('paiment') == 'paiement'
+    assert speller.lookup('sinitsre') == 'sinistre'
+
+
+def test_lookup_prefers_most_frequent_word(speller):
+    # « assurancs » est à une suppression de « assurance » comme de « assurances »
+    assert speller.lookup('assurancs') == 'assurance'
+
+
+def test_short_and_unknown_words_are_kept(speller):
+    assert speller.lookup('mob') is None               # plus court que min_length
+    assert speller.lookup('2024') is None
+    assert speller.lookup('contrta') == 'contrat'
+    assert speller.lookup('cnotrta') is None           # deux erreurs : une seule tolérée sous 8 lettres
+    assert speller.lookup('voyage') is None
+
+
+def test_added_words_replace_memoized_corrections(speller):
+    assert speller.lookup('voyagee') is None
+    speller.add(['voyages'])
+    assert speller.lookup('voyagee') == 'voyages'
+
+
+def test_correct_keeps_punctuation_and_known_words(speller):
+    assert speller.correct('mon assurence, mon contart ?') == 'mon assurance, mon contrat ?'
+
+
+@pytest.fixture(scope='module')
+def index():
+    return build_index(knowledge_rows(KNOWLEDGE_FILE))
+
+
+def test_misspelled_message_matches(index):
+    matcher = KnowledgeBaseMatcher('heuristic')
+    [(position, _)] = matcher._heuristic_top(index, normalize('Comment declarer un sinitre'))
+    assert index.entries[position].question == 'Comment déclarer un sinistre ?'
+
+
+def test_correction_can_be_disabled(index, settings):
+    settings.CHATBOT_SPELL_CORRECTION = False
+    normalized = normalize('assurence')
+    assert KnowledgeBaseMatcher._correct(index, normalized) is normalized
@@ -0,0 +1,84 @@
+"""
+Les k meilleures correspondances (suggestions « vouliez-vous dire ? »),
+tirées du même passage de score que la meilleure
+"""
+from pathlib import Path
+
+import pytest
+
+from chatbot.evaluation import build_index, knowledge_rows, labeled_examples
+from chatbot.index import get_knowledge_index
+from chatbot.models import KnowledgeBase
+from chatbot.normalization import normalize
+from chatbot.services import ChatbotService, KnowledgeBaseMatcher
+
+KNOWLEDGE_FILE = Path(__file__).resolve().parent.parent / 'knowledge_base.json'
+
+
+@pytest.fixture(scope='module')
+def rows():
+    return knowledge_rows(KNOWLEDGE_FILE)
+
+
+@pytest.fixture(scope='module')
+def index(rows):
+    return build_index(rows)
+
+
+@pytest.mark.parametrize('backend', ['heuristic', 'tfidf', 'bm25'])
+def test_top_k_extends_best_match(rows, index, backend):
+    matcher = KnowledgeBaseMatcher(backend)
+    for example in labeled_examples(rows):
+        normalized = normalize(example.message)
+        best = matcher._top(index, example.message, normalized, k=1)
+        top = matcher._top(index, example.message, normalized, k=3)
+
+        assert top[:1] == best, example.message
+        assert len({position for position, _ in top}) == len(top) <= 3
+        # Après la première (éventuellement une correspondance exacte), par score décroissant
+        assert [score for _, score in top[1:]] == sorted((score for _, score in top[1:]), reverse=True)
+
+
+def test_exact_match_is_followed_by_other_entries(index):
+    matcher = KnowledgeBaseMatcher('heuristic')
+    top = matcher._top(index, 'Comment déclarer un sinistre ?', normalize('Comment déclarer un sinistre ?'), k=3)
+
+    assert index.entries[top[0][0]].question == 'Comment déclarer un sinistre ?'
+    assert len(top) == 3
+    assert "Puis-je déclarer un sinistre si j'ai souscrit en agence ?" in [index.entries[p].question for p, _ in top]
+
+
+@pytest.fixture
+def service(knowledge_base):
+    KnowledgeBase.objects.bulk_create([
+        KnowledgeBase(category='Sinistre', question='Comment déclarer un sinistre ?', answer='En ligne.',
+                      keywords='sinistre, déclarer, déclaration'),
+        KnowledgeBase(category='Sinistre', question='Puis-je déclarer un sinistre en agence ?', answer='Oui.',
+                      keywords='sinistre, agence'),
+        KnowledgeBase(category='Sinistre', question='Quel est le délai de déclaration ?', answer='Cinq jours.',
+                      keywords='délai, déclaration', confidence_threshold=0.95),
+    ])
+    get_knowledge_index()
+    return ChatbotService()
+
+
+def test_suggestions_exclude_the_answer(service):
+    response = service.process_message('Comment déclarer un sinistre ?', suggestions=2)
+
+    assert response['response_method'] == 'knowledge_base'
+    questions = [suggestion['question'] for suggestion in response['suggestions']]
+    assert questions[0] == 'Puis-je déclarer un sinistre en agence ?'
+    assert 'Comment déclarer un sinistre ?' not in questions
+    assert len(questions) <= 2
+
+
+def test_all_matches_are_suggested_without_answer(service):
+    # Meilleure entrée sous son seuil de confiance : proposée en premier
+    response = service.process_message('Et le délai ?', suggestions=2)
+
+    assert response['response_method'] != 'knowledge_base'
+    assert response['suggestions'][0]['question'] == 'Quel est le délai de déclaration ?'
+
+
+def test_no_suggestions_by_default(service):
+    assert 'suggestions' not in service.process_message('Comment déclarer un sinistre ?')
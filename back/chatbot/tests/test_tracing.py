@@ -0,0 +1,67 @@
+"""
+Détail des scores (KnowledgeBaseMatcher.explain) et traces échantillonnées
+des correspondances (chatbot/tracing.py)
+"""
+from pathlib import Path
+
+import pytest
+
+from chatbot.evaluation import build_index, knowledge_rows
+from chatbot.index import get_knowledge_index
+from chatbot.models import KnowledgeBase
+from chatbot.services import KnowledgeBaseMatcher
+from chatbot.tracing import TraceBuffer, match_traces
+
+KNOWLEDGE_FILE = Path(__file__).resolve().parent.parent / 'knowledge_base.json'
+
+
+@pytest.fixture(scope='module')
+def index():
+    return build_index(knowledge_rows(KNOWLEDGE_FILE))
+
+
+def test_trace_buffer_keeps_most_recent_first():
+    buffer = TraceBuffer(maxlen=3, sample_rate=1.0)
+    for i in range(5):
+        buffer.record({'i': i})
+
+    assert [trace['i'] for trace in buffer.recent()] == [4, 3, 2]
+    assert [trace['i'] for trace in buffer.recent(limit=2)] == [4, 3]
+
+
+@pytest.mark.parametrize('sample_rate, sampled', [(0.0, False), (1.0, True)])
+def test_trace_sampling(sample_rate, sampled):
+    assert TraceBuffer(sample_rate=sample_rate).should_sample() is sampled
+
+
+def test_explain_components_add_up_to_score(index):
+    explanation = KnowledgeBaseMatcher('heuristic')._explain(index, 'Comment déclarer un sinistre ?', k=3)
+
+    assert explanation[0]['question'] == 'Comment déclarer un sinistre ?'
+    assert explanation[0]['components']['exact'] == 1.0
+    assert [item['score'] for item in explanation] == sorted((item['score'] for item in explanation), reverse=True)
+    for item in explanation:
+        assert sum(item['components'].values()) == pytest.approx(item['score'])
+        assert item['matched'] == (item['score'] >= item['threshold'] and item['score'] > 0)
+
+
+def test_explain_empty_index():
+    assert KnowledgeBaseMatcher('heuristic')._explain(build_index([]), 'Bonjour') == []
+
+
+def test_sampled_match_is_traced(knowledge_base, monkeypatch):
+    entry = KnowledgeBase.objects.create(
+        category='Sinistre', question='Comment déclarer un sinistre ?', answer='En ligne.',
+        keywords='sinistre, déclarer',
+    )
+    get_knowledge_index()
+    monkeypatch.setattr(match_traces, 'sample_rate', 1.0)
+    match_traces.clear()
+
+    KnowledgeBaseMatcher('heuristic').find_best_match('Comment déclarer un sinistre ?')
+
+    [trace] = match_traces.recent()
+    assert trace['match_id'] == entry.id
+    assert trace['backend'] == 'heuristic'
+    assert trace['top'][0]['id'] == entry.id
+    match_traces.clear()
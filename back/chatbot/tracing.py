@@ -0,0 +1,84 @@
+"""
+Traces échantillonnées et compteurs des correspondances du chatbot
+"""
+import random
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+
+class TierCounters:
+    """
+    Nombre de recherches résolues par chaque palier de la cascade de correspondance
+    """
+
+    def __init__(self, tiers):
+        self._counts = dict.fromkeys(tiers, 0)
+        self._lock = threading.Lock()
+
+    def hit(self, tier: str):
+        with self._lock:
+            self._counts[tier] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        return {
+            'total': total,
+            'hits': counts,
+            'rates': {tier: count / total if total else 0.0 for tier, count in counts.items()},
+        }
+
+    def clear(self):
+        with self._lock:
+            for tier in self._counts:
+                self._counts[tier] = 0
+
+
+class TraceBuffer:
+    """
+    Tampon circulaire en mémoire des traces récentes.
+
+    Seule une fraction `sample_rate` des messages est tracée : pour les
+    autres, le coût se limite à un tirage aléatoire.
+    """
+
+    def __init__(self, maxlen: int = 200, sample_rate: float = 0.01):
+        self.sample_rate = sample_rate
+        self._traces = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def record(self, trace: Dict[str, Any]):
+        with self._lock:
+            self._traces.append(trace)
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Traces les plus récentes d'abord
+        """
+        with self._lock:
+            traces = list(self._traces)
+        traces.reverse()
+        return traces[:limit] if limit else traces
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+    def __len__(self):
+        return len(self._traces)
+
+
+match_traces = TraceBuffer(
+    maxlen=getattr(settings, 'CHATBOT_TRACE_BUFFER_SIZE', 200),
+    sample_rate=getattr(settings, 'CHATBOT_TRACE_SAMPLE_RATE', 0.01),
+)
+
+# Paliers : empreinte exacte, listes de mots-clés et de phrases, catégories prédites, score complet
+match_tiers = TierCounters(('exact', 'keywords', 'category', 'full'))
@@ -14,6 +14,8 @@ urlpatterns = [
     path('settings/', views.get_chatbot_settings, name='chatbot-settings'),
     path('history/', views.get_conversation_history, name='conversation-history'),
     path('health/', views.chatbot_health_check, name='chatbot-health'),
+    path('stats/', views.chatbot_stats, name='chatbot-stats'),
+    path('traces/', views.chatbot_traces, name='chatbot-traces'),
     
     # ViewSets via router
     path('', include(router.urls)),
@@ -1,6 +1,6 @@
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
@@ -14,6 +14,9 @@ from .serializers import (
     MessageSerializer, KnowledgeBaseSerializer, ChatbotSettingsSerializer
 )
 from .services import ChatbotService
+from .cache import match_cache, response_cache
+from .shadow import shadow_runner
+from .tracing import match_tiers, match_traces
 
 
 class ChatbotAPIView(APIView):
@@ -40,6 +43,7 @@ class ChatbotAPIView(APIView):
         message = serializer.validated_data['message']
         session_id = serializer.validated_data.get('session_id')
         user_id = serializer.validated_data.get('user_id')
+        suggestions = serializer.validated_data['suggestions']
         
         # Si l'utilisateur est authentifié, utiliser son ID
         if request.user.is_authenticated:
@@ -51,7 +55,8 @@ class ChatbotAPIView(APIView):
             response_data = chatbot_service.process_message(
                 user_message=message,
                 session_id=session_id,
-                user_id=user_id
+                user_id=user_id,
+                suggestions=suggestions
             )
             
             response_serializer = ChatResponseSerializer(data=response_data)
@@ -238,3 +243,56 @@ def chatbot_health_check(request):
             "status": "unhealthy",
             "error": str(e)
         }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+@extend_schema(
+    request=None,
+    responses={200: {"type": "object"}},
+    description="Statistiques internes du chatbot (caches, paliers des correspondances et mode fantôme)",
+    tags=['Utilitaires']
+)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def chatbot_stats(request):
+    """
+    Statistiques internes du chatbot (administrateurs uniquement)
+    """
+    return Response({
+        'match_cache': match_cache.stats(),
+        'response_cache': response_cache.stats(),
+        'match_tiers': match_tiers.stats(),
+        'shadow': shadow_runner.stats(),
+    })
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            name='limit',
+            type=OpenApiTypes.INT,
+            location=OpenApiParameter.QUERY,
+            description='Nombre maximum de traces retournées'
+        ),
+    ],
+    responses={200: {"type": "object"}},
+    description="Traces échantillonnées des dernières recherches dans la base de connaissances",
+    tags=['Utilitaires']
+)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def chatbot_traces(request):
+    """
+    Dernières traces de correspondance échantillonnées (administrateurs uniquement)
+    """
+    try:
+        limit = int(request.query_params.get('limit', 50))
+    except ValueError:
+        return Response(
+            {"error": "limit doit être un entier"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    return Response({
+        'sample_rate': match_traces.sample_rate,
+        'traces': match_traces.recent(limit),
+    })